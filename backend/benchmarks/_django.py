@@ -0,0 +1,30 @@
+"""Shared setup for benchmarks that need Django (settings, and optionally a throwaway database)."""
+import contextlib
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def setup():
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "igave.settings")
+    # Benchmarks never touch the real database unless DATABASE_URL says so explicitly
+    os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
+    import django
+    django.setup()
+
+
+@contextlib.contextmanager
+def test_database():
+    """Creates a fresh test database (like the test runner does) and drops it afterwards."""
+    from django.db import connection
+
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
@@ -0,0 +1,95 @@
+"""
+/api/receipts/bulk/: writing a batch of receipts one request per receipt against one bulk request.
+
+Usage (from backend/):
+    python -m benchmarks.bench_bulk [--rows 1000] [--existing 100000]
+
+Requests go through the whole stack (URL routing, JWT authentication, rendering) with a real access token.
+The user already owns --existing receipts, so the rollup buckets are populated like a long-lived account's.
+Each row of the table times the same --rows receipts created, then updated (status and amount), then deleted.
+"""
+import argparse
+import json
+import random
+import time
+
+from benchmarks import _django
+
+_django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.test import Client, override_settings  # noqa: E402
+from rest_framework_simplejwt.tokens import AccessToken  # noqa: E402
+from benchmarks.bench_stats import CATEGORIES, seed  # noqa: E402
+
+URL = "/api/receipts/bulk/"
+
+
+def payload(rows, rng):
+    return [
+        {"store_name": f"Store {rng.randint(1, 400)}",
+         "date": f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+         "total_amount": f"{rng.uniform(1, 300):.2f}", "category": rng.choice(CATEGORIES)}
+        for _ in range(rows)
+    ]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return (time.perf_counter() - start) * 1000, result
+
+
+def one_by_one(client, receipts):
+    def create():
+        return [client.post("/api/receipts/", receipt, content_type="application/json").json()["id"]
+                for receipt in receipts]
+
+    create_ms, ids = timed(create)
+    update_ms, _ = timed(lambda: [
+        client.patch(f"/api/receipts/{pk}/", {"status": "verified", "total_amount": "1.00"},
+                     content_type="application/json")
+        for pk in ids
+    ])
+    delete_ms, _ = timed(lambda: [client.delete(f"/api/receipts/{pk}/") for pk in ids])
+    return create_ms, update_ms, delete_ms
+
+
+def in_bulk(client, receipts):
+    def send(method, body):
+        response = method(URL, json.dumps(body), content_type="application/json")
+        assert response.status_code in (200, 201), response.content[:200]
+        return response.json()
+
+    create_ms, created = timed(lambda: send(client.post, receipts))
+    ids = [receipt["id"] for receipt in created]
+    update_ms, _ = timed(lambda: send(client.patch, [{"id": pk, "status": "verified", "total_amount": "1.00"}
+                                                     for pk in ids]))
+    delete_ms, _ = timed(lambda: send(client.delete, {"ids": ids}))
+    return create_ms, update_ms, delete_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--existing", type=int, default=100_000)
+    args = parser.parse_args()
+
+    rng = random.Random(13)
+    with _django.test_database(), override_settings(ALLOWED_HOSTS=["testserver"], RECEIPT_BULK_MAX_ITEMS=args.rows):
+        user = User.objects.create(username="bulk_writer")
+        seed(user, args.existing, rng)
+        client = Client(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}")
+        receipts = payload(args.rows, rng)
+
+        print(f"{args.rows:,} receipts ({args.existing:,} already stored); ms for the whole batch")
+        print(f"{'':<12} {'create':>9} {'update':>9} {'delete':>9}")
+        single = one_by_one(client, receipts)
+        bulk = in_bulk(client, receipts)
+        print(f"{'one by one':<12} " + " ".join(f"{ms:>9.1f}" for ms in single))
+        print(f"{'bulk':<12} " + " ".join(f"{ms:>9.1f}" for ms in bulk))
+        print(f"{'speed-up':<12} " + " ".join(f"{a / b:>8.1f}x" for a, b in zip(single, bulk)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Receipt categorization: classifications/second of the old per-call keyword dict against the compiled
+matcher, and the accuracy the per-user store memory adds.
+
+Usage (from backend/):
+    python -m benchmarks.bench_categorizer [--receipts 100000] [--history 50 200 1000] [--test 2000]
+
+Receipts come from seed_data's generator (stores and items of the category they were generated for,
+which is the right answer). Throughput: the same parsed receipts through the legacy categorize() and
+the current one, outputs checked to be equal first; "memory" is the keyword pass plus the warm store
+memory lookup a scan draft gets. Accuracy: a user with --history verified receipts, then --test new
+receipts categorized from keywords alone and with the memory.
+"""
+import argparse
+import copy
+import random
+import time
+from datetime import date
+
+from benchmarks import _django
+
+_django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from benchmarks.legacy import legacy_categorize  # noqa: E402
+from igaveapp.store_memory import categorize_draft, store_memory  # noqa: E402
+from igaveapp.management.commands.seed_data import fake_receipt  # noqa: E402
+from igaveapp.models import Receipt  # noqa: E402
+from igaveapp.parsing import categorize  # noqa: E402
+
+END = date(2026, 6, 30)
+
+
+def parsed(receipt):
+    """What the parser hands to categorize(): no category yet, items under "name"."""
+    items = [{"name": item["desc"], "price": item["price"]} for item in receipt.items]
+    return {"vendor": receipt.store_name, "date": None, "total": None, "category": "general", "items": items}
+
+
+def per_second(fn, inputs):
+    batch = copy.deepcopy(inputs)
+    start = time.perf_counter()
+    for data in batch:
+        fn(data)
+    return len(batch) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--receipts", type=int, default=100_000)
+    parser.add_argument("--history", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument("--test", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(13)
+    with _django.test_database():
+        user = User.objects.create(username="categorizer")
+        receipts = [fake_receipt(rng, user.id, END, 365) for _ in range(args.receipts)]
+        inputs = [parsed(receipt) for receipt in receipts]
+        same = all(legacy_categorize(a)["category"] == categorize(b)["category"]
+                   for a, b in zip(copy.deepcopy(inputs), copy.deepcopy(inputs)))
+
+        def with_memory(data):
+            categorize(data)
+            return categorize_draft(user.id, {"store_name": data["vendor"], "category": data["category"]})
+
+        store_memory.get(user.id)  # warm
+        print(f"{'':<10} {'legacy/s':>10} {'engine/s':>10} {'memory/s':>10}  same output")
+        legacy, engine, memory = (per_second(fn, inputs) for fn in (legacy_categorize, categorize, with_memory))
+        print(f"{'keywords':<10} {legacy:>10,.0f} {engine:>10,.0f} {memory:>10,.0f}  {same}")
+
+        print(f"\n{'history':>8} {'keywords':>9} {'+memory':>8}")
+        tests = [fake_receipt(rng, user.id, END, 365) for _ in range(args.test)]
+        saved = 0
+        for history in sorted(args.history):
+            past = [fake_receipt(rng, user.id, END, 365) for _ in range(history - saved)]
+            for receipt in past:
+                receipt.status = "verified"
+            Receipt.objects.bulk_create(past, batch_size=1000)
+            store_memory.clear()
+            saved = history
+
+            keywords = remembered = 0
+            for receipt in tests:
+                draft = {"store_name": receipt.store_name, "category": categorize(parsed(receipt))["category"]}
+                keywords += draft["category"] == receipt.category
+                remembered += categorize_draft(user.id, draft)["category"] == receipt.category
+            print(f"{history:>8,} {keywords / len(tests):>9.1%} {remembered / len(tests):>8.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Duplicate detection: the indexed fingerprint lookup on create and scan, against comparing the new receipt
+with every receipt the user has, and the throughput of "manage.py dedup_receipts".
+
+Usage (from backend/):
+    python -m benchmarks.bench_dedup [--receipts 10000 100000 400000] [--repeat 50]
+
+One user owns all the receipts, generated by seed_data; 1% of them are saved a second time. "lookup ms"
+is find_duplicates() for a receipt that has a copy (what POST /api/receipts/ and /scan/ add), "scan ms"
+is the same question answered by loading the user's receipts and fingerprinting them in Python, and the
+last columns are a dry run of the dedup command over everything, fingerprints included.
+"""
+import argparse
+import io
+import random
+import time
+from datetime import date
+
+from benchmarks import _django
+
+_django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from benchmarks.bench_stats import timed  # noqa: E402
+from igaveapp.dedup import find_duplicates, receipt_fingerprint, set_fingerprints  # noqa: E402
+from igaveapp.management.commands.seed_data import fake_receipt  # noqa: E402
+from igaveapp.models import Receipt  # noqa: E402
+
+
+def seed(user, count, rng):
+    for start in range(0, count, 5000):
+        receipts = [fake_receipt(rng, user.id, date(2026, 6, 30), 3650) for _ in range(min(5000, count - start))]
+        copies = [Receipt(user_id=user.id, store_name=r.store_name.upper(), date=r.date, category=r.category,
+                          total_amount=r.total_amount, items=r.items[::-1])
+                  for r in rng.sample(receipts, len(receipts) // 100)]
+        Receipt.objects.bulk_create(set_fingerprints(receipts + copies), batch_size=1000)
+
+
+def scan_for_duplicates(user, receipt):
+    wanted = receipt_fingerprint(receipt)
+    fields = ('pk', *Receipt.FINGERPRINT_FIELDS)
+    return [other.pk for other in Receipt.objects.filter(user=user).only(*fields).iterator(chunk_size=2000)
+            if other.pk != receipt.pk and receipt_fingerprint(other) == wanted]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--receipts", type=int, nargs="+", default=[10_000, 100_000, 400_000])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = random.Random(13)
+    with _django.test_database():
+        user = User.objects.create(username="twice")
+        seeded = 0
+        print(f"{'receipts':>9} {'lookup ms':>10} {'scan ms':>9} {'dedup s':>8} {'receipts/s':>11} {'found':>7}")
+        for total in sorted(args.receipts):
+            seed(user, total - seeded, rng)
+            seeded = total
+            copy = Receipt.objects.filter(user=user).order_by('-id').first()
+
+            lookup_ms, found = timed(lambda: find_duplicates(user.id, copy.fingerprint, exclude=copy.pk), args.repeat)
+            scan_ms, scanned = timed(lambda: scan_for_duplicates(user, copy), 1)
+            assert found and found == scanned, (found, scanned)
+
+            out = io.StringIO()
+            started = time.perf_counter()
+            call_command("dedup_receipts", stdout=out)
+            elapsed = time.perf_counter() - started
+            duplicates = int(out.getvalue().split("Found ")[1].split()[0].replace(",", ""))
+            count = Receipt.objects.count()
+            print(f"{count:>9,} {lookup_ms:>10.3f} {scan_ms:>9.1f} {elapsed:>8.2f} {count / elapsed:>11,.0f} "
+                  f"{duplicates:>7,}")
+
+
+if __name__ == "__main__":
+    main()
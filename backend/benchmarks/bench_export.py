@@ -0,0 +1,128 @@
+"""
+Receipt export: rows/second and peak memory of the old buffered CSV export against the streaming formats.
+
+Usage (from backend/):
+    python -m benchmarks.bench_export [--rows 20000 100000 300000] [--items 6] [--formats csv items xlsx ...]
+
+Receipts (each with --items line items in its JSON, which the old export loaded for nothing) are
+seeded into a throwaway SQLite file. Every export then runs in a fresh child process that reads
+the whole response, so "peak RSS" is that process's high-water mark minus its size before the export.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+BENCH_DB = os.path.join(tempfile.gettempdir(), "igave_bench_export.sqlite3")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{BENCH_DB}")
+
+from benchmarks import _django  # noqa: E402
+
+_django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from igaveapp.exports import EXPORT_FORMATS  # noqa: E402
+from igaveapp.models import Receipt  # noqa: E402
+
+CATEGORIES = [choice for choice, label in Receipt.CATEGORY_CHOICES]
+
+
+def rss_kb(key):
+    """VmRSS / VmHWM of this process in kB (Linux)."""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(key + ":"):
+                return int(line.split()[1])
+    return 0
+
+
+def seed(rows, items, seed_value=3):
+    rng = random.Random(seed_value)
+    Receipt.objects.all().delete()
+    user, _ = User.objects.get_or_create(username="exporter")
+    start = time.perf_counter()
+    for offset in range(0, rows, 5000):
+        Receipt.objects.bulk_create([
+            Receipt(
+                user=user,
+                store_name=f"Store {rng.randint(1, 400)}",
+                date=f"20{rng.randint(15, 25)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                total_amount=f"{rng.uniform(1, 300):.2f}",
+                category=rng.choice(CATEGORIES),
+                items=[{"name": f"Item {n} with a longish description", "price": round(rng.uniform(1, 40), 2)}
+                       for n in range(items)],
+            )
+            for _ in range(min(5000, rows - offset))
+        ])
+    return time.perf_counter() - start
+
+
+def export(kind, queue):
+    """Child process: run one export, read the response to the end, report speed and memory."""
+    from rest_framework.test import APIRequestFactory, force_authenticate
+    from benchmarks.legacy import legacy_export_csv
+    from igaveapp.views import ReceiptViewSet
+
+    user = User.objects.get(username="exporter")
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")  # reset VmHWM to the current RSS
+    except OSError:
+        pass
+    baseline = rss_kb("VmRSS")
+    first_byte = None
+
+    start = time.perf_counter()
+    if kind == "buffered":
+        response = legacy_export_csv(Receipt.objects.filter(user=user))
+        first_byte = time.perf_counter() - start
+        size = len(response.content)
+    else:
+        request = APIRequestFactory().get("/api/receipts/export/", {"as": kind})
+        force_authenticate(request, user=user)
+        response = ReceiptViewSet.as_view({"get": "export_csv"})(request)
+        size = 0
+        for chunk in response.streaming_content:
+            if first_byte is None:
+                first_byte = time.perf_counter() - start
+            size += len(chunk)
+    elapsed = time.perf_counter() - start
+    queue.put((elapsed, first_byte, size, max(0, rss_kb("VmHWM") - baseline)))
+
+
+def run_child(kind):
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    child = context.Process(target=export, args=(kind, queue))
+    child.start()
+    result = queue.get()
+    child.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[20000, 100000, 300000])
+    parser.add_argument("--items", type=int, default=6, help="Line items per receipt")
+    parser.add_argument("--formats", nargs="+", default=list(EXPORT_FORMATS), help="Streaming formats (?as=)")
+    args = parser.parse_args()
+
+    call_command("migrate", verbosity=0)
+    print(f"{'rows':>8} {'export':<10} {'rows/s':>9} {'first byte':>11} {'MB out':>7} {'peak RSS MB':>12}")
+    try:
+        for rows in args.rows:
+            seed(rows, args.items)
+            for kind in ["buffered", *args.formats]:
+                elapsed, first_byte, size, peak_kb = run_child(kind)
+                print(f"{rows:>8} {kind:<10} {rows / elapsed:>9,.0f} {first_byte * 1000:>9.0f}ms "
+                      f"{size / 1e6:>7.1f} {peak_kb / 1024:>12.1f}")
+    finally:
+        if os.path.exists(BENCH_DB) and os.environ["DATABASE_URL"].endswith(BENCH_DB):
+            os.remove(BENCH_DB)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Receipt list/stats queries on a large seeded table, without and with the composite (user, ...) indexes.
+
+Usage (from backend/):
+    python -m benchmarks.bench_indexes [--users 50] [--receipts-per-user 4000] [--repeat 20] [--plans]
+
+"Before" drops the indexes from migration 0008 and filters months/years with date__year / date__month
+(as the view used to); "after" restores them and uses the date ranges the view builds now.
+Runs on an in-memory SQLite database by default; set DATABASE_URL to a scratch Postgres database
+to see Postgres plans (a test database is created next to it and dropped afterwards).
+"""
+import argparse
+import datetime
+import random
+import statistics
+import time
+
+from benchmarks import _django
+
+_django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.db.models import Sum  # noqa: E402
+from igaveapp.models import Receipt  # noqa: E402
+from igaveapp.filters import month_after  # noqa: E402
+
+CATEGORIES = [choice for choice, label in Receipt.CATEGORY_CHOICES]
+
+
+def seed(users, per_user, seed_value=11):
+    rng = random.Random(seed_value)
+    start = datetime.date(2022, 1, 1)
+    owners = User.objects.bulk_create([User(username=f"bench{i}") for i in range(users)])
+    for owner in owners:
+        Receipt.objects.bulk_create([
+            Receipt(
+                user=owner,
+                store_name=f"Store {rng.randint(1, 300)}",
+                date=start + datetime.timedelta(days=rng.randint(0, 4 * 365)),
+                total_amount=f"{rng.uniform(1, 400):.2f}",
+                category=rng.choice(CATEGORIES),
+            )
+            for _ in range(per_user)
+        ], batch_size=2000)
+    return owners
+
+
+def queries(user, legacy):
+    """The querysets ReceiptViewSet runs, with the old or the new month/year filter."""
+    mine = Receipt.objects.filter(user=user)
+    if legacy:
+        month = mine.filter(date__year=2024, date__month=3)
+        year = mine.filter(date__year=2023)
+    else:
+        month = mine.filter(date__gte=datetime.date(2024, 3, 1), date__lt=month_after(2024, 3))
+        year = mine.filter(date__gte=datetime.date(2023, 1, 1), date__lt=datetime.date(2024, 1, 1))
+    return {
+        "list newest 50": mine.order_by("-created_at")[:50],
+        "list ?month": month.order_by("-created_at"),
+        "stats ?year": year.values("category").annotate(total=Sum("total_amount")).order_by("-total"),
+        "list ?start&end": mine.filter(date__range=["2024-06-01", "2024-06-30"]).order_by("-date"),
+        "category+month": month.filter(category="food").order_by("date"),
+    }
+
+
+def run(user, legacy, repeat, show_plans):
+    results = {}
+    for name, queryset in queries(user, legacy).items():
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            list(queryset.all())  # .all() makes a fresh copy so nothing is served from the result cache
+            timings.append((time.perf_counter() - start) * 1000)
+        results[name] = statistics.median(timings)
+        if show_plans:
+            print(f"  [{name}]")
+            for line in queryset.explain().splitlines():
+                print(f"    {line}")
+    return results
+
+
+def set_indexes(enabled):
+    with connection.schema_editor() as editor:
+        for index in Receipt._meta.indexes:
+            if enabled:
+                editor.add_index(Receipt, index)
+            else:
+                editor.remove_index(Receipt, index)
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--receipts-per-user", type=int, default=4000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--plans", action="store_true", help="Print the EXPLAIN output of every query")
+    args = parser.parse_args()
+
+    with _django.test_database():
+        start = time.perf_counter()
+        owners = seed(args.users, args.receipts_per_user)
+        print(f"Seeded {args.users * args.receipts_per_user:,} receipts for {args.users} users "
+              f"in {time.perf_counter() - start:.1f}s ({connection.vendor})")
+        user = owners[len(owners) // 2]
+
+        set_indexes(False)
+        if args.plans:
+            print("\nBEFORE (FK index only, date__year/date__month):")
+        before = run(user, True, args.repeat, args.plans)
+
+        set_indexes(True)
+        if args.plans:
+            print("\nAFTER (composite indexes, date ranges):")
+        after = run(user, False, args.repeat, args.plans)
+
+    print()
+    print(f"{'query':<18} {'before ms':>10} {'after ms':>10} {'speed-up':>9}")
+    for name in before:
+        print(f"{name:<18} {before[name]:>10.2f} {after[name]:>10.2f} {before[name] / after[name]:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
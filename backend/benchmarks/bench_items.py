@@ -0,0 +1,82 @@
+"""
+"How much did I spend on milk?": decoding every receipt's items JSON in Python against the ReceiptItem queries.
+
+Usage (from backend/):
+    python -m benchmarks.bench_items [--receipts 10000 100000 400000] [--repeat 10]
+
+One user owns all the receipts, generated by seed_data (realistic stores, amounts and item names).
+The JSON path is what answering the question took before ReceiptItem: read every receipt's items
+and match the names in Python. The indexed rows are /items/stats/ and /items/search/ through the
+view (response cache off), after checking that both paths agree on the total.
+"""
+import argparse
+import random
+from datetime import date
+from decimal import Decimal
+
+from benchmarks import _django
+
+_django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.test import override_settings  # noqa: E402
+from rest_framework.test import APIRequestFactory, force_authenticate  # noqa: E402
+from benchmarks.bench_stats import timed  # noqa: E402
+from igaveapp.items import item_name, item_price, normalize_item_name, sync_items  # noqa: E402
+from igaveapp.management.commands.seed_data import fake_receipt  # noqa: E402
+from igaveapp.models import Receipt  # noqa: E402
+from igaveapp.views import ReceiptViewSet  # noqa: E402
+
+QUERIES = ["milk", "ibuprofen", "concert"]
+
+
+def seed(user, count, rng):
+    for start in range(0, count, 5000):
+        receipts = [fake_receipt(rng, user.id, date(2026, 6, 30), 3650) for _ in range(min(5000, count - start))]
+        Receipt.objects.bulk_create(receipts, batch_size=1000)
+        sync_items(receipts, replace=False)
+
+
+def spent_from_json(user, query):
+    query = normalize_item_name(query)
+    total = Decimal(0)
+    for items in Receipt.objects.filter(user=user).values_list('items', flat=True).iterator(chunk_size=2000):
+        for item in items or []:
+            if normalize_item_name(item_name(item)).startswith(query):
+                total += item_price(item.get('price')) or 0
+    return total
+
+
+def call(user, action, params):
+    request = APIRequestFactory().get("/api/receipts/items/", params)
+    force_authenticate(request, user=user)
+    return ReceiptViewSet.as_view({"get": action})(request).data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--receipts", type=int, nargs="+", default=[10_000, 100_000, 400_000])
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = random.Random(13)
+    no_cache = {"ENABLED": False, "ALIAS": "responses", "TTL": 300}
+    with _django.test_database(), override_settings(RESPONSE_CACHE=no_cache):
+        user = User.objects.create(username="shopper")
+        seeded = 0
+        print(f"{'receipts':>9} {'query':<10} {'matches':>8} {'JSON ms':>9} {'stats ms':>9} {'search ms':>10}")
+        for total in sorted(args.receipts):
+            seed(user, total - seeded, rng)
+            seeded = total
+            for query in QUERIES:
+                json_ms, expected = timed(lambda: spent_from_json(user, query), max(1, args.repeat // 5))
+                stats_ms, stats = timed(lambda: call(user, "get_item_stats", {"q": query}), args.repeat)
+                search_ms, _ = timed(lambda: call(user, "search_items", {"q": query}), args.repeat)
+                # SQLite sums decimals as floats, so compare to the cent
+                assert round(float(stats["total_spent"]), 2) == round(float(expected), 2), query
+                print(f"{total:>9,} {query:<10} {stats['matches']:>8,} {json_ms:>9.1f} {stats_ms:>9.2f} "
+                      f"{search_ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+What the parser's debug print()s cost: parse latency of the print version against the logging one.
+
+Usage (from backend/):
+    python -m benchmarks.bench_logging [--lines 50 200 1000] [--repeat 20]
+
+Receipts are bench_parser's synthetic ones. The print version writes every decision to stdout; it is
+timed against /dev/null and against a pipe read by another process, unbuffered (PYTHONUNBUFFERED, or
+any stdout a log collector reads line by line), which is where production output goes. The current
+parser is timed with logging off (the default), with DEBUG logging to a pipe, and in trace mode.
+"""
+import argparse
+import contextlib
+import io
+import logging
+import os
+import subprocess
+import time
+
+from benchmarks.bench_parser import make_receipt
+from benchmarks.legacy import legacy_print_parse_fields
+from igaveapp.parsing import logger, parse_receipt_fields, tracing
+
+
+@contextlib.contextmanager
+def pipe():
+    """A text stream into a pipe drained by `cat`, flushed on every write like unbuffered stdout."""
+    reader = subprocess.Popen(["cat"], stdin=subprocess.PIPE, stdout=subprocess.DEVNULL)
+    stream = io.TextIOWrapper(reader.stdin, write_through=True)
+    try:
+        yield stream
+    finally:
+        stream.close()
+        reader.wait()
+
+
+@contextlib.contextmanager
+def stdout_to(kind):
+    if kind == "devnull":
+        with open(os.devnull, "w") as sink, contextlib.redirect_stdout(sink):
+            yield
+    else:
+        with pipe() as stream, contextlib.redirect_stdout(stream):
+            yield
+
+
+@contextlib.contextmanager
+def debug_logging():
+    with pipe() as stream:
+        handler = logging.StreamHandler(stream)
+        logger.addHandler(handler)
+        logger.setLevel(logging.DEBUG)
+        try:
+            yield
+        finally:
+            logger.removeHandler(handler)
+            logger.setLevel(logging.NOTSET)
+
+
+def best_ms(parse, text, repeat, context=contextlib.nullcontext):
+    best = float("inf")
+    with context():
+        for _ in range(repeat):
+            start = time.perf_counter()
+            parse(text)
+            best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def traced(text):
+    with tracing():
+        return parse_receipt_fields(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lines", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    logging.getLogger("igaveapp").propagate = False  # nothing reaches the root logger's default handler
+    print(f"{'lines':>6} {'print→null':>11} {'print→pipe':>11} {'log off':>8} {'DEBUG→pipe':>11} {'trace':>7}"
+          f"  (ms per parse)")
+    for count in args.lines:
+        text = make_receipt(count, seed=count)
+        with stdout_to("devnull"):
+            assert legacy_print_parse_fields(text) == parse_receipt_fields(text)
+
+        null = best_ms(legacy_print_parse_fields, text, args.repeat, lambda: stdout_to("devnull"))
+        piped = best_ms(legacy_print_parse_fields, text, args.repeat, lambda: stdout_to("pipe"))
+        off = best_ms(parse_receipt_fields, text, args.repeat)
+        debug = best_ms(parse_receipt_fields, text, args.repeat, debug_logging)
+        trace = best_ms(traced, text, args.repeat)
+        print(f"{text.count(chr(10)) + 1:>6} {null:>11.3f} {piped:>11.3f} {off:>8.3f} {debug:>11.3f} {trace:>7.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Receipt list pagination: LIMIT/OFFSET against the keyset cursor the API uses, at increasing page depth.
+
+Usage (from backend/):
+    python -m benchmarks.bench_pagination [--receipts 100000] [--page-size 50] [--repeat 10]
+
+All receipts belong to one user (the worst case: one long-time account). For every depth both
+queries fetch the same page in (-created_at, -id) and (date, id) order; the results are checked
+to be identical before they are timed. bulk_create stamps every row with the same created_at, so
+that ordering is decided by the id tie-breaker alone, which is exactly the case the cursor must get right.
+"""
+import argparse
+import datetime
+import random
+import statistics
+import time
+
+from benchmarks import _django
+
+_django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.db.models import F  # noqa: E402
+from rest_framework.request import Request  # noqa: E402
+from rest_framework.test import APIRequestFactory  # noqa: E402
+from igaveapp.models import Receipt  # noqa: E402
+from igaveapp.pagination import KeysetPagination  # noqa: E402
+from igaveapp.views import ReceiptViewSet  # noqa: E402
+
+
+def seed(count, seed_value=5):
+    rng = random.Random(seed_value)
+    user = User.objects.create(username="long_time_user")
+    start = datetime.date(2015, 1, 1)
+    Receipt.objects.bulk_create([
+        Receipt(
+            user=user,
+            store_name=f"Store {rng.randint(1, 500)}",
+            date=None if rng.random() < 0.02 else start + datetime.timedelta(days=rng.randint(0, 3650)),
+            total_amount=f"{rng.uniform(1, 300):.2f}",
+        )
+        for _ in range(count)
+    ], batch_size=5000)
+    return user
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--receipts", type=int, default=100_000)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    factory = APIRequestFactory()
+    size = args.page_size
+    last_page = (args.receipts - 1) // size
+    depths = sorted({0, 10, 100, last_page // 2, last_page})
+
+    with _django.test_database():
+        user = seed(args.receipts)
+        mine = Receipt.objects.filter(user=user)
+        print(f"{args.receipts:,} receipts, {size} per page")
+
+        for ordering in ["-created_at", "date"]:
+            field, descending = ordering.lstrip("-"), ordering.startswith("-")
+            order = [F(field).desc(nulls_first=True), "-id"] if descending else [F(field).asc(nulls_last=True), "id"]
+            ordered = mine.order_by(*order)
+
+            print()
+            print(f"ordering={ordering}")
+            print(f"{'page':>7} {'offset ms':>10} {'keyset ms':>10} {'speed-up':>9}")
+            for page in depths:
+                offset_ms, offset_rows = timed(lambda: list(ordered[page * size:(page + 1) * size]), args.repeat)
+
+                # The cursor a client would hold: made from the last row of the previous page
+                params = {"ordering": ordering, "page_size": size}
+                if page:
+                    tokens = KeysetPagination()
+                    tokens.ordering = ordering
+                    params["cursor"] = tokens.encode_cursor(ordered[page * size - 1])
+                request = Request(factory.get("/api/receipts/", params))
+                keyset_ms, keyset_rows = timed(
+                    lambda: KeysetPagination().paginate_queryset(mine, request, ReceiptViewSet), args.repeat
+                )
+
+                assert [r.id for r in offset_rows] == [r.id for r in keyset_rows], f"page {page} differs"
+                print(f"{page + 1:>7} {offset_ms:>10.2f} {keyset_ms:>10.2f} {offset_ms / keyset_ms:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Receipt parser micro-benchmark: lines/second of the old per-line re.search parser
+against the precompiled single-pass engine, on long synthetic receipts.
+
+Usage (from backend/):
+    python -m benchmarks.bench_parser [--lines 200 500 1000] [--repeat 20]
+
+The legacy parser still prints its debug output; that goes to /dev/null, so this measures parsing only
+(bench_logging.py measures what the prints cost).
+"""
+import argparse
+import contextlib
+import os
+import random
+import time
+
+from igaveapp.parsing import parse_receipt_fields
+from benchmarks.legacy import legacy_parse_fields
+
+ITEM_NAMES = [
+    "MILK 2% GAL", "BREAD WHEAT", "EGGS LARGE 12CT", "BANANAS", "Chicken Breast", "Greek Yogurt",
+    "Paper Towels", "Dish Soap", "Coffee Beans", "Orange Juice", "Cheddar Cheese", "Tomatoes",
+    "Pasta Sauce", "Spaghetti", "Olive Oil", "Rice 5LB", "Cereal", "Apples", "Lettuce", "Butter",
+]
+NOISE_LINES = [
+    "Thank you for shopping", "Store 0231", "Cashier: Maria", "Member savings", "#### ####",
+    "Tel 555-123-4567", "Items sold 12", "Ref 88213", "Visit us online", "REWARDS ID ****1234",
+]
+
+
+def make_receipt(line_count, seed=0):
+    """Builds an OCR-like dump: header, a mix of single-line/split items and noise, then totals."""
+    rng = random.Random(seed)
+    lines = ["Walmart Supercenter", "1200 Main St, Springfield", "(555) 123-4567", "12/05/2023 14:32"]
+    while len(lines) < line_count - 4:
+        roll = rng.random()
+        name = rng.choice(ITEM_NAMES)
+        price = f"{rng.uniform(0.5, 40):.2f}"
+        if roll < 0.55:
+            lines.append(f"{name} {price}")
+        elif roll < 0.75:
+            lines.extend([name, f"${price}"])
+        else:
+            lines.append(rng.choice(NOISE_LINES))
+    lines += ["SUBTOTAL 123.45", "TAX 9.88", "TOTAL 133.33", "VISA TEND 133.33"]
+    return "\n".join(lines)
+
+
+def time_parser(parse, text, repeat):
+    best = float("inf")
+    with open(os.devnull, "w") as sink, contextlib.redirect_stdout(sink):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            parse(text)
+            best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lines", type=int, nargs="+", default=[200, 500, 1000, 5000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'lines':>7} {'legacy lines/s':>16} {'engine lines/s':>16} {'speedup':>8}  same output")
+    for count in args.lines:
+        text = make_receipt(count, seed=count)
+        real_lines = text.count("\n") + 1
+
+        with open(os.devnull, "w") as sink, contextlib.redirect_stdout(sink):
+            same = legacy_parse_fields(text) == parse_receipt_fields(text)
+
+        legacy = time_parser(legacy_parse_fields, text, args.repeat)
+        engine = time_parser(parse_receipt_fields, text, args.repeat)
+        print(f"{real_lines:>7} {real_lines / legacy:>16,.0f} {real_lines / engine:>16,.0f} "
+              f"{legacy / engine:>7.2f}x  {same}")
+
+
+if __name__ == "__main__":
+    main()
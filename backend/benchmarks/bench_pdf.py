@@ -0,0 +1,67 @@
+"""
+PDF scanning benchmark: wall time of a multi-page bill OCR'd one page at a time vs on the page pool.
+
+Usage (from backend/):
+    python -m benchmarks.bench_pdf [--pages 10] [--latency-ms 400] [--workers 1 2 4 8] [--dpi 200]
+
+Vision is replaced by a stub that sleeps --latency-ms per page (a typical round trip), so the
+numbers show how much of the per-page latency the pool hides; rendering is real pdfium work.
+"""
+import argparse
+import io
+import time
+
+from PIL import Image, ImageDraw
+
+from benchmarks import _django
+
+_django.setup()
+
+from igaveapp.pdf import extract_pdf_text  # noqa: E402
+
+LINES = ["CITY POWER & LIGHT", "Statement Date: 12/01/2023", "Account 0042-118-7",
+         "Usage charges 80.00", "Taxes 4.50", "Amount Due: $84.50"]
+
+
+def synthetic_bill(pages):
+    """A Letter-size, text-only PDF with the given number of pages."""
+    images = []
+    for page in range(pages):
+        image = Image.new("L", (612, 792), 255)
+        draw = ImageDraw.Draw(image)
+        for row, line in enumerate(LINES * 6):
+            draw.text((50, 40 + row * 20), f"{line}  (page {page + 1})", fill=0)
+        images.append(image)
+    output = io.BytesIO()
+    images[0].save(output, format="PDF", save_all=True, append_images=images[1:], resolution=72)
+    return output.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=400.0, help="Simulated Vision round trip per page")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--dpi", type=int, default=200)
+    args = parser.parse_args()
+
+    content = synthetic_bill(args.pages)
+
+    def stub_ocr(image_bytes):
+        time.sleep(args.latency_ms / 1000)
+        return f"{len(image_bytes)} bytes"
+
+    print(f"{args.pages}-page PDF ({len(content) / 1024:.0f} KB), {args.latency_ms:g} ms simulated OCR per page")
+    print(f"{'workers':>7} {'wall ms':>9} {'render ms':>10} {'ocr ms':>9} {'speed-up':>9}")
+    baseline = None
+    for workers in args.workers:
+        start = time.perf_counter()
+        text, report = extract_pdf_text(content, stub_ocr, dpi=args.dpi, max_pages=0, workers=workers)
+        wall = (time.perf_counter() - start) * 1000
+        baseline = baseline or wall
+        print(f"{workers:>7} {wall:>9.0f} {report['render_ms']:>10.0f} {report['ocr_ms']:>9.0f} "
+              f"{baseline / wall:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Image preprocessing benchmark: payload size and time saved by shrinking receipt photos before OCR.
+
+Usage (from backend/):
+    python -m benchmarks.bench_preprocess [--images DIR] [--max-edge 2048] [--uplink-mbps 10] [--vision]
+
+Without --images a set of synthetic 12 MP phone-style photos is generated.
+Upload time is estimated from the payload size and --uplink-mbps. With --vision (needs Google
+credentials) every image is also OCR'd raw and preprocessed, and the parsed fields are compared.
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+
+from PIL import Image, ImageDraw, ImageFilter
+
+from benchmarks import _django
+
+_django.setup()
+
+from igaveapp.preprocess import preprocess_image, STAGES  # noqa: E402
+from igaveapp.parsing import parse_receipt_text  # noqa: E402
+
+FIELDS = ("vendor", "date", "total", "category")
+LINES = ["WALMART SUPERCENTER", "12/05/2023 14:32", "MILK 2% GAL 3.48", "BREAD WHEAT 2.50",
+         "EGGS LARGE 12CT 4.12", "BANANAS 1.26", "SUBTOTAL 11.36", "TAX 0.91", "TOTAL 12.27"]
+
+
+def synthetic_photos(count, seed=7):
+    """Photo-like JPEGs: 4000x3000, warm background, sensor noise, EXIF-rotated like a phone would."""
+    rng = random.Random(seed)
+    for index in range(count):
+        image = Image.new("RGB", (4000, 3000), (rng.randint(180, 230), rng.randint(170, 210), 150))
+        draw = ImageDraw.Draw(image)
+        for row, line in enumerate(LINES * 3):
+            draw.text((300, 200 + row * 90), line, fill=(30, 30, 30), font_size=60)
+        noise = Image.effect_noise((4000, 3000), 40).convert("RGB")
+        image = Image.blend(image, noise, 0.25).filter(ImageFilter.GaussianBlur(0.6))
+
+        exif = Image.Exif()
+        exif[0x0112] = 6  # "rotate 90" - how phones store portrait shots
+        output = io.BytesIO()
+        image.save(output, format="JPEG", quality=92, exif=exif.tobytes())
+        yield f"synthetic_{index}.jpg", output.getvalue()
+
+
+def folder_images(path):
+    for name in sorted(os.listdir(path)):
+        if name.lower().endswith((".jpg", ".jpeg", ".png", ".webp", ".heic")):
+            with open(os.path.join(path, name), "rb") as f:
+                yield name, f.read()
+
+
+def ocr_fields(content):
+    from igaveapp.ocr import detect_text
+
+    with open(os.devnull, "w") as sink, contextlib.redirect_stdout(sink):
+        text = detect_text(content)
+        return parse_receipt_text(text) if text else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--images", type=str, help="Folder of real receipt photos")
+    parser.add_argument("--count", type=int, default=5, help="Synthetic photos to generate")
+    parser.add_argument("--max-edge", type=int, default=2048)
+    parser.add_argument("--format", type=str, default="JPEG")
+    parser.add_argument("--uplink-mbps", type=float, default=10.0)
+    parser.add_argument("--vision", action="store_true", help="OCR raw and processed images and compare fields")
+    args = parser.parse_args()
+
+    samples = folder_images(args.images) if args.images else synthetic_photos(args.count)
+    bytes_per_ms = args.uplink_mbps * 1e6 / 8 / 1000
+
+    totals = {"in": 0, "out": 0, "prep": 0.0, "stages": dict.fromkeys(STAGES, 0.0)}
+    agree = checked = count = 0
+
+    print(f"{'image':<22} {'in KB':>8} {'out KB':>8} {'saved':>6} {'prep ms':>8} {'upload ms':>15}")
+    for name, content in samples:
+        processed, report = preprocess_image(content, max_edge=args.max_edge, image_format=args.format)
+        count += 1
+        totals["in"] += report["bytes_in"]
+        totals["out"] += report["bytes_out"]
+        totals["prep"] += report["total_ms"]
+        for stage, ms in report["timings_ms"].items():
+            totals["stages"][stage] += ms
+
+        upload_before = report["bytes_in"] / bytes_per_ms
+        upload_after = report["bytes_out"] / bytes_per_ms
+        print(f"{name:<22} {report['bytes_in'] / 1024:>8.0f} {report['bytes_out'] / 1024:>8.0f} "
+              f"{1 - report['bytes_out'] / report['bytes_in']:>6.0%} {report['total_ms']:>8.1f} "
+              f"{upload_before:>7.0f} -> {upload_after:<5.0f}")
+
+        if args.vision:
+            raw_fields, new_fields = ocr_fields(content), ocr_fields(processed)
+            if raw_fields and new_fields:
+                checked += len(FIELDS)
+                agree += sum(raw_fields[f] == new_fields[f] for f in FIELDS)
+
+    if not count:
+        print("No images.")
+        return
+
+    saved_ms = (totals["in"] - totals["out"]) / bytes_per_ms / count
+    print()
+    print(f"Payload: {totals['in'] / count / 1024:.0f} KB -> {totals['out'] / count / 1024:.0f} KB per image "
+          f"({1 - totals['out'] / totals['in']:.0%} smaller)")
+    print(f"Preprocessing: {totals['prep'] / count:.1f} ms per image ("
+          + ", ".join(f"{stage} {ms / count:.1f}" for stage, ms in totals["stages"].items()) + ")")
+    print(f"Net latency at {args.uplink_mbps:g} Mbit/s: {saved_ms - totals['prep'] / count:+.0f} ms per image "
+          f"(upload saved {saved_ms:.0f} ms)")
+    if args.vision:
+        rate = f"{agree / checked:.1%}" if checked else "n/a"
+        print(f"Parsed-field agreement raw vs preprocessed: {rate} ({agree}/{checked})")
+    else:
+        print("Field accuracy not checked (run with --vision and Google credentials).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Per-user response cache: dashboard requests with the cache off, served from the cache, and revalidated (304).
+
+Usage (from backend/):
+    python -m benchmarks.bench_response_cache [--receipts 100000] [--repeat 50]
+
+Requests go through the whole stack (URL routing, JWT authentication, rendering) with a real access token.
+Besides latency it counts the queries per request; the one left on a hit or a 304 is the JWT user lookup.
+"""
+import argparse
+import random
+
+from benchmarks import _django
+
+_django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import Client, override_settings  # noqa: E402
+from django.test.utils import CaptureQueriesContext  # noqa: E402
+from rest_framework_simplejwt.tokens import AccessToken  # noqa: E402
+from benchmarks.bench_stats import seed, timed  # noqa: E402
+
+URLS = {
+    "list": "/api/receipts/?page_size=50",
+    "list ?month": "/api/receipts/?month=2023-03&page_size=50",
+    "stats (all)": "/api/receipts/stats/",
+    "stats ?year": "/api/receipts/stats/?year=2023",
+    "timeseries": "/api/receipts/stats/timeseries/?start=2023-01-01&end=2023-12-31",
+}
+
+
+def queries(fn):
+    with CaptureQueriesContext(connection) as captured:
+        fn()
+    return len(captured)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--receipts", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    with _django.test_database(), override_settings(ALLOWED_HOSTS=["testserver"]):
+        user = User.objects.create(username="dashboard")
+        seed(user, args.receipts, random.Random(13))
+        client = Client(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}")
+
+        print(f"{args.receipts:,} receipts; ms per request (queries)")
+        print(f"{'request':<13} {'no cache':>14} {'cache hit':>14} {'304':>14}")
+        for name, url in URLS.items():
+            with override_settings(RESPONSE_CACHE={"ENABLED": False, "ALIAS": "responses", "TTL": 300}):
+                off_ms, _ = timed(lambda: client.get(url), args.repeat)
+                off_queries = queries(lambda: client.get(url))
+
+            etag = client.get(url)["ETag"]
+            hit_ms, _ = timed(lambda: client.get(url), args.repeat)
+            hit_queries = queries(lambda: client.get(url))
+            revalidate_ms, response = timed(lambda: client.get(url, HTTP_IF_NONE_MATCH=etag), args.repeat)
+            assert response.status_code == 304
+            revalidate_queries = queries(lambda: client.get(url, HTTP_IF_NONE_MATCH=etag))
+
+            print(f"{name:<13} {off_ms:>9.2f} ({off_queries}) {hit_ms:>9.2f} ({hit_queries}) "
+                  f"{revalidate_ms:>9.2f} ({revalidate_queries})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Scan pipeline load test on the fake OCR backend: no credentials, no network, repeatable.
+
+Usage (from backend/):
+    python -m benchmarks.bench_scan_load [--scans 200] [--rate 20] [--latency-ms 400] [--jitter-ms 100]
+                                         [--workers 2 4 8] [--queue-size 20]
+
+Part 1 offers --scans single scans at --rate per second to the async scan executor (the pool behind
+?async=true) and reports throughput, rejected scans (QueueFull -> HTTP 503) and the time from
+submit to result. Part 2 pushes the same receipts through the batch endpoint's scan_batch().
+The OCR cache is off, so every scan pays the simulated OCR latency.
+"""
+import argparse
+import contextlib
+import os
+import threading
+import time
+
+from benchmarks import _django
+
+_django.setup()
+
+from django.test.utils import override_settings  # noqa: E402
+from igaveapp.batch import scan_batch  # noqa: E402
+from igaveapp.jobs import BoundedExecutor, QueueFull  # noqa: E402
+from igaveapp.ocr import extract_receipt_data  # noqa: E402
+from igaveapp.management.commands.parse_corpus import percentile  # noqa: E402
+
+FIXTURES = os.path.join(_django.BACKEND_DIR, "igaveapp", "testdata", "receipts")
+
+
+def uploads(count):
+    """Distinct payloads cycling through the fixture receipts (distinct bytes, so no cache/dedup help)."""
+    names = sorted(name[:-4] for name in os.listdir(FIXTURES) if name.endswith(".txt"))
+    return [f"fixture:{names[i % len(names)]}".encode() + b" " * (i // len(names)) for i in range(count)]
+
+
+def offered_load(payloads, rate, workers, queue_size):
+    executor = BoundedExecutor(workers, queue_size)
+    latencies = []
+    lock = threading.Lock()
+    rejected = 0
+
+    def scan(payload, submitted):
+        extract_receipt_data(payload)
+        with lock:
+            latencies.append(time.perf_counter() - submitted)
+
+    started = time.perf_counter()
+    for index, payload in enumerate(payloads):
+        # Open-loop arrivals: the next scan arrives on schedule whether or not the last one finished
+        delay = started + index / rate - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        try:
+            executor.submit(scan, payload, time.perf_counter())
+        except QueueFull:
+            rejected += 1
+    executor.shutdown(wait=True)
+    wall = time.perf_counter() - started
+    latencies.sort()
+    return wall, rejected, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scans", type=int, default=200)
+    parser.add_argument("--rate", type=float, default=20.0, help="Scans offered per second")
+    parser.add_argument("--latency-ms", type=int, default=400)
+    parser.add_argument("--jitter-ms", type=int, default=100)
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4, 8])
+    parser.add_argument("--queue-size", type=int, default=20)
+    args = parser.parse_args()
+
+    backend = {"ENGINE": "fake", "FIXTURES": FIXTURES, "LATENCY_MS": args.latency_ms, "JITTER_MS": args.jitter_ms}
+    payloads = uploads(args.scans)
+
+    with override_settings(OCR_BACKEND=backend, OCR_CACHE={"BACKEND": "none"}), \
+            open(os.devnull, "w") as sink, contextlib.redirect_stdout(sink):
+        single = [(workers, offered_load(payloads, args.rate, workers, args.queue_size)) for workers in args.workers]
+        batch = []
+        for workers in args.workers:
+            start = time.perf_counter()
+            failed = sum(data is None for index, data in scan_batch(payloads, workers=workers))
+            batch.append((workers, time.perf_counter() - start, failed))
+
+    print(f"{args.scans} scans offered at {args.rate:g}/s, OCR {args.latency_ms}±{args.jitter_ms} ms, "
+          f"queue size {args.queue_size}")
+    print(f"{'workers':>7} {'done/s':>8} {'rejected':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    for workers, (wall, rejected, latencies) in single:
+        print(f"{workers:>7} {len(latencies) / wall:>8.1f} {rejected:>9} "
+              f"{percentile(latencies, 50) * 1000:>8.0f} {percentile(latencies, 99) * 1000:>8.0f}")
+
+    print()
+    print(f"Batch endpoint (scan_batch), {args.scans} receipts in one request:")
+    print(f"{'workers':>7} {'wall ms':>9} {'receipts/s':>11} {'failed':>7}")
+    for workers, wall, failed in batch:
+        print(f"{workers:>7} {wall * 1000:>9.0f} {args.scans / wall:>11.1f} {failed:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+GET /api/receipts/?q=: full-text search (FTS5 on SQLite) against a LIKE scan of the user's receipts.
+
+Usage (from backend/):
+    python -m benchmarks.bench_search [--receipts 1000000] [--users 1000] [--heavy 100000] [--repeat 20] [--plans]
+
+The receipts come from seed_data's generator and are spread over --users users, except that one
+"heavy" user owns --heavy of them. Searches run through the view (ranked first page of 50, response
+cache off) for a typical user and for the heavy one; "index ms" is the ranked id lookup alone, the rest
+of "view ms" is loading and serializing the page. The LIKE column is the unindexed way to get a page of
+ids: store_name / items ICONTAINS over the user's receipts, newest first (it can stop after 50 matches,
+so it is only slow when few receipts match).
+Runs on an in-memory SQLite database (FTS5) by default; set DATABASE_URL to a scratch Postgres database
+for the tsvector index (a test database is created next to it and dropped afterwards). There, "no user idx"
+is the index lookup again with migration 0015's user_id index dropped, and --plans prints the query plans.
+"""
+import argparse
+import random
+import time
+from datetime import date
+
+from benchmarks import _django
+
+_django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.db.models import Q  # noqa: E402
+from django.test import override_settings  # noqa: E402
+from rest_framework.test import APIRequestFactory, force_authenticate  # noqa: E402
+from benchmarks.bench_stats import timed  # noqa: E402
+from igaveapp.items import sync_items  # noqa: E402
+from igaveapp.management.commands.seed_data import fake_receipt  # noqa: E402
+from igaveapp.models import Receipt  # noqa: E402
+from igaveapp.search import SEARCH_TABLE, index_receipts, search_receipt_ids  # noqa: E402
+from igaveapp.views import ReceiptViewSet  # noqa: E402
+
+QUERIES = ["milk", "oat milk", "starbucks", "vitamins", "fitness", "zzz"]
+CHUNK = 10_000
+
+
+def seed(users, heavy, count, rng):
+    """count receipts: `heavy` of them for users[0], the rest spread evenly over the others."""
+    owners = [users[0].id] * heavy + [users[1 + n % (len(users) - 1)].id for n in range(count - heavy)]
+    rng.shuffle(owners)
+    started = time.perf_counter()
+    for start in range(0, count, CHUNK):
+        receipts = [fake_receipt(rng, user_id, date(2026, 6, 30), 3650) for user_id in owners[start:start + CHUNK]]
+        Receipt.objects.bulk_create(receipts, batch_size=1000)
+        sync_items(receipts, replace=False)
+        index_receipts(receipts)
+        print(f"  seeded {start + len(receipts):,} receipts ({time.perf_counter() - started:.0f}s)", end="\r")
+    print()
+
+
+def search(user, query):
+    request = APIRequestFactory().get("/api/receipts/", {"q": query})
+    force_authenticate(request, user=user)
+    return ReceiptViewSet.as_view({"get": "list"})(request).data
+
+
+def like_scan(user, query):
+    receipts = Receipt.objects.filter(user=user)
+    for term in query.split():
+        receipts = receipts.filter(Q(store_name__icontains=term) | Q(items__icontains=term))
+    return list(receipts.order_by('-date', '-id').values_list('id', flat=True)[:50])
+
+
+def set_user_index(enabled):
+    """Drops / restores the PostgreSQL search table's user_id index (migration 0015)."""
+    with connection.cursor() as cursor:
+        if enabled:
+            cursor.execute(f"CREATE INDEX receiptsearch_user_idx ON {SEARCH_TABLE} (user_id)")
+        else:
+            cursor.execute("DROP INDEX receiptsearch_user_idx")
+        cursor.execute(f"ANALYZE {SEARCH_TABLE}")
+
+
+def plan(user, query):
+    """EXPLAIN ANALYZE of the PostgreSQL search query, as search_receipt_ids() runs it."""
+    tsquery = ' & '.join(f"'{term}':*" for term in query.split())
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"EXPLAIN ANALYZE SELECT receipt_id FROM {SEARCH_TABLE}, to_tsquery('simple', %s) query "
+            "WHERE user_id = %s AND document @@ query ORDER BY ts_rank(document, query) DESC, receipt_id DESC LIMIT %s",
+            [tsquery, user.pk, 1000],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--receipts", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--heavy", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--plans", action="store_true", help="Print the PostgreSQL query plans")
+    args = parser.parse_args()
+
+    rng = random.Random(13)
+    no_cache = {"ENABLED": False, "ALIAS": "responses", "TTL": 300}
+    with _django.test_database(), override_settings(ALLOWED_HOSTS=["testserver"], RESPONSE_CACHE=no_cache):
+        users = User.objects.bulk_create([User(username=f"searcher{n}") for n in range(args.users)])
+        seed(users, args.heavy, args.receipts, rng)
+        typical = users[1]
+        print(f"{args.receipts:,} receipts; typical user {Receipt.objects.filter(user=typical).count():,}, "
+              f"heavy user {args.heavy:,}")
+
+        postgres = connection.vendor == 'postgresql'
+        if postgres:
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+
+        rows = []
+        for name, user in (("typical", typical), ("heavy", users[0])):
+            for query in QUERIES:
+                index_ms, ids = timed(lambda: search_receipt_ids(user, query), args.repeat)
+                view_ms, _ = timed(lambda: search(user, query), args.repeat)
+                like_ms, _ = timed(lambda: like_scan(user, query), max(1, args.repeat // 4))
+                rows.append([name, user, query, len(ids), index_ms, view_ms, like_ms])
+                if args.plans and postgres:
+                    print(f"[{name} {query!r}]", *plan(user, query), sep="\n  ")
+
+        if postgres:
+            set_user_index(False)
+            for row in rows:
+                row.append(timed(lambda: search_receipt_ids(row[1], row[2]), args.repeat)[0])
+                if args.plans:
+                    print(f"[{row[0]} {row[2]!r}, no user index]", *plan(row[1], row[2]), sep="\n  ")
+            set_user_index(True)
+
+        print(f"{'user':<8} {'query':<10} {'matches':>8} {'index ms':>9} {'view ms':>8} {'LIKE ms':>8}"
+              + (f" {'no user idx':>12}" if postgres else ""))
+        for name, user, query, matches, index_ms, view_ms, like_ms, *without in rows:
+            print(f"{name:<8} {query:<10} {matches:>8,} {index_ms:>9.2f} {view_ms:>8.2f} {like_ms:>8.2f}"
+                  + "".join(f" {ms:>12.2f}" for ms in without))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+/api/receipts/stats/: aggregating the receipts on every call against summing the SpendingRollup buckets.
+
+Usage (from backend/):
+    python -m benchmarks.bench_stats [--receipts 10000 100000 400000] [--repeat 20] [--saves 500]
+
+One user owns all the receipts (spread over ~10 years). The raw path is STATS_FROM_ROLLUPS=False;
+both paths answer through the view, and their answers are checked to be equal before timing.
+Also reports what the rollup signals add to a single Receipt save.
+"""
+import argparse
+import datetime
+import random
+import statistics
+import time
+
+from benchmarks import _django
+
+_django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.db.models.signals import post_save, pre_save  # noqa: E402
+from django.test import override_settings  # noqa: E402
+from rest_framework.test import APIRequestFactory, force_authenticate  # noqa: E402
+from igaveapp import rollups  # noqa: E402
+from igaveapp.models import Receipt  # noqa: E402
+from igaveapp.views import ReceiptViewSet  # noqa: E402
+
+CATEGORIES = [choice for choice, label in Receipt.CATEGORY_CHOICES]
+START = datetime.date(2016, 1, 1)
+
+QUERIES = {
+    "month": {"month": "2024-03"},
+    "year": {"year": "2023"},
+    "5 years": {"start": "2019-02-11", "end": "2024-02-10"},
+    "all time": {},
+}
+
+
+def seed(user, count, rng):
+    Receipt.objects.bulk_create([
+        Receipt(
+            user=user,
+            store_name=f"Store {rng.randint(1, 400)}",
+            date=START + datetime.timedelta(days=rng.randint(0, 3650)),
+            total_amount=f"{rng.uniform(1, 300):.2f}",
+            category=rng.choice(CATEGORIES),
+        )
+        for _ in range(count)
+    ], batch_size=5000)
+    rollups.rebuild_rollups([user.id])
+
+
+def stats(user, params):
+    request = APIRequestFactory().get("/api/receipts/stats/", params)
+    force_authenticate(request, user=user)
+    return ReceiptViewSet.as_view({"get": "get_stats"})(request).data
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), result
+
+
+def time_saves(user, count, rng):
+    def save_all():
+        start = time.perf_counter()
+        for _ in range(count):
+            Receipt.objects.create(user=user, store_name="Bench", total_amount="9.99", category=rng.choice(CATEGORIES),
+                                   date=START + datetime.timedelta(days=rng.randint(0, 3650)))
+        return (time.perf_counter() - start) * 1000 / count
+
+    with_rollups = save_all()
+    pre_save.disconnect(rollups.remember_rollup_contribution, sender=Receipt)
+    post_save.disconnect(rollups.update_rollups_on_save, sender=Receipt)
+    try:
+        without = save_all()
+    finally:
+        pre_save.connect(rollups.remember_rollup_contribution, sender=Receipt)
+        post_save.connect(rollups.update_rollups_on_save, sender=Receipt)
+    return without, with_rollups
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--receipts", type=int, nargs="+", default=[10_000, 100_000, 400_000])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--saves", type=int, default=500)
+    args = parser.parse_args()
+
+    rng = random.Random(13)
+    with _django.test_database():
+        user = User.objects.create(username="long_history")
+        seeded = 0
+        print(f"{'receipts':>9} {'filter':<9} {'raw ms':>8} {'rollup ms':>10} {'speed-up':>9}")
+        for total in sorted(args.receipts):
+            seed(user, total - seeded, rng)
+            seeded = total
+            for name, params in QUERIES.items():
+                fast_ms, fast = timed(lambda: stats(user, params), args.repeat)
+                with override_settings(STATS_FROM_ROLLUPS=False):
+                    raw_ms, raw = timed(lambda: stats(user, params), args.repeat)
+                # SQLite sums decimals as floats, so the raw total can be off by float noise
+                assert round(fast["total_spent"], 2) == round(raw["total_spent"], 2), f"{name}: answers differ"
+                print(f"{total:>9,} {name:<9} {raw_ms:>8.2f} {fast_ms:>10.2f} {raw_ms / fast_ms:>8.1f}x")
+
+        without, with_rollups = time_saves(user, args.saves, rng)
+        print()
+        print(f"Receipt save: {without:.3f} ms without the rollup signals, {with_rollups:.3f} ms with them")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Spending-over-time chart data: one /stats/?month= call per month against one /stats/timeseries/ call.
+
+Usage (from backend/):
+    python -m benchmarks.bench_timeseries [--receipts 10000 100000 400000] [--repeat 10]
+
+Same seeding as bench_stats (one user, ~10 years of receipts). "12 x stats" is what the dashboard
+had to do to draw a year; the timeseries rows are one call each, from the rollups and (with
+STATS_FROM_ROLLUPS=False) from the receipts. Times are per chart, through the view.
+"""
+import argparse
+import random
+
+from benchmarks import _django
+
+_django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.test import override_settings  # noqa: E402
+from rest_framework.test import APIRequestFactory, force_authenticate  # noqa: E402
+from benchmarks.bench_stats import seed, timed  # noqa: E402
+from igaveapp.views import ReceiptViewSet  # noqa: E402
+
+CHARTS = {
+    "12 months": {"granularity": "month", "start": "2023-01-01", "end": "2023-12-31"},
+    "52 weeks": {"granularity": "week", "start": "2023-01-02", "end": "2023-12-31"},
+    "365 days": {"granularity": "day", "start": "2023-01-01", "end": "2023-12-31"},
+    "10 years": {"granularity": "month", "start": "2016-01-01", "end": "2025-12-31"},
+}
+
+
+def call(user, action, params):
+    request = APIRequestFactory().get("/api/receipts/stats/", params)
+    force_authenticate(request, user=user)
+    return ReceiptViewSet.as_view({"get": action})(request).data
+
+
+def monthly_stats(user):
+    return [call(user, "get_stats", {"month": f"2023-{month:02d}"})["total_spent"] for month in range(1, 13)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--receipts", type=int, nargs="+", default=[10_000, 100_000, 400_000])
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = random.Random(13)
+    with _django.test_database():
+        user = User.objects.create(username="long_history")
+        seeded = 0
+        print(f"{'receipts':>9} {'chart':<10} {'12 x stats ms':>14} {'raw ms':>8} {'rollup ms':>10}")
+        for total in sorted(args.receipts):
+            seed(user, total - seeded, rng)
+            seeded = total
+
+            per_month_ms, per_month = timed(lambda: monthly_stats(user), args.repeat)
+            for name, params in CHARTS.items():
+                fast_ms, fast = timed(lambda: call(user, "get_timeseries", params), args.repeat)
+                with override_settings(STATS_FROM_ROLLUPS=False):
+                    raw_ms, raw = timed(lambda: call(user, "get_timeseries", params), args.repeat)
+                assert [round(t, 2) for t in fast["totals"]] == [round(t, 2) for t in raw["totals"]], name
+                if name == "12 months":
+                    assert [round(t, 2) for t in fast["totals"]] == [round(t, 2) for t in per_month], name
+                    baseline = f"{per_month_ms:>14.2f}"
+                else:
+                    baseline = f"{'':>14}"
+                print(f"{total:>9,} {name:<10} {baseline} {raw_ms:>8.2f} {fast_ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Per-scan memory and latency: the old temp-file round trip against passing the upload
+straight to extract_receipt_data.
+
+Usage (from backend/):
+    python -m benchmarks.bench_upload [--sizes-mb 1 4 12] [--repeat 10]
+
+Vision is replaced by a stub that still materializes the payload bytes (as the real request
+does), and the OCR cache is off, so only the upload handling differs between the two runs.
+Uploads at or below FILE_UPLOAD_MAX_MEMORY_SIZE are in-memory; larger ones are on disk.
+"""
+import argparse
+import contextlib
+import os
+import tempfile
+import time
+import tracemalloc
+from io import BytesIO
+from unittest.mock import patch
+
+from benchmarks import _django
+
+_django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.core.files.uploadedfile import InMemoryUploadedFile, TemporaryUploadedFile  # noqa: E402
+from django.test.utils import override_settings  # noqa: E402
+from igaveapp.ocr import extract_receipt_data  # noqa: E402
+
+
+def fake_detect_text(content):
+    bytes(content)  # the Vision request needs its own copy of the image
+    return "Walmart\n12/05/2023\nMilk 3.48\nTOTAL 3.48"
+
+
+def make_upload(payload):
+    if len(payload) <= settings.FILE_UPLOAD_MAX_MEMORY_SIZE:
+        return InMemoryUploadedFile(BytesIO(payload), "file", "r.jpg", "image/jpeg", len(payload), None)
+    upload = TemporaryUploadedFile("r.jpg", "image/jpeg", len(payload), None)
+    upload.write(payload)
+    upload.flush()
+    upload.seek(0)
+    return upload
+
+
+def scan_via_temp_file(upload):
+    """What analyze_receipt used to do."""
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as temp_file:
+        for chunk in upload.chunks():
+            temp_file.write(chunk)
+        temp_file_path = temp_file.name
+    try:
+        return extract_receipt_data(temp_file_path)
+    finally:
+        if os.path.exists(temp_file_path):
+            os.remove(temp_file_path)
+
+
+def scan_direct(upload):
+    return extract_receipt_data(upload)
+
+
+def measure(scan, payload, repeat):
+    best = float("inf")
+    peak = 0
+    with open(os.devnull, "w") as sink, contextlib.redirect_stdout(sink):
+        for _ in range(repeat):
+            upload = make_upload(payload)
+            tracemalloc.start()
+            start = time.perf_counter()
+            scan(upload)
+            best = min(best, time.perf_counter() - start)
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+            upload.close()
+    return best, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes-mb", type=float, nargs="+", default=[0.5, 2, 4, 12])
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'size':>8} {'storage':>8} {'temp-file ms':>13} {'direct ms':>10} "
+          f"{'temp-file peak':>15} {'direct peak':>12}")
+    with override_settings(OCR_CACHE={"BACKEND": "none"}), patch("igaveapp.ocr.detect_text", fake_detect_text):
+        for size_mb in args.sizes_mb:
+            payload = os.urandom(int(size_mb * 1024 * 1024))
+            storage = "memory" if len(payload) <= settings.FILE_UPLOAD_MAX_MEMORY_SIZE else "disk"
+            old_time, old_peak = measure(scan_via_temp_file, payload, args.repeat)
+            new_time, new_peak = measure(scan_direct, payload, args.repeat)
+            print(f"{size_mb:>6.1f}MB {storage:>8} {old_time * 1000:>13.2f} {new_time * 1000:>10.2f} "
+                  f"{old_peak / 2**20:>13.2f}MB {new_peak / 2**20:>10.2f}MB")
+
+
+if __name__ == "__main__":
+    main()
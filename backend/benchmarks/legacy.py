@@ -0,0 +1,333 @@
+"""
+Frozen copies of code paths that were replaced for performance.
+The benchmarks run them side by side with the current code; nothing in the app imports this.
+"""
+import re
+from datetime import datetime
+
+from igaveapp.parsing import (
+    BLACKLIST_RE, DATE_FORMATS, DATE_SUFFIX_RE, NUMBERS_ONLY_RE, PRICE_ONLY_RE, SINGLE_LINE_ITEM_RE, _label,
+    find_vendor_index, parse_date, parse_total,
+)
+
+
+def legacy_parse_fields(full_text):
+    """extract_receipt_data steps A-D (vendor, date, total, items) as they were before the parsing engine."""
+    lines = full_text.split('\n')
+    data = {
+        "vendor": None,
+        "date": None,
+        "total": None,
+        "category": "general",
+        "items": []
+    }
+
+    date_pattern = (
+        r'(?i)(\d{1,2}[./-]\d{1,2}[./-]\d{2,4}|\d{4}-\d{2}-\d{2}'
+        r'|(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*[\s.,-]+\d{1,2}[a-z]{0,2}[\s.,-]+\d{2,4}'
+        r'|\d{1,2}[\s.,-]+(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*[\s.,-]+\d{2,4})'
+    )
+    total_pattern = r'(?i)(total|amount|balance|due|grand total)\s*[:$]?\s*(\d+[.,]\d{2})'
+    blacklist_words = ["total", "subtotal", "tax", "vat", "change", "cash", "due", "balance", "visa", "mastercard",
+                       "date"]
+
+    date_matches = re.findall(date_pattern, full_text)
+    if date_matches:
+        raw_date = date_matches[0]
+        clean_date = re.sub(r'(st|nd|rd|th|,)', '', raw_date).strip()
+        formats_to_try = [
+            "%m/%d/%Y", "%m-%d-%Y", "%m.%d.%Y",
+            "%Y-%m-%d",
+            "%b %d %Y", "%B %d %Y",
+            "%d %b %Y", "%d %B %Y",
+            "%m/%d/%y", "%m-%d-%y"
+        ]
+        for fmt in formats_to_try:
+            try:
+                dt_obj = datetime.strptime(clean_date, fmt)
+                data['date'] = dt_obj.strftime("%Y-%m-%d")
+                print(f" Date Fixed: {raw_date} -> {data['date']}")
+                break
+            except ValueError:
+                continue
+        if not data['date']:
+            data['date'] = raw_date
+
+    ignored_vendor_words = ["welcome", "receipt", "copy", "customer", "transaction", "original", "date"]
+    for line in lines[:6]:
+        clean_line = line.strip()
+        if not clean_line or len(clean_line) < 2:
+            continue
+        if re.search(date_pattern, clean_line):
+            continue
+        if any(word in clean_line.lower() for word in ignored_vendor_words):
+            continue
+        if re.search(r'\d{3}[-.]\d{3}[-.]\d{4}', clean_line):
+            continue
+        if re.match(r'^\$?\d+[.,]\d{2}$', clean_line):
+            continue
+        data['vendor'] = clean_line
+        break
+    if not data['vendor']:
+        data['vendor'] = "Unknown Vendor"
+
+    total_match = re.search(total_pattern, full_text)
+    if total_match:
+        data['total'] = total_match.group(2).replace(',', '.')
+    else:
+        all_prices = re.findall(r'\$?\s*(\d+\.\d{2})', full_text)
+        if all_prices:
+            try:
+                floats = [float(p) for p in all_prices]
+                data['total'] = str(max(floats))
+            except ValueError:
+                pass
+
+    print("\n --- DEBUG: MATCHMAKER MODE ---")
+    single_line_pattern = r'(.+?)\s+[$]?(\d+[.,]\d{2})$'
+    price_only_pattern = r'^[$]?\s*(\d+[.,]\d{2})$'
+
+    i = 0
+    while i < len(lines):
+        line = lines[i].strip()
+        if not line:
+            i += 1
+            continue
+
+        print(f"Line {i}: '{line}'", end=" ... ")
+
+        match = re.search(single_line_pattern, line)
+        if match:
+            item_name = match.group(1).strip()
+            item_price = match.group(2).replace(',', '.')
+            if any(bad in item_name.lower() for bad in blacklist_words):
+                print(" Ignored (Blacklist)")
+            elif data['date'] and data['date'] in item_name:
+                print(" Ignored (Date)")
+            else:
+                print(f" MATCH (Single Line)! {item_name} -> {item_price}")
+                data['items'].append({"name": item_name, "price": float(item_price)})
+            i += 1
+            continue
+
+        if i + 1 < len(lines):
+            next_line = lines[i + 1].strip()
+            price_match = re.match(price_only_pattern, next_line)
+            if price_match:
+                item_name = line
+                item_price = price_match.group(1).replace(',', '.')
+                if any(bad in item_name.lower() for bad in blacklist_words):
+                    print(" Ignored (Blacklist)")
+                elif re.match(r'^[\d\W]+$', item_name):
+                    print(" Ignored (Just Numbers)")
+                    i += 1
+                    continue
+                else:
+                    print(f" MATCH (Split Line)! {item_name} -> {item_price}")
+                    data['items'].append({"name": item_name, "price": float(item_price)})
+                    i += 2
+                    continue
+
+        print(" No match")
+        i += 1
+
+    print(" --- END DEBUG ---\n")
+    return data
+
+
+def legacy_export_csv(queryset):
+    """ReceiptViewSet.export_csv before streaming: the whole report in one HttpResponse, one model per row."""
+    import csv
+    from django.http import HttpResponse
+
+    response = HttpResponse(content_type='text/csv')
+    response['Content-Disposition'] = 'attachment; filename="iSave_Report.csv"'
+
+    response.write(u'\ufeff'.encode('utf8'))
+    writer = csv.writer(response)
+    writer.writerow(['Date', 'Store Name', 'Category', 'Amount', 'Status'])
+
+    for r in queryset.order_by('-date'):
+        formatted_date = r.date.strftime("%d %b %Y") if r.date else "N/A"
+        formatted_amount = f"${r.total_amount:.2f}" if r.total_amount else "$0.00"
+
+        writer.writerow([
+            formatted_date,
+            r.store_name,
+            r.get_category_display(),
+            formatted_amount,
+            r.get_status_display()
+        ])
+
+    return response
+
+
+def legacy_categorize(data):
+    """parsing.categorize() before the categorizer: the keyword dict rebuilt and scanned with any() on every call."""
+    categories = {
+        'food': [
+            'burger', 'pizza', 'restaurant', 'cafe', 'coffee', 'grill', 'kitchen', 'food', 'market',
+            'diner', 'bistro', 'steak', 'mcdonalds', 'kfc', 'starbucks', 'subway', 'wendys', 'taco bell',
+            'dunkin', 'chipotle', 'domino', 'meal', 'bread', 'bakery', 'sushi'
+        ],
+        'transport': [
+            'uber', 'lyft', 'taxi', 'shell', 'exxon', 'bp', 'chevron', 'fuel', 'gas', 'station',
+            'train', 'metro', 'bus', 'airline', 'flight', 'parking', 'garage'
+        ],
+        'utilities': [
+            'water', 'electric', 'power', 'energy', 'internet', 'wifi', 'telecom', 'mobile',
+            'at&t', 'verizon', 't-mobile', 'comcast', 'bill', 'insurance'
+        ],
+        'shopping': [
+            'amazon', 'walmart', 'target', 'ikea', 'mall', 'shop', 'clothing', 'shoes', 'apparel',
+            'nike', 'adidas', 'zara', 'h&m', 'retail', 'outlet', 'boutique', 'book'
+        ],
+
+        'entertainment': [
+            'cinema', 'movie', 'theatre', 'netflix', 'spotify', 'ticket', 'event', 'bowling',
+            'golf', 'game', 'concert', 'museum'
+        ],
+        'health': [
+            'pharmacy', 'cvs', 'walgreens', 'hospital', 'clinic', 'doctor', 'dental', 'gym',
+            'fitness', 'medicine', 'drug'
+        ]
+    }
+
+    # Helper to check text against keywords
+    def check_category(text):
+        if not text:
+            return None
+        text = text.lower()
+
+        # Check explicit keywords
+        for cat, keywords in categories.items():
+            if any(keyword in text for keyword in keywords):
+                return cat
+        return None
+
+    # 1. Check Vendor First (High Priority)
+    cat_match = check_category(data['vendor'])
+
+    # 2. If no vendor match, check the first few items
+    if not cat_match:
+        for item in data['items'][:5]:  # Check first 5 items
+            cat_match = check_category(item['name'])
+            if cat_match:
+                break
+
+    if cat_match:
+        data['category'] = cat_match
+    return data
+
+
+def _print_normalize_date(raw_date):
+    """parsing.normalize_date() with its print()."""
+    clean_date = DATE_SUFFIX_RE.sub('', raw_date).strip()
+    for fmt in DATE_FORMATS:
+        try:
+            normalized = datetime.strptime(clean_date, fmt).strftime("%Y-%m-%d")
+            print(f" Date Fixed: {raw_date} -> {normalized}")
+            return normalized
+        except ValueError:
+            continue
+    return raw_date
+
+
+def _print_classify_lines(lines, date_value=None):
+    """parsing.classify_lines() as it was with the MATCHMAKER debug prints."""
+    stripped = [line.strip() for line in lines]
+    count = len(stripped)
+    labels = ["noise"] * count
+    items = []
+
+    vendor_index = find_vendor_index(stripped)
+
+    # --- Items (THE MATCHMAKER) ---
+    print("\n --- DEBUG: MATCHMAKER MODE ---")
+    i = 0
+    while i < count:
+        line = stripped[i]
+        if not line:
+            i += 1
+            continue
+
+        print(f"Line {i}: '{line}'", end=" ... ")
+
+        # Check 1: Single Line Item (a price always ends in a digit, so skip the regex otherwise)
+        match = SINGLE_LINE_ITEM_RE.match(line) if line[-1].isdecimal() else None
+        if match:
+            item_name = match.group(1).strip()
+            item_price = match.group(2).replace(',', '.')
+
+            if BLACKLIST_RE.search(item_name.lower()):
+                print(" Ignored (Blacklist)")
+                labels[i] = _label(line)
+            elif date_value and date_value in item_name:
+                print(" Ignored (Date)")
+                labels[i] = "date"
+            else:
+                print(f" MATCH (Single Line)! {item_name} -> {item_price}")
+                items.append({"name": item_name, "price": float(item_price)})
+                labels[i] = "item"
+            i += 1
+            continue
+
+        # Check 2: Split Line Item
+        if i + 1 < count:
+            next_line = stripped[i + 1]
+            price_match = PRICE_ONLY_RE.match(next_line) if next_line[-1:].isdecimal() else None
+
+            if price_match:
+                if BLACKLIST_RE.search(line.lower()):
+                    print(" Ignored (Blacklist)")
+                elif NUMBERS_ONLY_RE.match(line):
+                    print(" Ignored (Just Numbers)")
+                    labels[i] = _label(line)
+                    i += 1
+                    continue
+                else:
+                    item_price = price_match.group(1).replace(',', '.')
+                    print(f" MATCH (Split Line)! {line} -> {item_price}")
+                    items.append({"name": line, "price": float(item_price)})
+                    labels[i] = labels[i + 1] = "split-item"
+                    i += 2
+                    continue
+
+        print(" No match")
+        labels[i] = _label(line)
+        i += 1
+
+    print(" --- END DEBUG ---\n")
+
+    if vendor_index is not None and labels[vendor_index] == "noise":
+        labels[vendor_index] = "vendor"
+    return labels, items, vendor_index
+
+
+def legacy_print_parse_fields(full_text):
+    """parse_receipt_fields() before the logging change: every date fix and line decision print()ed."""
+    data = {
+        "vendor": None,
+        "date": None,
+        "total": None,
+        "category": "general",  # Default value
+        "items": []
+    }
+
+    # --- A. DATE (Smart & Standardized) ---
+    raw_date = parse_date(full_text)
+    if raw_date:
+        data['date'] = _print_normalize_date(raw_date)
+
+    # --- B. VENDOR + D. ITEMS (one pass over the lines) ---
+    lines = full_text.split('\n')
+    labels, items, vendor_index = _print_classify_lines(lines, data['date'])
+    data['vendor'] = lines[vendor_index].strip() if vendor_index is not None else "Unknown Vendor"
+    data['items'] = items
+
+    # --- C. TOTAL ---
+    total = parse_total(full_text)
+    if total is not None:
+        data['total'] = str(total)
+
+    return data
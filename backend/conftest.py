@@ -0,0 +1,10 @@
+import pytest
+from django.core.cache import caches
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Every test starts with empty caches: user ids are reused from one test to the next."""
+    for cache in caches.all():
+        cache.clear()
+    yield
@@ -3,6 +3,7 @@ from pathlib import Path
 from datetime import timedelta
 from dotenv import load_dotenv
 import dj_database_url
+from django.core.exceptions import ImproperlyConfigured
 
 # Load environment variables
 load_dotenv()
@@ -75,6 +76,128 @@ REST_FRAMEWORK = {
     ]
 }
 
+# GET /api/receipts/ is cursor-paginated: ?page_size= up to RECEIPT_MAX_PAGE_SIZE, follow "next"
+RECEIPT_PAGE_SIZE = int(os.getenv('RECEIPT_PAGE_SIZE', '50'))
+RECEIPT_MAX_PAGE_SIZE = int(os.getenv('RECEIPT_MAX_PAGE_SIZE', '200'))
+
+# /api/receipts/bulk/: most receipts one create / update / delete request may carry
+RECEIPT_BULK_MAX_ITEMS = int(os.getenv('RECEIPT_BULK_MAX_ITEMS', '1000'))
+
+# /api/receipts/stats/ sums the precomputed SpendingRollup buckets (False = aggregate the receipts every time)
+STATS_FROM_ROLLUPS = os.getenv('STATS_FROM_ROLLUPS', 'True') == 'True'
+
+# Per-user cache of GET /api/receipts/, /stats/ and /stats/timeseries/ responses (igaveapp/response_cache.py),
+# dropped whenever the user's receipts change. A write only drops the entries of the cache it reaches, so the
+# cache must be shared by every process serving the API: with local memory (the default backend), a second
+# gunicorn worker (WEB_CONCURRENCY) would keep serving what it cached before the write until the TTL ran out.
+# The cache is therefore on by default only with a shared RESPONSE_CACHE_BACKEND (Redis, Memcached, database),
+# e.g. django.core.cache.backends.redis.RedisCache with RESPONSE_CACHE_LOCATION=redis://host:6379/1,
+# or in DEBUG (runserver is a single process); enabling it on local memory with DEBUG off is an error.
+LOCAL_MEMORY_CACHE = 'django.core.cache.backends.locmem.LocMemCache'
+RESPONSE_CACHE_BACKEND = os.getenv('RESPONSE_CACHE_BACKEND', LOCAL_MEMORY_CACHE)
+RESPONSE_CACHE_SHARED = RESPONSE_CACHE_BACKEND != LOCAL_MEMORY_CACHE
+CACHES = {
+    'default': {
+        'BACKEND': LOCAL_MEMORY_CACHE,
+    },
+    'responses': {
+        'BACKEND': RESPONSE_CACHE_BACKEND,
+        'LOCATION': os.getenv('RESPONSE_CACHE_LOCATION', 'igave-responses'),
+    },
+}
+RESPONSE_CACHE = {
+    'ENABLED': os.getenv('RESPONSE_CACHE', str(RESPONSE_CACHE_SHARED or DEBUG)) == 'True',
+    'ALIAS': 'responses',
+    'TTL': int(os.getenv('RESPONSE_CACHE_TTL', '300')),  # seconds
+}
+if RESPONSE_CACHE['ENABLED'] and not RESPONSE_CACHE_SHARED and not DEBUG:
+    raise ImproperlyConfigured(
+        "RESPONSE_CACHE needs a RESPONSE_CACHE_BACKEND shared by all workers (e.g. Redis) when DEBUG is off"
+    )
+
+# Scan drafts take the category the user gives the store on their verified receipts (igaveapp/store_memory.py).
+# Each process keeps that memory under per-user versions held in the response cache's backend, so it is kept
+# only where that backend is shared (or in DEBUG); otherwise every scan reads it from the database.
+STORE_MEMORY_CACHED = RESPONSE_CACHE_SHARED or DEBUG
+
+# Background scan jobs (POST /api/receipts/scan/?async=true)
+# SCAN_JOB_WORKERS=0 runs the scan inline, which is handy for tests and local dev.
+SCAN_JOB_WORKERS = int(os.getenv('SCAN_JOB_WORKERS', '2'))
+SCAN_JOB_QUEUE_SIZE = int(os.getenv('SCAN_JOB_QUEUE_SIZE', '20'))
+# Jobs are kept TTL seconds; one still queued or running after TIMEOUT seconds (its worker died) is failed.
+SCAN_JOB_TTL = int(os.getenv('SCAN_JOB_TTL', str(60 * 60 * 24)))
+SCAN_JOB_TIMEOUT = int(os.getenv('SCAN_JOB_TIMEOUT', '600'))
+
+# Background exports (POST /api/receipts/export/jobs/?as=xlsx): files are written to DIR and kept TTL seconds.
+# WORKERS=0 writes the file inline.
+EXPORT_JOBS = {
+    'DIR': os.getenv('EXPORT_JOB_DIR', str(BASE_DIR / 'exports')),
+    'WORKERS': int(os.getenv('EXPORT_JOB_WORKERS', '1')),
+    'QUEUE_SIZE': int(os.getenv('EXPORT_JOB_QUEUE_SIZE', '10')),
+    'TTL': int(os.getenv('EXPORT_JOB_TTL', str(60 * 60 * 24))),
+}
+
+# OCR result cache, keyed by a SHA-256 of the uploaded image.
+# BACKEND: "memory" (per-process LRU), "database", "file" (LOCATION folder) or "none".
+OCR_CACHE = {
+    'BACKEND': os.getenv('OCR_CACHE_BACKEND', 'memory'),
+    'TTL': int(os.getenv('OCR_CACHE_TTL', str(60 * 60 * 24 * 30))),  # seconds
+    'MAX_ENTRIES': int(os.getenv('OCR_CACHE_MAX_ENTRIES', '1000')),
+    'MAX_BYTES': int(os.getenv('OCR_CACHE_MAX_BYTES', str(20 * 1024 * 1024))),
+    'LOCATION': os.getenv('OCR_CACHE_DIR', str(BASE_DIR / 'ocr_cache')),
+}
+
+# OCR engine: "google" (Cloud Vision), "tesseract" (local, needs pytesseract + the tesseract binary)
+# or "fake" (canned text from FIXTURES after LATENCY_MS, for tests and load tests without network)
+OCR_BACKEND = {
+    'ENGINE': os.getenv('OCR_BACKEND', 'google'),
+    'LANG': os.getenv('OCR_TESSERACT_LANG', 'eng'),  # tesseract
+    'TESSERACT_CMD': os.getenv('OCR_TESSERACT_CMD'),  # tesseract, when not on PATH
+    'FIXTURES': os.getenv('OCR_FAKE_FIXTURES', str(BASE_DIR / 'igaveapp' / 'testdata' / 'receipts')),  # fake
+    'LATENCY_MS': int(os.getenv('OCR_FAKE_LATENCY_MS', '0')),  # fake
+    'JITTER_MS': int(os.getenv('OCR_FAKE_JITTER_MS', '0')),  # fake
+}
+
+# Image preprocessing before OCR: EXIF rotate, grayscale, shrink to MAX_EDGE px, re-encode
+OCR_PREPROCESS = {
+    'ENABLED': os.getenv('OCR_PREPROCESS', 'True') == 'True',
+    'MAX_EDGE': int(os.getenv('OCR_PREPROCESS_MAX_EDGE', '2048')),
+    'GRAYSCALE': True,
+    'FORMAT': os.getenv('OCR_PREPROCESS_FORMAT', 'JPEG'),  # JPEG or PNG
+    'QUALITY': int(os.getenv('OCR_PREPROCESS_QUALITY', '85')),
+}
+
+# PDF uploads (bills, e-invoices): pages are rendered at DPI and OCR'd WORKERS at a time
+OCR_PDF = {
+    'DPI': int(os.getenv('OCR_PDF_DPI', '200')),
+    'MAX_PAGES': int(os.getenv('OCR_PDF_MAX_PAGES', '20')),
+    'WORKERS': int(os.getenv('OCR_PDF_WORKERS', '4')),
+}
+
+# POST /api/receipts/scan/batch/: images are sent to Vision up to 16 per batch_annotate_images call
+# (USE_BATCH_API=False sends one call per image), WORKERS calls in flight at a time
+OCR_BATCH = {
+    'MAX_FILES': int(os.getenv('OCR_BATCH_MAX_FILES', '50')),
+    'WORKERS': int(os.getenv('OCR_BATCH_WORKERS', '4')),
+    'USE_BATCH_API': os.getenv('OCR_BATCH_USE_BATCH_API', 'True') == 'True',
+}
+
+# App logs (OCR failures at WARNING, scans at INFO, every parsing decision at DEBUG) go to stderr.
+# Only warnings by default; for one scan's decisions, POST /api/receipts/scan/?trace=true instead.
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'plain': {'format': '%(asctime)s %(levelname)s %(name)s %(message)s'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'plain'},
+    },
+    'loggers': {
+        'igaveapp': {'handlers': ['console'], 'level': os.getenv('IGAVE_LOG_LEVEL', 'WARNING'), 'propagate': False},
+    },
+}
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
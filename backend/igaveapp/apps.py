@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class IgaveappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'igaveapp'
+
+    def ready(self):
+        # Receipt signals that keep the spending rollups, the line items, the search index, the response
+        # cache and the scans' store memory up to date
+        from . import rollups, items, search, response_cache, store_memory  # noqa: F401
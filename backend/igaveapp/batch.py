@@ -0,0 +1,125 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from .ocr import VISION_BATCH_LIMIT, cache_key, open_image, prepare_image, scan_pdf, parse_receipt_text
+from .ocr_backends import get_ocr_backend
+from .ocr_cache import get_ocr_cache, image_hash
+from .pdf import is_pdf
+
+logger = logging.getLogger(__name__)
+
+# Keep each batch_annotate_images request well under Vision's 10 MB payload limit
+MAX_BATCH_BYTES = 8 * 1024 * 1024
+
+
+def _ocr_images(backend, contents):
+    """Worker: preprocesses a chunk of images and OCRs them, in one round trip when the backend can batch."""
+    prepared = [prepare_image(content) for content in contents]
+    texts = backend.batch_detect_text(prepared) if len(prepared) > 1 else None
+    if texts is None:
+        texts = [backend.detect_text(content) for content in prepared]
+    return [(text, None) for text in texts]
+
+
+def _ocr_pdf(content):
+    """Worker: OCRs every page of a PDF (pages get their own pool inside scan_pdf)."""
+    try:
+        return [scan_pdf(content)]
+    except Exception as e:
+        logger.warning("OCR failed: %s", e)
+        return [(None, None)]
+
+
+def _chunks(indexes, contents, size):
+    """Groups image indexes into Vision batches of at most `size` images / MAX_BATCH_BYTES."""
+    chunk, chunk_bytes = [], 0
+    for index in indexes:
+        length = len(contents[index])
+        if chunk and (len(chunk) == size or chunk_bytes + length > MAX_BATCH_BYTES):
+            yield chunk
+            chunk, chunk_bytes = [], 0
+        chunk.append(index)
+        chunk_bytes += length
+    if chunk:
+        yield chunk
+
+
+def scan_batch(sources, workers=4, use_batch_api=True, batch_size=VISION_BATCH_LIMIT):
+    """
+    OCRs many receipts at once and yields (index, data) in input order; data is None when a scan failed.
+
+    Cached images are answered straight away. The rest are OCR'd on a pool of `workers` threads:
+    when the OCR backend can batch, images go out in chunks (for Vision one batch_annotate_images
+    request per chunk instead of one per image, falling back to single calls if a batch fails);
+    otherwise, or with use_batch_api=False, every image is its own task on the pool.
+    PDFs are scanned page by page. A result is yielded as soon as it and everything before it are done.
+    Like extract_receipt_data(), every result carries its image's "image_hash", cached or not.
+    """
+    contents = [open_image(source) for source in sources]
+    digests = [image_hash(content) for content in contents]
+    keys = [cache_key(content, digest) for content, digest in zip(contents, digests)]
+    cache = get_ocr_cache()
+
+    cached = {}
+    if cache is not None:
+        for index, key in enumerate(keys):
+            entry = cache.get(key)
+            if entry is not None:
+                cached[index] = entry["data"]
+
+    # The first upload of a duplicate photo is OCR'd once; the copies reuse its result
+    first_seen = {}
+    duplicates = {}
+    to_scan = []
+    for index, key in enumerate(keys):
+        if index in cached:
+            continue
+        if key in first_seen:
+            duplicates[index] = first_seen[key]
+        else:
+            first_seen[key] = index
+            to_scan.append(index)
+
+    images = [index for index in to_scan if not is_pdf(contents[index])]
+    pdfs = [index for index in to_scan if is_pdf(contents[index])]
+    backend = get_ocr_backend()
+    size = batch_size if use_batch_api and backend.supports_batch else 1
+
+    pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="scan-batch")
+    try:
+        pending = {}  # index -> (future, position of the index in that future's result)
+        for chunk in _chunks(images, contents, size):
+            future = pool.submit(_ocr_images, backend, [contents[index] for index in chunk])
+            for position, index in enumerate(chunk):
+                pending[index] = (future, position)
+        for index in pdfs:
+            pending[index] = (pool.submit(_ocr_pdf, contents[index]), 0)
+
+        results = {}
+        for index in range(len(contents)):
+            if index in cached:
+                yield index, {**cached[index], "image_hash": digests[index]}
+                continue
+            if index in duplicates:
+                yield index, results.get(duplicates[index])
+                continue
+
+            future, position = pending[index]
+            try:
+                full_text, pdf_report = future.result()[position]
+            except Exception as e:
+                logger.warning("OCR failed: %s", e)
+                full_text, pdf_report = None, None
+            data = None
+            if full_text is not None:
+                data = parse_receipt_text(full_text)
+                if cache is not None:
+                    cache.set(keys[index], full_text, data)
+                data = {**data, "image_hash": digests[index]}
+                if pdf_report is not None:
+                    data["pages"] = pdf_report
+            results[index] = data
+            yield index, data
+    finally:
+        # The client may hang up halfway through the stream: drop the chunks nobody will read
+        pool.shutdown(wait=True, cancel_futures=True)
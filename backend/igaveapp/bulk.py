@@ -0,0 +1,124 @@
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Receipt
+from .dedup import set_fingerprints
+from .items import sync_items
+from .response_cache import invalidate_user
+from .search import index_receipts, unindex_receipts
+from .store_memory import MEMORY_FIELDS, forget_store_categories
+from .rollups import ROLLUP_FIELDS, apply_contributions, contribution, mute_receipt_signals
+from .serializers import ReceiptSerializer
+
+# Rows per INSERT / UPDATE statement
+BATCH_SIZE = 500
+
+
+class BulkError(Exception):
+    """Some items were invalid, so nothing was written. errors: [{"index", "id", "errors"}] for the bad items."""
+
+    def __init__(self, errors):
+        super().__init__(f"{len(errors)} invalid item(s)")
+        self.errors = errors
+
+
+def bulk_create_receipts(user, items):
+    """
+    Validates every item like POST /api/receipts/ would, then inserts them all with bulk_create.
+    Rollups and the response cache are updated once for the whole batch, not once per receipt.
+    """
+    serializer = ReceiptSerializer(data=items, many=True)
+    if not serializer.is_valid():
+        errors = serializer.errors
+        # Recent DRF versions key the errors by item index; older ones return a list with {} for the valid items
+        errors = errors.items() if isinstance(errors, dict) else enumerate(errors)
+        raise BulkError([
+            {"index": index, "id": None, "errors": item_errors} for index, item_errors in errors if item_errors
+        ])
+
+    receipts = set_fingerprints([Receipt(user=user, **data) for data in serializer.validated_data])
+    with transaction.atomic(), mute_receipt_signals():
+        Receipt.objects.bulk_create(receipts, batch_size=BATCH_SIZE)
+        sync_items(receipts, replace=False)
+        index_receipts(receipts)
+        apply_contributions(added=[contribution(receipt) for receipt in receipts])
+        invalidate_user(user.id)
+        if any(receipt.status == 'verified' for receipt in receipts):
+            forget_store_categories(user.id)
+    return receipts
+
+
+def bulk_update_receipts(user, items):
+    """
+    Applies [{"id": ..., <fields>}, ...] (a partial update per item) to the user's receipts with bulk_update.
+    Unknown ids, another user's ids, repeated ids and invalid fields are reported per item.
+    """
+    with transaction.atomic(), mute_receipt_signals():
+        ids = [item.get('id') for item in items if isinstance(item, dict)]
+        receipts = Receipt.objects.select_for_update().filter(user=user).in_bulk(
+            [pk for pk in ids if isinstance(pk, int) and not isinstance(pk, bool)]
+        )
+
+        errors, changes, seen = [], [], set()
+        for index, item in enumerate(items):
+            pk = item.get('id') if isinstance(item, dict) else None
+            if pk in seen:
+                errors.append({"index": index, "id": pk, "errors": {"id": ["Repeated in this request."]}})
+                continue
+            receipt = receipts.get(pk) if isinstance(pk, int) else None
+            if receipt is None:
+                errors.append({"index": index, "id": pk, "errors": {"id": ["Not found."]}})
+                continue
+            seen.add(pk)
+            fields = {name: value for name, value in item.items() if name != 'id'}
+            serializer = ReceiptSerializer(receipt, data=fields, partial=True)
+            if not serializer.is_valid():
+                errors.append({"index": index, "id": pk, "errors": serializer.errors})
+                continue
+            changes.append((receipt, serializer.validated_data))
+        if errors:
+            raise BulkError(errors)
+
+        before = [contribution(receipt) for receipt, data in changes]
+        memory_changed = any(
+            'verified' in (receipt.status, data.get('status')) and set(MEMORY_FIELDS) & set(data)
+            for receipt, data in changes
+        )
+        updated_fields = {'updated_at'}
+        now = timezone.now()
+        for receipt, data in changes:
+            for name, value in data.items():
+                setattr(receipt, name, value)
+            receipt.updated_at = now  # bulk_update doesn't run auto_now
+            updated_fields.update(data)
+
+        updated = [receipt for receipt, data in changes]
+        if set(Receipt.FINGERPRINT_FIELDS) & updated_fields:
+            set_fingerprints(updated)
+            updated_fields.add('fingerprint')
+        Receipt.objects.bulk_update(updated, sorted(updated_fields), batch_size=BATCH_SIZE)
+        sync_items([receipt for receipt, data in changes if 'items' in data])
+        index_receipts([receipt for receipt, data in changes if {'store_name', 'category', 'items'} & set(data)])
+
+        after = [contribution(receipt) for receipt in updated]
+        apply_contributions(added=after, removed=before)
+        invalidate_user(user.id)
+        if memory_changed:
+            forget_store_categories(user.id)
+    return updated
+
+
+def bulk_delete_receipts(user, ids):
+    """Deletes the user's receipts with these ids in one statement. Returns (deleted ids, ids not found)."""
+    with transaction.atomic(), mute_receipt_signals():
+        receipts = Receipt.objects.filter(user=user, id__in=ids)
+        rows = list(receipts.values_list('id', 'status', *ROLLUP_FIELDS))
+        receipts.delete()
+        unindex_receipts([row[0] for row in rows])
+        apply_contributions(removed=[row[2:] for row in rows])
+        invalidate_user(user.id)
+        if any(row[1] == 'verified' for row in rows):
+            forget_store_categories(user.id)
+
+    deleted = {row[0] for row in rows}
+    return sorted(deleted), [pk for pk in ids if pk not in deleted]
@@ -0,0 +1,74 @@
+import re
+
+# Picks a receipt's category in two steps:
+# 1. Keywords: the vendor name, then the first few item names, against one alternation of every
+#    keyword, compiled at import. A text gets the first category (in KEYWORDS order) that has a
+#    keyword anywhere in it.
+# 2. Memory: the category the user gave this store on their verified receipts, when there is one
+#    (users correct what the keywords get wrong, and the fix sticks for the next scan): store_memory.py.
+# Step 1 is pure and runs in the parser (so its result is OCR-cached); step 2 needs the user and runs
+# on the draft. parsing.py imports this module without Django set up, so it imports nothing from the app.
+
+KEYWORDS = {
+    'food': [
+        'burger', 'pizza', 'restaurant', 'cafe', 'coffee', 'grill', 'kitchen', 'food', 'market',
+        'diner', 'bistro', 'steak', 'mcdonalds', 'kfc', 'starbucks', 'subway', 'wendys', 'taco bell',
+        'dunkin', 'chipotle', 'domino', 'meal', 'bread', 'bakery', 'sushi'
+    ],
+    'transport': [
+        'uber', 'lyft', 'taxi', 'shell', 'exxon', 'bp', 'chevron', 'fuel', 'gas', 'station',
+        'train', 'metro', 'bus', 'airline', 'flight', 'parking', 'garage'
+    ],
+    'utilities': [
+        'water', 'electric', 'power', 'energy', 'internet', 'wifi', 'telecom', 'mobile',
+        'at&t', 'verizon', 't-mobile', 'comcast', 'bill', 'insurance'
+    ],
+    'shopping': [
+        'amazon', 'walmart', 'target', 'ikea', 'mall', 'shop', 'clothing', 'shoes', 'apparel',
+        'nike', 'adidas', 'zara', 'h&m', 'retail', 'outlet', 'boutique', 'book'
+    ],
+    'entertainment': [
+        'cinema', 'movie', 'theatre', 'netflix', 'spotify', 'ticket', 'event', 'bowling',
+        'golf', 'game', 'concert', 'museum'
+    ],
+    'health': [
+        'pharmacy', 'cvs', 'walgreens', 'hospital', 'clinic', 'doctor', 'dental', 'gym',
+        'fitness', 'medicine', 'drug'
+    ],
+}
+# Item names looked at when the vendor has no keyword
+MAX_ITEMS_CHECKED = 5
+
+CATEGORY_ORDER = list(KEYWORDS)
+KEYWORD_RANK = {}
+for _rank, _keywords in enumerate(KEYWORDS.values()):
+    for _keyword in _keywords:
+        KEYWORD_RANK.setdefault(_keyword, _rank)
+# A lookahead finds keywords that overlap or sit inside one another too; at each position the
+# alternatives are tried in category order, so the best-ranked keyword starting there is the one seen
+KEYWORD_RE = re.compile('(?=(' + '|'.join(re.escape(keyword) for keyword in KEYWORD_RANK) + '))')
+
+
+def keyword_category(text):
+    """The first category (in KEYWORDS order) with a keyword in text, or None."""
+    if not text:
+        return None
+    best = None
+    for match in KEYWORD_RE.finditer(text.lower()):
+        rank = KEYWORD_RANK[match.group(1)]
+        if best is None or rank < best:
+            best = rank
+            if rank == 0:
+                break
+    return None if best is None else CATEGORY_ORDER[best]
+
+
+def categorize_text(vendor, item_names=()):
+    """The vendor's keyword category, else the first one found among the first few item names (None if none)."""
+    category = keyword_category(vendor)
+    if category is None:
+        for name in item_names[:MAX_ITEMS_CHECKED]:
+            category = keyword_category(name)
+            if category is not None:
+                break
+    return category
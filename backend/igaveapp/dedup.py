@@ -0,0 +1,127 @@
+import decimal
+import hashlib
+from django.db.models import Count, Q
+
+from .items import compact_name, item_name, item_price
+from .models import Receipt
+
+# The same receipt saved twice (the photo uploaded again, or typed in after it was scanned) counts twice
+# in /stats/. Each receipt carries a fingerprint of what it says: store, date, total and items, normalized
+# so that case, punctuation and item order don't matter. Two receipts of a user with the same fingerprint,
+# or scanned from the same image, are likely duplicates; both columns are indexed with the user, so the
+# check on create and on scan is one index lookup however many receipts the user has.
+
+# Duplicates reported for one receipt at most
+MAX_DUPLICATES = 10
+
+_SEPARATOR = '\x1f'
+
+
+def _amount(value):
+    return item_price(str(value) if isinstance(value, decimal.Decimal) else value)
+
+
+def item_signature(items):
+    """The items as "name:price" pairs, sorted so the order they were read in doesn't matter."""
+    items = items if isinstance(items, list) else []
+    pairs = []
+    for item in items:
+        price = _amount(item.get('price')) if isinstance(item, dict) else None
+        pairs.append(f"{compact_name(item_name(item))}:{'' if price is None else price}")
+    return '|'.join(sorted(pairs))
+
+
+def fingerprint(store_name, date, total_amount, items):
+    """
+    The fingerprint of a receipt's contents, or "" when it has no date or no total (too little to tell
+    receipts apart by). date may be a date or "YYYY-MM-DD", total_amount a Decimal, number or string.
+    """
+    amount = _amount(total_amount)
+    if not date or amount is None:
+        return ''
+    parts = (compact_name(store_name or ''), str(date)[:10], str(amount), item_signature(items))
+    return hashlib.sha256(_SEPARATOR.join(parts).encode('utf-8')).hexdigest()[:32]
+
+
+def receipt_fingerprint(receipt):
+    return fingerprint(receipt.store_name, receipt.date, receipt.total_amount, receipt.items)
+
+
+def set_fingerprints(receipts):
+    """Fills in the fingerprint of receipts that bypass save() (bulk_create, bulk_update)."""
+    for receipt in receipts:
+        receipt.fingerprint = receipt_fingerprint(receipt)
+    return receipts
+
+
+# --- LOOKUPS ---
+def find_duplicates(user_id, fingerprint='', image_hash='', exclude=None, limit=MAX_DUPLICATES):
+    """Ids of the user's receipts with this fingerprint or this image hash, oldest first."""
+    match = Q()
+    if fingerprint:
+        match |= Q(fingerprint=fingerprint)
+    if image_hash:
+        match |= Q(image_hash=image_hash)
+    if not match:
+        return []
+    receipts = Receipt.objects.filter(match, user_id=user_id)
+    if exclude is not None:
+        receipts = receipts.exclude(pk=exclude)
+    return list(receipts.order_by('id').values_list('id', flat=True)[:limit])
+
+
+def receipt_duplicates(receipt):
+    """The other receipts receipt (a saved one) likely duplicates."""
+    return find_duplicates(receipt.user_id, receipt.fingerprint, receipt.image_hash, exclude=receipt.pk)
+
+
+def draft_fingerprint(draft):
+    return fingerprint(draft.get('store_name'), draft.get('date'), draft.get('total_amount'), draft.get('items'))
+
+
+def flag_draft_duplicates(user_id, draft):
+    """Adds "possible_duplicates" to a scan draft: receipts the user already saved from it."""
+    draft["possible_duplicates"] = find_duplicates(user_id, draft_fingerprint(draft), draft.get('image_hash') or '')
+    return draft
+
+
+# --- EXISTING DATA ---
+def backfill_fingerprints(queryset, chunk_size=2000):
+    """
+    Recomputes the fingerprint of every receipt in queryset, a chunk at a time, writing only the ones
+    that changed. Yields (receipts, changed) per chunk.
+    """
+    receipts = queryset.order_by('pk').only('pk', 'fingerprint', *Receipt.FINGERPRINT_FIELDS)
+    last = 0
+    while True:
+        chunk = list(receipts.filter(pk__gt=last)[:chunk_size])
+        if not chunk:
+            return
+        changed = [r for r in chunk if r.fingerprint != receipt_fingerprint(r)]
+        Receipt.objects.bulk_update(set_fingerprints(changed), ['fingerprint'], batch_size=500)
+        yield len(chunk), len(changed)
+        last = chunk[-1].pk
+
+
+def duplicate_groups(queryset, field, chunk_size=500):
+    """
+    The receipts of queryset that share a fingerprint or image hash (field) with another receipt of the
+    same user. Yields [(user_id, [ids, oldest first]), ...] for each chunk_size shared values.
+    """
+    shared = list(
+        queryset.exclude(**{field: ''}).values_list('user_id', field)
+        .annotate(copies=Count('id')).filter(copies__gt=1).order_by('user_id', field)
+    )
+    for start in range(0, len(shared), chunk_size):
+        by_user = {}
+        for user_id, value, copies in shared[start:start + chunk_size]:
+            by_user.setdefault(user_id, []).append(value)
+        groups = []
+        for user_id, values in by_user.items():
+            rows = (queryset.filter(user_id=user_id, **{f'{field}__in': values})
+                    .order_by(field, 'created_at', 'id').values_list('id', field))
+            members = {}
+            for pk, value in rows:
+                members.setdefault(value, []).append(pk)
+            groups.extend((user_id, ids) for ids in members.values() if len(ids) > 1)
+        yield groups
@@ -0,0 +1,178 @@
+import csv
+import io
+import json
+from collections import namedtuple
+
+from .filters import FILTER_PARAMS, filter_receipts, select_ids
+from .items import item_name, item_price
+from .models import Receipt
+from .xlsx import XLSX_CONTENT_TYPE, stream_xlsx
+
+# Display labels looked up once, instead of get_FOO_display() on a model instance per row
+CATEGORY_LABELS = dict(Receipt.CATEGORY_CHOICES)
+STATUS_LABELS = dict(Receipt.STATUS_CHOICES)
+
+# Rows fetched from the database per round trip, and rows written per chunk sent to the client
+DB_CHUNK_SIZE = 2000
+ROWS_PER_CHUNK = 500
+
+SUMMARY_HEADER = ['Date', 'Store Name', 'Category', 'Amount', 'Status']
+RECEIPT_HEADER = ['Receipt ID', 'Date', 'Store Name', 'Category', 'Amount', 'Status']
+RECEIPT_COLUMNS = ('id', 'date', 'store_name', 'category', 'total_amount', 'status')
+ITEM_HEADER = ['Receipt ID', 'Date', 'Store Name', 'Category', 'Item', 'Price', 'Receipt Total', 'Status']
+
+# Query parameters an export is filtered by (a background job stores them and replays them later)
+EXPORT_PARAMS = FILTER_PARAMS + ('ids',)
+
+
+def export_queryset(user_id, params):
+    """The user's receipts filtered like the request (params: a QueryDict or a stored dict), newest first."""
+    queryset = filter_receipts(Receipt.objects.filter(user_id=user_id), params)
+    return select_ids(queryset, params.get('ids')).order_by('-date', '-id')
+
+
+def receipt_rows(queryset, chunk_size=DB_CHUNK_SIZE):
+    """
+    [id, date, store name, category label, total, status label] per receipt, typed (date, Decimal or None).
+    Reads plain tuples, never whole Receipt objects.
+    """
+    rows = queryset.values_list(*RECEIPT_COLUMNS).iterator(chunk_size=chunk_size)
+    for pk, day, store_name, category, amount, status in rows:
+        yield [pk, day, store_name, CATEGORY_LABELS.get(category, category), amount, STATUS_LABELS.get(status, status)]
+
+
+def summary_rows(queryset, chunk_size=DB_CHUNK_SIZE):
+    """One row per receipt, as the report shows it."""
+    for pk, day, store_name, category, amount, status in receipt_rows(queryset, chunk_size):
+        yield [
+            day.strftime("%d %b %Y") if day else "N/A",
+            store_name,
+            category,
+            f"${amount:.2f}" if amount else "$0.00",
+            status,
+        ]
+
+
+def item_rows(queryset, chunk_size=DB_CHUNK_SIZE):
+    """
+    One row per line item in Receipt.items, with its receipt's columns repeated (ITEM_HEADER order).
+    A receipt without items still gets one row, with no item, so the receipt totals add up.
+    """
+    rows = queryset.values_list(*RECEIPT_COLUMNS, 'items').iterator(chunk_size=chunk_size)
+    for pk, day, store_name, category, amount, status, items in rows:
+        receipt = [pk, day, store_name, CATEGORY_LABELS.get(category, category)]
+        status = STATUS_LABELS.get(status, status)
+        if not isinstance(items, list) or not items:
+            yield receipt + [None, None, amount, status]
+            continue
+        for item in items:
+            if isinstance(item, dict):
+                yield receipt + [item_name(item), item_price(item.get('price')), amount, status]
+            else:
+                yield receipt + [str(item), None, amount, status]
+
+
+def stream_csv(header, rows, rows_per_chunk=ROWS_PER_CHUNK):
+    """
+    Encodes rows as CSV a chunk at a time, for a StreamingHttpResponse: only one chunk of text is
+    in memory, and the client starts receiving the file with the first chunk.
+    Starts with a UTF-8 BOM so Excel opens the file with the right encoding.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    writer.writerow(header)
+
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending == rows_per_chunk:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue().encode('utf-8')
+
+
+# --- EXPORT FORMATS ---
+def _iso(value):
+    return value.isoformat() if value is not None else None
+
+
+def _record(pk, day, store_name, category, amount, status, items, created_at, updated_at):
+    return {
+        "id": pk,
+        "date": _iso(day),
+        "store_name": store_name,
+        "category": category,
+        "total_amount": None if amount is None else str(amount),  # a string, like the API: no float rounding
+        "status": status,
+        "items": items,
+        "created_at": _iso(created_at),
+        "updated_at": _iso(updated_at),
+    }
+
+
+RECORD_COLUMNS = RECEIPT_COLUMNS + ('items', 'created_at', 'updated_at')
+
+
+def render_summary_csv(queryset):
+    return stream_csv(SUMMARY_HEADER, summary_rows(queryset))
+
+
+def render_items_csv(queryset):
+    return stream_csv(ITEM_HEADER, item_rows(queryset))
+
+
+def render_xlsx(queryset):
+    """Two sheets: one row per receipt, and one row per line item (joined on Receipt ID)."""
+    return stream_xlsx([
+        ('Receipts', RECEIPT_HEADER, receipt_rows(queryset)),
+        ('Items', ITEM_HEADER, item_rows(queryset)),
+    ])
+
+
+def render_jsonl(queryset, rows_per_chunk=ROWS_PER_CHUNK):
+    """JSON lines: one receipt per line, items nested, category/status as their codes."""
+    rows = queryset.values_list(*RECORD_COLUMNS).iterator(chunk_size=DB_CHUNK_SIZE)
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(_record(*row), separators=(',', ':')))
+        if len(lines) == rows_per_chunk:
+            yield ('\n'.join(lines) + '\n').encode('utf-8')
+            lines = []
+    if lines:
+        yield ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+def render_columnar(queryset, block_size=DB_CHUNK_SIZE):
+    """
+    Column blocks for data pipelines: one JSON line per block of up to block_size receipts,
+    {"rows": n, "columns": {"id": [...], "date": [...], ...}}. Column names appear once per block
+    instead of once per value, and each line loads straight into a dataframe.
+    """
+    rows = queryset.values_list(*RECORD_COLUMNS).iterator(chunk_size=block_size)
+    block = []
+    while True:
+        block.clear()
+        for row in rows:
+            block.append(_record(*row))
+            if len(block) == block_size:
+                break
+        if not block:
+            return
+        columns = {name: [record[name] for record in block] for name in block[0]}
+        yield (json.dumps({"rows": len(block), "columns": columns}, separators=(',', ':')) + '\n').encode('utf-8')
+
+
+ExportFormat = namedtuple('ExportFormat', ['file_name', 'content_type', 'render'])
+
+# ?as=<name> on the export endpoints; render(queryset) yields the file as bytes, a chunk at a time
+EXPORT_FORMATS = {
+    'csv': ExportFormat('iSave_Report.csv', 'text/csv', render_summary_csv),
+    'items': ExportFormat('iSave_Items.csv', 'text/csv', render_items_csv),
+    'xlsx': ExportFormat('iSave_Report.xlsx', XLSX_CONTENT_TYPE, render_xlsx),
+    'jsonl': ExportFormat('iSave_Receipts.jsonl', 'application/x-ndjson', render_jsonl),
+    'columnar': ExportFormat('iSave_Receipts.columns.jsonl', 'application/x-ndjson', render_columnar),
+}
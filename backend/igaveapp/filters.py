@@ -0,0 +1,116 @@
+import datetime
+from django.utils.dateparse import parse_date
+
+
+# Query parameters filter_receipts() reads
+FILTER_PARAMS = ('today', 'date', 'month', 'year', 'start', 'end')
+
+
+def month_after(year, month):
+    """First day of the month after year-month (the exclusive end of a month range)."""
+    return datetime.date(year + month // 12, month % 12 + 1, 1)
+
+
+# A filter value that is no month / year matches no receipt (as date__month=13 never did), never all of them
+NO_DATES = (datetime.date.min, datetime.date.min)
+
+
+def month_range(value):
+    """?month=YYYY-MM as a [first day, first day of the next month) range; NO_DATES if it isn't a month."""
+    try:
+        y, m = value.split('-')
+        return datetime.date(int(y), int(m), 1), month_after(int(y), int(m))
+    except ValueError:
+        return NO_DATES
+
+
+def year_range(value):
+    """?year=YYYY as a [Jan 1, next Jan 1) range; NO_DATES if it isn't a year."""
+    try:
+        year = int(value)
+        return datetime.date(year, 1, 1), datetime.date(year + 1, 1, 1)
+    except ValueError:
+        return NO_DATES
+
+
+def filter_receipts(queryset, params):
+    """
+    The Brain: the ?today / ?date / ?month / ?year / ?start&end filters shared by lists, stats and exports.
+    params is a QueryDict or a plain dict, so a background export job can replay a request's filters.
+    """
+    # 1. Today (?today=true)
+    if params.get('today'):
+        queryset = queryset.filter(date=datetime.date.today())
+
+    # 2. Specific Date (?date=YYYY-MM-DD)
+    date_param = params.get('date')
+    if date_param:
+        queryset = queryset.filter(date=date_param)
+
+    # 3. Month (?month=YYYY-MM) and 4. Year (?year=YYYY)
+    # Months and years become plain date ranges so the (user, date) index can be used;
+    # date__month=... compiles to EXTRACT(month FROM date), which no index can serve.
+    for param, to_range in (('month', month_range), ('year', year_range)):
+        if params.get(param):
+            lo, hi = to_range(params[param])
+            if lo >= hi:
+                return queryset.none()
+            queryset = queryset.filter(date__gte=lo, date__lt=hi)
+
+    # 5. Range (?start=...&end=...)
+    start_date = params.get('start')
+    end_date = params.get('end')
+    if start_date and end_date:
+        queryset = queryset.filter(date__range=[start_date, end_date])
+
+    return queryset
+
+
+def parse_day(value):
+    """A date the way a DateField parses it; ValueError when the database would be left to reject it."""
+    day = parse_date(value)
+    if day is None:
+        raise ValueError(f"Not a date: {value}")
+    return day
+
+
+def date_bounds(params):
+    """
+    The dates filter_receipts() keeps, as one range [lo, hi) (hi exclusive), or None when no date filter
+    is set. Filters that are combined intersect, and a bad month/year makes it empty (lo >= hi), matching nothing.
+    Raises ValueError for ?date= / ?start= / ?end= values that aren't dates.
+    """
+    ranges = []
+    one_day = datetime.timedelta(days=1)
+
+    if params.get('today'):
+        today = datetime.date.today()
+        ranges.append((today, today + one_day))
+
+    if params.get('date'):
+        day = parse_day(params['date'])
+        ranges.append((day, day + one_day))
+
+    if params.get('month'):
+        ranges.append(month_range(params['month']))
+
+    if params.get('year'):
+        ranges.append(year_range(params['year']))
+
+    if params.get('start') and params.get('end'):
+        ranges.append((parse_day(params['start']), parse_day(params['end']) + one_day))
+
+    if not ranges:
+        return None
+    return max(lo for lo, hi in ranges), min(hi for lo, hi in ranges)
+
+
+def select_ids(queryset, ids_param):
+    """?ids=1,2,3 narrows an export to the selected receipts; a malformed list is ignored."""
+    if ids_param:
+        try:
+            id_list = [int(x) for x in ids_param.split(',')]
+            queryset = queryset.filter(id__in=id_list)
+        except ValueError:
+            pass
+    return queryset
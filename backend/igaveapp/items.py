@@ -0,0 +1,164 @@
+import decimal
+import re
+import unicodedata
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Sum
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import Receipt, ReceiptItem
+from .rollups import receipt_signals_muted
+
+# Receipt.items stays the source of truth; ReceiptItem is an indexed copy of it, one row per line item.
+# The scanner writes {"name", "price"} items and seed_data writes {"desc", "price"}: both are read here.
+NAME_KEYS = ('name', 'desc', 'description')
+QUANTITY_KEYS = ('quantity', 'qty')
+NAME_MAX_LENGTH = ReceiptItem._meta.get_field('name').max_length
+
+# Rows returned by the item search and top-items endpoints (?limit=)
+ITEM_RESULTS_LIMIT = 50
+MAX_ITEM_RESULTS = 200
+
+_NOT_WORD = re.compile(r'[\W_]+')
+
+
+def item_price(value):
+    """An item price from the items JSON as a Decimal (None when it isn't a number)."""
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        return None
+    try:
+        return decimal.Decimal(str(value)).quantize(decimal.Decimal('0.01'))
+    except decimal.InvalidOperation:
+        return None
+
+
+def item_name(item):
+    """The item's name, whichever key it was saved under ("" if none)."""
+    if not isinstance(item, dict):
+        return str(item)
+    for key in NAME_KEYS:
+        if item.get(key):
+            return str(item[key])
+    return ''
+
+
+def normalize_item_name(name):
+    """'  Organic MILK 2%' -> 'organic milk 2': case-folded, accents kept, punctuation and extra spaces dropped."""
+    name = unicodedata.normalize('NFKC', name).casefold()
+    return _NOT_WORD.sub(' ', name).strip()[:NAME_MAX_LENGTH]
+
+
+def compact_name(name):
+    """"Trader Joe's" and "TRADER JOES" alike: 'traderjoes' (normalize_item_name() without the spaces)."""
+    return normalize_item_name(name).replace(' ', '')
+
+
+def _quantity(item):
+    for key in QUANTITY_KEYS:
+        value = item.get(key) if isinstance(item, dict) else None
+        if value is not None:
+            quantity = item_price(value)
+            if quantity is not None and quantity > 0:
+                return quantity
+    return decimal.Decimal(1)
+
+
+def line_items(receipt):
+    """Unsaved ReceiptItem rows for a receipt's items JSON (nameless items are skipped)."""
+    items = receipt.items if isinstance(receipt.items, list) else []
+    rows = []
+    for position, item in enumerate(items):
+        name = item_name(item).strip()
+        if not name:
+            continue
+        rows.append(ReceiptItem(
+            receipt_id=receipt.pk,
+            user_id=receipt.user_id,
+            position=position,
+            name=name[:NAME_MAX_LENGTH],
+            normalized_name=normalize_item_name(name),
+            price=item_price(item.get('price')) if isinstance(item, dict) else None,
+            quantity=_quantity(item),
+        ))
+    return rows
+
+
+def sync_items(receipts, replace=True):
+    """
+    Rewrites the ReceiptItem rows of these (saved) receipts from their items JSON: one DELETE and
+    batched INSERTs for the lot. replace=False skips the DELETE, for receipts that were just created.
+    """
+    receipts = list(receipts)
+    with transaction.atomic():
+        if replace:
+            for start in range(0, len(receipts), 500):
+                ReceiptItem.objects.filter(receipt_id__in=[r.pk for r in receipts[start:start + 500]]).delete()
+        rows = [row for receipt in receipts for row in line_items(receipt)]
+        ReceiptItem.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def backfill_items(queryset, chunk_size=2000):
+    """Rebuilds the items of every receipt in queryset, a chunk at a time. Yields (receipts, items) per chunk."""
+    pks = queryset.order_by('pk').values_list('pk', flat=True)
+    last = 0
+    while True:
+        chunk = list(pks.filter(pk__gt=last)[:chunk_size])
+        if not chunk:
+            return
+        receipts = Receipt.objects.filter(pk__in=chunk).only('pk', 'user_id', 'items')
+        yield len(chunk), sync_items(receipts)
+        last = chunk[-1]
+
+
+# --- READS ---
+def item_matches(user, query, bounds=None):
+    """
+    The user's items whose normalized name starts with the normalized query (all of them for an empty
+    query): a range scan of the (user, normalized_name) index, so the cost follows the number of
+    matches, not the history. bounds is date_bounds()'s [lo, hi) range of receipt dates, or None.
+    """
+    items = ReceiptItem.objects.filter(user=user)
+    query = normalize_item_name(query)
+    if query:
+        # SQLite never uses an index for LIKE (it is case-insensitive there): the range makes it one
+        # index seek, and LIKE, served by the varchar_pattern_ops index on PostgreSQL, keeps the match exact
+        items = items.filter(normalized_name__gte=query, normalized_name__lt=query + '\U0010ffff',
+                             normalized_name__startswith=query)
+    if bounds is not None:
+        lo, hi = bounds
+        items = items.filter(receipt__date__gte=lo, receipt__date__lt=hi)
+    return items
+
+
+def item_totals(items):
+    """Spend, quantity and price range of a set of items, in one aggregate query."""
+    totals = items.aggregate(
+        matches=Count('id'), receipts=Count('receipt_id', distinct=True),
+        total_spent=Sum('price'), quantity=Sum('quantity'),
+        min_price=Min('price'), max_price=Max('price'),
+        first_bought=Min('receipt__date'), last_bought=Max('receipt__date'),
+    )
+    totals['total_spent'] = totals['total_spent'] or 0
+    totals['quantity'] = totals['quantity'] or 0
+    return totals
+
+
+def top_items(items, limit):
+    """[{"name", "count", "total"}] of the biggest-spend normalized names among items."""
+    rows = (
+        items.values('normalized_name')
+        .annotate(count=Count('id'), total=Sum('price'))
+        .order_by(F('total').desc(nulls_last=True), 'normalized_name')[:limit]
+    )
+    return [{"name": row['normalized_name'], "count": row['count'], "total": row['total'] or 0} for row in rows]
+
+
+# --- SIGNALS ---
+# bulk.py and seed_data mute the receipt signals (or use bulk_create) and call sync_items() themselves.
+@receiver(post_save, sender=Receipt)
+def sync_items_on_save(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw or receipt_signals_muted():
+        return
+    if created or instance.may_have_changed(update_fields, 'user_id', 'items'):
+        sync_items([instance], replace=not created)
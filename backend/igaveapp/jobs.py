@@ -0,0 +1,229 @@
+import datetime
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from .store_memory import categorize_draft
+from .dedup import flag_draft_duplicates
+from .exports import EXPORT_FORMATS, EXPORT_PARAMS, export_queryset
+from .models import ScanJob, ExportJob
+from .ocr import extract_receipt_data, build_draft
+
+
+class QueueFull(Exception):
+    """Raised when every worker is busy and the waiting queue is already full."""
+
+
+class BoundedExecutor:
+    """
+    A thread pool with a cap on how many jobs may wait for a free worker.
+
+    Vision calls spend most of their time waiting on the network, so threads are enough
+    to keep the gunicorn workers free. With max_workers=0 jobs run inline (tests, local dev).
+    """
+
+    def __init__(self, max_workers, queue_size, name="scan-job"):
+        self.max_workers = max_workers
+        self.queue_size = queue_size
+        self._slots = threading.BoundedSemaphore(max_workers + queue_size) if max_workers > 0 else None
+        self._pool = None
+        if max_workers > 0:
+            self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+
+    def submit(self, fn, *args):
+        if self._pool is None:
+            fn(*args)
+            return None
+
+        if not self._slots.acquire(blocking=False):
+            raise QueueFull()
+
+        try:
+            return self._pool.submit(self._run, fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _run(self, fn, *args):
+        try:
+            return fn(*args)
+        finally:
+            # Worker threads get their own DB connections; don't leave them open
+            connections.close_all()
+            self._slots.release()
+
+    def shutdown(self, wait=True):
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait)
+
+
+_executors = {}
+_executor_lock = threading.Lock()
+
+
+def _executor_settings(kind):
+    if kind == 'export':
+        return settings.EXPORT_JOBS['WORKERS'], settings.EXPORT_JOBS['QUEUE_SIZE']
+    return settings.SCAN_JOB_WORKERS, settings.SCAN_JOB_QUEUE_SIZE
+
+
+def get_executor(kind='scan'):
+    """
+    Returns this process's executor for "scan" or "export" jobs, (re)building it after a fork or a
+    settings change. Each kind has its own pool, so a long export never holds up a scan.
+    """
+    workers, queue_size = _executor_settings(kind)
+    key = (os.getpid(), workers, queue_size)
+    with _executor_lock:
+        executor, executor_key = _executors.get(kind, (None, None))
+        if executor is None or executor_key != key:
+            if executor is not None and executor_key[0] == os.getpid():
+                executor.shutdown(wait=False)
+            executor = BoundedExecutor(workers, queue_size, name=f"{kind}-job")
+            _executors[kind] = (executor, key)
+        return executor
+
+
+def _update_job(job_id, model=ScanJob, **fields):
+    model.objects.filter(pk=job_id).update(updated_at=timezone.now(), **fields)
+
+
+def run_scan_job(job_id, source):
+    """
+    Runs one queued scan and stores the draft (or the error).
+    source is the upload's bytes, or the path of a job-owned temp file that is deleted afterwards.
+    """
+    try:
+        _update_job(job_id, status='running')
+        data = extract_receipt_data(source)
+        if data:
+            user_id = ScanJob.objects.values_list('user_id', flat=True).get(pk=job_id)
+            draft = categorize_draft(user_id, build_draft(data))
+            _update_job(job_id, status='done', result=flag_draft_duplicates(user_id, draft))
+        else:
+            _update_job(job_id, status='failed', error="OCR failed.")
+    except Exception as e:
+        _update_job(job_id, status='failed', error=str(e))
+    finally:
+        if isinstance(source, str) and os.path.exists(source):
+            os.remove(source)
+
+
+def _stale_scans():
+    """Jobs still queued or running SCAN_JOB_TIMEOUT seconds after their last update: their worker is gone."""
+    cutoff = timezone.now() - datetime.timedelta(seconds=settings.SCAN_JOB_TIMEOUT)
+    return ScanJob.objects.filter(status__in=('queued', 'running'), updated_at__lt=cutoff)
+
+
+def _fail_stale_scans(stale):
+    return stale.update(status='failed', error="Scan timed out.", updated_at=timezone.now())
+
+
+def check_scan_timeout(job):
+    """For the status poll: fails the job if it is stale (see _stale_scans), so the client stops waiting."""
+    if job.status in ('queued', 'running') and _fail_stale_scans(_stale_scans().filter(pk=job.pk)):
+        job.refresh_from_db()
+    return job
+
+
+def delete_expired_scans():
+    """Deletes scan jobs older than SCAN_JOB_TTL seconds and fails the stale ones."""
+    cutoff = timezone.now() - datetime.timedelta(seconds=settings.SCAN_JOB_TTL)
+    ScanJob.objects.filter(created_at__lt=cutoff).delete()
+    _fail_stale_scans(_stale_scans())
+
+
+def detach_upload(uploaded_file):
+    """
+    Keeps an upload's content alive after the request ends (Django closes uploads then).
+    Small uploads are already in memory and are handed over as bytes; large ones that Django
+    spooled to disk are hard-linked (or, across filesystems, copied) to a temp file the job owns.
+    """
+    if not hasattr(uploaded_file, 'temporary_file_path'):
+        uploaded_file.seek(0)
+        return uploaded_file.read()
+
+    suffix = os.path.splitext(uploaded_file.name or "")[1]
+    handle, path = tempfile.mkstemp(suffix=suffix)
+    os.close(handle)
+    os.remove(path)
+    try:
+        os.link(uploaded_file.temporary_file_path(), path)
+    except OSError:
+        with open(path, 'wb') as temp_file:
+            for chunk in uploaded_file.chunks():
+                temp_file.write(chunk)
+    return path
+
+
+def enqueue_scan(user, uploaded_file):
+    """
+    Creates the job row and hands the scan to the executor.
+    Raises QueueFull (after cleaning up) when the queue has no room left.
+    """
+    delete_expired_scans()
+    job = ScanJob.objects.create(user=user, file_name=uploaded_file.name or "")
+    source = detach_upload(uploaded_file)
+    try:
+        get_executor().submit(run_scan_job, job.id, source)
+    except QueueFull:
+        job.delete()
+        if isinstance(source, str) and os.path.exists(source):
+            os.remove(source)
+        raise
+    return job
+
+
+# --- EXPORT JOBS ---
+def run_export_job(job_id):
+    """Writes one queued export to its file (via a .part file, so a half-written export is never served)."""
+    partial = None
+    try:
+        job = ExportJob.objects.get(pk=job_id)
+        _update_job(job_id, ExportJob, status='running')
+        queryset = export_queryset(job.user_id, job.params)
+        rows = queryset.count()
+
+        os.makedirs(os.path.dirname(job.file_path), exist_ok=True)
+        partial = job.file_path + '.part'
+        size = 0
+        with open(partial, 'wb') as export_file:
+            for chunk in EXPORT_FORMATS[job.format].render(queryset):
+                export_file.write(chunk)
+                size += len(chunk)
+        os.replace(partial, job.file_path)
+        _update_job(job_id, ExportJob, status='done', rows=rows, size=size)
+    except Exception as e:
+        if partial and os.path.exists(partial):
+            os.remove(partial)
+        _update_job(job_id, ExportJob, status='failed', error=str(e))
+
+
+def delete_expired_exports():
+    """Deletes export jobs (and their files) older than EXPORT_JOBS['TTL'] seconds."""
+    cutoff = timezone.now() - datetime.timedelta(seconds=settings.EXPORT_JOBS['TTL'])
+    expired = ExportJob.objects.filter(created_at__lt=cutoff)
+    for job in expired.only('id', 'format'):
+        if os.path.exists(job.file_path):
+            os.remove(job.file_path)
+    expired.delete()
+
+
+def enqueue_export(user, export_format, params):
+    """
+    Creates the job row (with the export's filters taken from params) and hands it to the export pool.
+    Raises QueueFull (after cleaning up) when the queue has no room left.
+    """
+    delete_expired_exports()
+    params = {name: params.get(name) for name in EXPORT_PARAMS if params.get(name)}
+    job = ExportJob.objects.create(user=user, format=export_format, params=params)
+    try:
+        get_executor('export').submit(run_export_job, job.id)
+    except QueueFull:
+        job.delete()
+        raise
+    return job
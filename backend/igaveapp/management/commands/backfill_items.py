@@ -0,0 +1,29 @@
+import time
+from django.core.management.base import BaseCommand
+from igaveapp.items import backfill_items
+from igaveapp.models import Receipt
+
+
+class Command(BaseCommand):
+    help = 'Fills the ReceiptItem table from Receipt.items (for receipts saved before it existed, or to repair it)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='user_ids',
+                            help='Only this user id (repeatable); default: every user')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Receipts rewritten per transaction')
+
+    def handle(self, *args, **options):
+        receipts = Receipt.objects.all()
+        if options['user_ids']:
+            receipts = receipts.filter(user_id__in=options['user_ids'])
+
+        start = time.perf_counter()
+        receipt_count = item_count = 0
+        for chunk_receipts, chunk_items in backfill_items(receipts, max(1, options['chunk_size'])):
+            receipt_count += chunk_receipts
+            item_count += chunk_items
+            self.stdout.write(f"  {receipt_count:>12,} receipts, {item_count:,} items")
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f" Wrote {item_count:,} items for {receipt_count:,} receipts in {elapsed:.2f}s"
+        ))
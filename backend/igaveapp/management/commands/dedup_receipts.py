@@ -0,0 +1,54 @@
+import time
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from igaveapp.bulk import bulk_delete_receipts
+from igaveapp.dedup import backfill_fingerprints, duplicate_groups
+from igaveapp.models import Receipt
+
+
+class Command(BaseCommand):
+    help = ('Finds receipts saved twice (same fingerprint or same scanned image) after filling in the fingerprints, '
+            'and with --delete removes every copy but the oldest')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='user_ids',
+                            help='Only this user id (repeatable); default: every user')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Receipts fingerprinted per transaction')
+        parser.add_argument('--delete', action='store_true', help='Delete the duplicates (default: only report them)')
+
+    def handle(self, *args, **options):
+        receipts = Receipt.objects.all()
+        if options['user_ids']:
+            receipts = receipts.filter(user_id__in=options['user_ids'])
+        chunk_size = max(1, options['chunk_size'])
+
+        start = time.perf_counter()
+        scanned = changed = 0
+        for chunk_receipts, chunk_changed in backfill_fingerprints(receipts, chunk_size):
+            scanned += chunk_receipts
+            changed += chunk_changed
+            self.stdout.write(f"  {scanned:>12,} receipts fingerprinted, {changed:,} updated")
+
+        # A receipt can share both its fingerprint and its image with others: it is counted (and deleted) once
+        flagged, groups = set(), 0
+        for field in ('fingerprint', 'image_hash'):
+            for chunk in duplicate_groups(receipts, field, max(1, chunk_size // 4)):
+                duplicates = {}
+                for user_id, ids in chunk:
+                    copies = [pk for pk in ids if pk not in flagged][1:]
+                    if copies:
+                        groups += 1
+                        flagged.update(copies)
+                        duplicates.setdefault(user_id, []).extend(copies)
+                if options['delete']:
+                    users = User.objects.in_bulk(list(duplicates))
+                    for user_id, ids in duplicates.items():
+                        bulk_delete_receipts(users[user_id], ids)
+                self.stdout.write(f"  {len(flagged):>12,} duplicates in {groups:,} groups ({field})")
+
+        elapsed = time.perf_counter() - start
+        verb = "Deleted" if options['delete'] else "Found"
+        self.stdout.write(self.style.SUCCESS(
+            f" {verb} {len(flagged):,} duplicate receipts in {groups:,} groups "
+            f"({scanned:,} receipts checked in {elapsed:.2f}s)"
+        ))
@@ -0,0 +1,110 @@
+import json
+import os
+import time
+from multiprocessing import Pool
+from django.core.management.base import BaseCommand, CommandError
+from igaveapp.parsing import parse_receipt_text
+
+# Fields we report a hit-rate for, and how to tell the parser found them
+FIELD_CHECKS = {
+    "vendor": lambda data: data["vendor"] not in (None, "Unknown Vendor"),
+    "date": lambda data: data["date"] is not None,
+    "total": lambda data: data["total"] is not None,
+    "items": lambda data: bool(data["items"]),
+    "category": lambda data: data["category"] != "general",
+}
+
+
+def iter_dumps(root, extension):
+    """Yields OCR dump paths under root one at a time (no full directory listing in memory)."""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name.endswith(extension):
+                yield os.path.join(dirpath, name)
+
+
+def parse_dump(path):
+    """Worker: parse one dump and time only the parser (not the file read)."""
+    with open(path, encoding="utf-8", errors="replace", newline="") as f:
+        text = f.read()
+
+    start = time.perf_counter()
+    data = parse_receipt_text(text)
+    elapsed = time.perf_counter() - start
+
+    return path, text.count("\n") + 1, elapsed, data
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+class Command(BaseCommand):
+    help = 'Runs saved OCR text dumps through the receipt parser and reports speed and field hit-rates'
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', type=str, help='Folder of OCR text dumps (searched recursively)')
+        parser.add_argument('--ext', type=str, default='.txt', help='File extension of the dumps')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Parser processes (1 = run in this process)')
+        parser.add_argument('--chunksize', type=int, default=32, help='Dumps handed to a worker at a time')
+        parser.add_argument('--output', type=str, help='Write every parsed result to this JSON-lines file')
+
+    def handle(self, *args, **options):
+        directory = options['directory']
+        if not os.path.isdir(directory):
+            raise CommandError(f"'{directory}' is not a directory")
+
+        workers = max(1, options['workers'])
+        paths = iter_dumps(directory, options['ext'])
+        output = open(options['output'], 'w') if options['output'] else None
+
+        latencies = []
+        hits = dict.fromkeys(FIELD_CHECKS, 0)
+
+        self.stdout.write(f"📄 Parsing dumps from {directory} with {workers} worker(s)...")
+        started = time.perf_counter()
+        try:
+            if workers == 1:
+                total_lines = self._collect(map(parse_dump, paths), latencies, hits, output)
+            else:
+                with Pool(processes=workers) as pool:
+                    results = pool.imap_unordered(parse_dump, paths, chunksize=options['chunksize'])
+                    total_lines = self._collect(results, latencies, hits, output)
+        finally:
+            if output:
+                output.close()
+        wall = time.perf_counter() - started
+
+        count = len(latencies)
+        if not count:
+            self.stdout.write(self.style.WARNING("No dumps found."))
+            return
+
+        latencies.sort()
+        self.stdout.write(f"Receipts:    {count}")
+        self.stdout.write(f"Wall time:   {wall:.2f}s")
+        self.stdout.write(f"Throughput:  {count / wall:,.0f} receipts/s, {total_lines / wall:,.0f} lines/s")
+        self.stdout.write(f"Latency p50: {percentile(latencies, 50) * 1000:.3f} ms")
+        self.stdout.write(f"Latency p99: {percentile(latencies, 99) * 1000:.3f} ms")
+        self.stdout.write("Field hit-rates:")
+        for field, hit_count in hits.items():
+            self.stdout.write(f"  {field:<9} {hit_count / count:6.1%}  ({hit_count}/{count})")
+        self.stdout.write(self.style.SUCCESS(" Done."))
+
+    def _collect(self, results, latencies, hits, output):
+        total_lines = 0
+        for path, line_count, elapsed, data in results:
+            latencies.append(elapsed)
+            total_lines += line_count
+            for field, check in FIELD_CHECKS.items():
+                if check(data):
+                    hits[field] += 1
+            if output:
+                output.write(json.dumps({"file": path, **data}) + "\n")
+        return total_lines
@@ -0,0 +1,17 @@
+import time
+from django.core.management.base import BaseCommand
+from igaveapp.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the spending rollups behind /api/receipts/stats/ from the receipts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='user_ids',
+                            help='Only this user id (repeatable); default: every user')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        written = rebuild_rollups(options['user_ids'])
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(f" Rebuilt {written} rollup buckets in {elapsed:.2f}s"))
@@ -0,0 +1,26 @@
+import time
+from django.core.management.base import BaseCommand
+from igaveapp.models import Receipt
+from igaveapp.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = 'Reindexes receipts for full-text search (GET /api/receipts/?q=), e.g. the ones saved before it existed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='user_ids',
+                            help='Only this user id (repeatable); default: every user')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Receipts indexed per transaction')
+
+    def handle(self, *args, **options):
+        receipts = Receipt.objects.all()
+        if options['user_ids']:
+            receipts = receipts.filter(user_id__in=options['user_ids'])
+
+        start = time.perf_counter()
+        done = 0
+        for count in rebuild_search_index(receipts, max(1, options['chunk_size'])):
+            done += count
+            self.stdout.write(f"  {done:>12,} receipts")
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(f" Indexed {done:,} receipts in {elapsed:.2f}s"))
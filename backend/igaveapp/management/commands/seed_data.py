@@ -1,63 +1,207 @@
+import math
 import random
-from datetime import timedelta, date
-from django.core.management.base import BaseCommand
+import time
+from bisect import bisect
+from datetime import date, timedelta
+from itertools import accumulate
+from multiprocessing import Pool
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from igaveapp.dedup import set_fingerprints
+from igaveapp.items import sync_items
 from igaveapp.models import Receipt
+from igaveapp.response_cache import invalidate_user
+from igaveapp.rollups import rebuild_rollups
+from igaveapp.search import index_receipts
+from igaveapp.store_memory import forget_store_categories
+
+# The data pool: stores for each category, most visited first
+STORES = {
+    'food': ["Starbucks", "McDonald's", "Trader Joe's", "Whole Foods", "7-Eleven", "Chipotle", "Subway", "Kroger"],
+    'transport': ["Shell Station", "Uber Rides", "Chevron", "Lyft", "BP", "Metro Transit"],
+    'utilities': ["Comcast", "PG&E", "Verizon", "AT&T", "City Water"],
+    'shopping': ["Walmart", "Target", "Amazon", "Apple Store", "Best Buy", "IKEA", "Home Depot"],
+    'entertainment': ["Netflix", "Spotify", "AMC Theatres", "Steam", "Ticketmaster"],
+    'health': ["CVS Pharmacy", "Walgreens", "Gym Membership", "Rite Aid"],
+    'general': ["Costco", "Dollar Tree", "USPS", "Staples", "Amazon"],
+}
+# What the line items of each category's receipts are called
+ITEM_NAMES = {
+    'food': ["Milk", "Bread", "Eggs", "Bananas", "Coffee", "Oat Milk", "Cheddar Cheese", "Chicken Breast", "Apples",
+             "Pasta", "Orange Juice", "Yogurt", "Latte", "Sandwich", "Burger", "Fries"],
+    'transport': ["Unleaded Fuel", "Diesel", "Ride Fare", "Car Wash", "Parking", "Transit Pass"],
+    'utilities': ["Internet Service", "Electricity", "Mobile Plan", "Water Bill", "Gas Service"],
+    'shopping': ["USB-C Cable", "T-Shirt", "Batteries", "Light Bulbs", "Shampoo", "Phone Case", "Towels", "Socks"],
+    'entertainment': ["Monthly Subscription", "Movie Ticket", "Popcorn", "Game Download", "Concert Ticket"],
+    'health': ["Vitamins", "Ibuprofen", "Bandages", "Gym Membership", "Toothpaste", "Sunscreen"],
+    'general': ["Paper Towels", "Postage", "Printer Paper", "Trash Bags", "Dish Soap", "Snacks"],
+}
+# How common each category is, and the median amount of its receipts (amounts are log-normal around it)
+CATEGORY_WEIGHTS = {'food': 35, 'shopping': 18, 'transport': 15, 'general': 10, 'entertainment': 8, 'health': 8,
+                    'utilities': 6}
+MEDIAN_AMOUNT = {'food': 14, 'transport': 30, 'utilities': 90, 'shopping': 45, 'entertainment': 16, 'health': 25,
+                 'general': 20}
+
+CATEGORIES = list(CATEGORY_WEIGHTS)
+CATEGORY_CUM_WEIGHTS = list(accumulate(CATEGORY_WEIGHTS.values()))
+# Zipf-like: the n-th store of a category is picked 1/n as often as the first
+STORE_CUM_WEIGHTS = {category: list(accumulate(1 / rank for rank in range(1, len(stores) + 1)))
+                     for category, stores in STORES.items()}
+
+# Receipts generated and inserted per task (one transaction each)
+DEFAULT_CHUNK_SIZE = 5000
+
+
+def pick(rng, values, cum_weights):
+    return values[bisect(cum_weights, rng.random() * cum_weights[-1])]
+
+
+def fake_items(rng, category, cents):
+    """1 to 25 line items ("desc", "price") of the category whose prices add up to the receipt total."""
+    count = 1 + min(int(rng.expovariate(1 / 3)), 24)
+    weights = [rng.random() + 0.1 for _ in range(count)]
+    scale = sum(weights)
+    prices = [int(cents * weight / scale) for weight in weights]
+    prices[-1] += cents - sum(prices)
+    return [{"desc": rng.choice(ITEM_NAMES[category]), "price": price / 100} for price in prices]
+
+
+def fake_receipt(rng, user_id, end, days):
+    category = pick(rng, CATEGORIES, CATEGORY_CUM_WEIGHTS)
+    cents = max(50, round(rng.lognormvariate(math.log(MEDIAN_AMOUNT[category]), 0.7) * 100))
+    # Newer receipts are more common than old ones (density falls linearly with age)
+    days_ago = int(days * (1 - math.sqrt(rng.random())))
+    if days_ago < 14:
+        status = rng.choice(['pending', 'pending', 'verified'])
+    else:
+        status = pick(rng, ['verified', 'pending', 'rejected'], [90, 95, 100])
+
+    roll = rng.random()
+    return Receipt(
+        user_id=user_id,
+        store_name=pick(rng, STORES[category], STORE_CUM_WEIGHTS[category]),
+        # A few receipts whose date or total the scanner couldn't read
+        date=None if roll < 0.02 else end - timedelta(days=days_ago),
+        total_amount=None if 0.02 <= roll < 0.03 else f"{cents // 100}.{cents % 100:02d}",
+        category=category,
+        status=status,
+        items=fake_items(rng, category, cents),
+    )
+
+
+def seed_chunk(task):
+    """Worker: generates and inserts one chunk of a user's receipts. The chunk's own RNG makes it reproducible."""
+    seed, user_index, chunk_index, user_id, count, end, days = task
+    rng = random.Random(f"{seed}:{user_index}:{chunk_index}")
+    receipts = set_fingerprints([fake_receipt(rng, user_id, end, days) for _ in range(count)])
+    with transaction.atomic():
+        Receipt.objects.bulk_create(receipts, batch_size=1000)
+        sync_items(receipts, replace=False)
+        index_receipts(receipts)
+    return count
+
+
+def init_worker():
+    import django
+    django.setup()  # a no-op in forked workers; spawned ones start without Django
+
 
 class Command(BaseCommand):
-    help = 'Injects fake receipt data for demonstration'
+    help = 'Injects fake receipt data, for demos or for building large benchmark datasets'
 
     def add_arguments(self, parser):
-        parser.add_argument('username', type=str, help='The username to assign receipts to')
-        parser.add_argument('--count', type=int, default=20, help='Number of receipts to create')
+        parser.add_argument('username', type=str, nargs='?', help='The username to assign receipts to')
+        parser.add_argument('--count', type=int, default=20,
+                            help='Receipts per user (with --users: the average; users get more or fewer)')
+        parser.add_argument('--users', type=int, default=0,
+                            help='Create this many users (<prefix>00000, ...) instead of using one existing user')
+        parser.add_argument('--prefix', type=str, default='seed_user_', help='Username prefix for --users')
+        parser.add_argument('--days', type=int, default=90, help='How far back the receipt dates go')
+        parser.add_argument('--end', type=date.fromisoformat, default=None,
+                            help='Newest receipt date, YYYY-MM-DD (default: today)')
+        parser.add_argument('--seed', type=int, default=None,
+                            help='Random seed; the same seed and options give the same data (default: random)')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Inserting processes (1 = run in this process; more need a database server)')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help='Receipts per bulk insert transaction')
 
     def handle(self, *args, **options):
-        username = options['username']
-        count = options['count']
+        seed = options['seed'] if options['seed'] is not None else random.randrange(2 ** 32)
+        workers = max(1, options['workers'])
+        chunk_size = max(1, options['chunk_size'])
+        end = options['end'] or date.today()
+        if workers > 1 and connection.vendor == 'sqlite' and connection.settings_dict['NAME'] in ('', ':memory:'):
+            raise CommandError("--workers needs a database the worker processes can share (not in-memory SQLite)")
+
+        users = self._users(options)
+        rng = random.Random(seed)
+        if options['users']:
+            counts = [max(1, round(options['count'] * rng.lognormvariate(-0.32, 0.8))) for _ in users]
+        else:
+            counts = [options['count']]
+
+        tasks = [
+            (seed, user_index, chunk_index, user.id, min(chunk_size, count - start), end, options['days'])
+            for user_index, (user, count) in enumerate(zip(users, counts))
+            for chunk_index, start in enumerate(range(0, count, chunk_size))
+        ]
+        total = sum(counts)
+        self.stdout.write(f"🌱 Seeding {total:,} receipts for {len(users):,} user(s) "
+                          f"(seed {seed}, {workers} worker(s))...")
+
+        started = time.perf_counter()
+        if workers == 1:
+            self._report(map(seed_chunk, tasks), total, started)
+        else:
+            connections.close_all()  # forked workers must open their own connections
+            with Pool(processes=workers, initializer=init_worker) as pool:
+                self._report(pool.imap_unordered(seed_chunk, tasks), total, started)
+        inserted = time.perf_counter() - started
 
+        # bulk_create sends no signals: refresh the seeded users' rollups, cached responses and store memory
+        user_ids = [user.id for user in users]
+        for start in range(0, len(user_ids), 500):
+            rebuild_rollups(user_ids[start:start + 500])
+        for user_id in user_ids:
+            invalidate_user(user_id)
+            forget_store_categories(user_id)
+        wall = time.perf_counter() - started
+
+        self.stdout.write(f"Inserted:    {total:,} receipts in {inserted:.2f}s ({total / inserted:,.0f} receipts/s)")
+        self.stdout.write(f"Rollups:     {wall - inserted:.2f}s")
+        self.stdout.write(self.style.SUCCESS(
+            f" Successfully added {total:,} fake receipts for {len(users):,} user(s)!"
+        ))
+
+    def _users(self, options):
+        if options['users']:
+            names = [f"{options['prefix']}{n:05d}" for n in range(options['users'])]
+            # Re-running with the same prefix reuses the existing users and adds receipts to them
+            User.objects.bulk_create([User(username=name, password=make_password(None)) for name in names],
+                                     batch_size=1000, ignore_conflicts=True)
+            by_name = {}
+            for start in range(0, len(names), 500):
+                by_name.update(User.objects.in_bulk(names[start:start + 500], field_name='username'))
+            return [by_name[name] for name in names]
+
+        username = options['username']
+        if not username:
+            raise CommandError("Give a username, or --users N to create seed users")
         try:
-            user = User.objects.get(username=username)
+            return [User.objects.get(username=username)]
         except User.DoesNotExist:
-            self.stdout.write(self.style.ERROR(f"❌ User '{username}' not found! Please create them first."))
-            return
-
-        # The Data Pool 
-        stores = [
-            "Walmart", "Target", "Starbucks", "Shell Station", "Uber Rides", 
-            "Netflix", "Apple Store", "Trader Joe's", "Amazon", "CVS Pharmacy", 
-            "McDonald's", "Whole Foods", "Spotify", "Gym Membership", "7-Eleven"
-        ]
-        
-        # Matches your CATEGORY_CHOICES in models.py
-        categories = ['food', 'transport', 'utilities', 'shopping', 'entertainment', 'health', 'general']
-        
-        self.stdout.write(f"🌱 Seeding {count} receipts for {username}...")
-
-        for i in range(count):
-            # 1. Random Date (Last 3 months)
-            days_ago = random.randint(0, 90)
-            fake_date = date.today() - timedelta(days=days_ago)
-
-            # 2. Random Amount ($5.00 to $180.00)
-            fake_amount = round(random.uniform(5.00, 180.00), 2)
-            
-            # 3. Random Store & Category
-            store = random.choice(stores)
-            cat = random.choice(categories)
-
-            # 4. Create the Receipt
-            Receipt.objects.create(
-                user=user,
-                store_name=store,
-                date=fake_date,
-                total_amount=fake_amount,
-                category=cat,
-                # Mix of Verified/Pending so the chart looks interesting
-                status=random.choice(['verified', 'verified', 'verified', 'pending']), 
-                items=[
-                    {"desc": "Demo Item 1", "price": round(fake_amount * 0.6, 2)},
-                    {"desc": "Tax", "price": round(fake_amount * 0.4, 2)}
-                ] 
-            )
-
-        self.stdout.write(self.style.SUCCESS(f" Successfully added {count} fake receipts for {username}!"))
\ No newline at end of file
+            raise CommandError(f"❌ User '{username}' not found! Please create them first.")
+
+    def _report(self, results, total, started):
+        """Consumes the chunk results, printing progress and throughput at most once a second."""
+        done, last = 0, started
+        for count in results:
+            done += count
+            now = time.perf_counter()
+            if now - last >= 1 or done == total:
+                last = now
+                self.stdout.write(f"  {done:>12,}/{total:,} ({done / total:6.1%})  "
+                                  f"{done / (now - started):,.0f} receipts/s")
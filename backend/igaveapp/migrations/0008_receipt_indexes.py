@@ -0,0 +1,27 @@
+# Generated by Django 6.0 on 2026-10-17 13:18
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('igaveapp', '0007_ocrcacheentry'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='receipt',
+            index=models.Index(fields=['user', 'date', 'id'], name='receipt_user_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='receipt',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='receipt_user_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='receipt',
+            index=models.Index(fields=['user', 'category', 'date'], name='receipt_user_cat_date_idx'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 6.0 on 2026-10-17 13:36
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth
+
+
+def fill_rollups(apps, schema_editor):
+    """Rollups for the receipts that already exist (the same GROUP BYs as rollups.rebuild_rollups)."""
+    Receipt = apps.get_model('igaveapp', 'Receipt')
+    SpendingRollup = apps.get_model('igaveapp', 'SpendingRollup')
+    receipts = Receipt.objects.filter(date__isnull=False)
+    for period, bucket in [('day', F('date')), ('month', TruncMonth('date'))]:
+        rows = (
+            receipts.annotate(bucket=bucket)
+            .values('user_id', 'bucket', 'category')
+            .annotate(bucket_total=Sum('total_amount'), bucket_count=Count('id'))
+            .order_by()
+        )
+        SpendingRollup.objects.bulk_create([
+            SpendingRollup(user_id=row['user_id'], period=period, start=row['bucket'], category=row['category'],
+                           total=row['bucket_total'] or 0, count=row['bucket_count'])
+            for row in rows.iterator(chunk_size=2000)
+        ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('igaveapp', '0010_exportjob'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SpendingRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('day', 'Day'), ('month', 'Month')], max_length=5)),
+                ('start', models.DateField()),
+                ('category', models.CharField(max_length=50)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'period', 'start', 'category'), name='rollup_bucket_unique')],
+            },
+        ),
+        migrations.RunPython(fill_rollups, migrations.RunPython.noop),
+    ]
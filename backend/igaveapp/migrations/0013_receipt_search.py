@@ -0,0 +1,46 @@
+# Generated by Django 6.0 on 2026-10-17 15:10
+
+from django.db import migrations
+
+# The full-text index behind GET /api/receipts/?q= (igaveapp/search.py). It isn't a model: its shape
+# depends on the database. Fill it for existing receipts with "manage.py rebuild_search_index".
+POSTGRESQL = [
+    """
+    CREATE TABLE igaveapp_receiptsearch (
+        receipt_id bigint PRIMARY KEY REFERENCES igaveapp_receipt (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,
+        user_id integer NOT NULL,
+        document tsvector NOT NULL
+    )
+    """,
+    "CREATE INDEX receiptsearch_document_gin ON igaveapp_receiptsearch USING gin (document)",
+]
+SQLITE = [
+    """
+    CREATE VIRTUAL TABLE igaveapp_receiptsearch USING fts5(
+        owner, store_name, items, category,
+        tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+    )
+    """,
+]
+
+
+def create_search_index(apps, schema_editor):
+    statements = {'postgresql': POSTGRESQL, 'sqlite': SQLITE}.get(schema_editor.connection.vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('postgresql', 'sqlite'):
+        schema_editor.execute("DROP TABLE IF EXISTS igaveapp_receiptsearch")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('igaveapp', '0012_receiptitem'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 6.0 on 2026-10-17 16:20
+
+from django.db import migrations
+
+# search_receipt_ids() filters the PostgreSQL search table on user_id. With only the GIN index on
+# document, a common word matched and ranked every user's rows before the owner filter threw most of
+# them away; with this index the planner can start from the user's rows (or AND the two indexes).
+# SQLite's FTS5 table matches the owner inside the full-text index and needs nothing.
+
+
+def create_user_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute("CREATE INDEX receiptsearch_user_idx ON igaveapp_receiptsearch (user_id)")
+
+
+def drop_user_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS receiptsearch_user_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('igaveapp', '0014_receipt_fingerprint'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_user_index, drop_user_index),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-17 16:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('igaveapp', '0015_receipt_search_user_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='scanjob',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+    ]
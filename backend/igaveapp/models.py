@@ -1,3 +1,6 @@
+import os
+import uuid
+from django.conf import settings
 from django.db import models
 from django.contrib.auth.models import User
 
@@ -40,8 +43,191 @@ class Receipt(models.Model):
     # Stores the list of items (Milk, Bread, etc.) as raw JSON data
     items = models.JSONField(default=list, blank=True)
     
+    # Duplicate detection (dedup.py): a hash of the normalized store, date, total and items, kept up to
+    # date by save(), and the SHA-256 of the scanned image when the receipt came from a scan
+    fingerprint = models.CharField(max_length=32, blank=True, default='', editable=False)
+    image_hash = models.CharField(max_length=64, blank=True, default='')
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        # Every list/stats/export query is "this user's receipts" plus a date filter or an ordering,
+        # so each index leads with user and the database never has to scan another user's rows.
+        # The trailing id matches the (field, id) keyset the list is paginated on.
+        indexes = [
+            models.Index(fields=['user', 'date', 'id'], name='receipt_user_date_id_idx'),
+            models.Index(fields=['user', '-created_at', '-id'], name='receipt_user_created_id_idx'),
+            models.Index(fields=['user', 'category', 'date'], name='receipt_user_cat_date_idx'),
+            models.Index(fields=['user', 'fingerprint'], name='receipt_user_fingerprint_idx'),
+            models.Index(fields=['user', 'image_hash'], name='receipt_user_image_hash_idx'),
+        ]
+
+    # Set by ReceiptSerializer.update() to the fields the request really changed, for the save() that follows
+    changed_fields = None
+
+    # What the fingerprint is computed from
+    FINGERPRINT_FIELDS = ('store_name', 'date', 'total_amount', 'items')
+
+    def save(self, *args, update_fields=None, **kwargs):
+        if update_fields is None or set(self.FINGERPRINT_FIELDS) & set(update_fields):
+            from .dedup import receipt_fingerprint  # dedup.py imports this module
+            self.fingerprint = receipt_fingerprint(self)
+            if update_fields is not None:
+                update_fields = {*update_fields, 'fingerprint'}
+        try:
+            super().save(*args, update_fields=update_fields, **kwargs)
+        finally:
+            self.changed_fields = None
+
+    def may_have_changed(self, update_fields, *names):
+        """
+        For post_save handlers that skip work a save didn't need (items.py, search.py): whether the save
+        may have changed any of these fields (attnames). A save with update_fields wrote just those, one
+        after ReceiptSerializer.update() its changed_fields; any other save may have changed anything.
+        """
+        written = update_fields if update_fields is not None else self.changed_fields
+        if written is None:
+            return True
+        return any(self._meta.get_field(name).attname in names for name in written)
+
     def __str__(self):
         return f"{self.store_name} - {self.total_amount}"
+
+
+class ReceiptItem(models.Model):
+    """
+    One line item of a receipt, copied out of Receipt.items (which stays the source of truth) so that
+    item questions ("how much did I spend on milk?") are indexed SQL instead of decoding every receipt's
+    JSON. Rewritten by items.py whenever a receipt's items are saved; "manage.py backfill_items" fills
+    it for receipts saved before it existed.
+    """
+
+    receipt = models.ForeignKey(Receipt, on_delete=models.CASCADE, related_name='line_items')
+    # Copied from the receipt so the index can lead with it, like the Receipt indexes
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    position = models.PositiveSmallIntegerField()
+    name = models.CharField(max_length=255)
+    # Case-folded, without punctuation: what search and the per-item totals match on
+    normalized_name = models.CharField(max_length=255)
+    # The line's price as printed (None when it couldn't be read)
+    price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    quantity = models.DecimalField(max_digits=10, decimal_places=3, default=1)
+
+    class Meta:
+        indexes = [
+            # varchar_pattern_ops lets PostgreSQL use the index for LIKE 'milk%' whatever the collation
+            # (opclasses are ignored on other databases)
+            models.Index(fields=['user', 'normalized_name'], name='item_user_name_idx',
+                         opclasses=['', 'varchar_pattern_ops']),
+        ]
+
+    def __str__(self):
+        return f"{self.name} - {self.price}"
+
+
+class SpendingRollup(models.Model):
+    """
+    Per-user spending per category for one day or one calendar month (start = the bucket's first day).
+    Kept up to date by the Receipt signals in rollups.py, so /stats/ sums a handful of buckets instead
+    of every receipt in the range; "manage.py rebuild_rollups" recomputes them from the receipts.
+    Undated receipts have no bucket.
+    """
+
+    PERIOD_CHOICES = [
+        ('day', 'Day'),
+        ('month', 'Month'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    period = models.CharField(max_length=5, choices=PERIOD_CHOICES)
+    start = models.DateField()
+    category = models.CharField(max_length=50)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'period', 'start', 'category'], name='rollup_bucket_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.period} {self.start} {self.category}: {self.total} ({self.count})"
+
+
+class ScanJob(models.Model):
+    """
+    A receipt scan running in the background (POST /api/receipts/scan/?async=true).
+    Lives in the database so any worker can answer the status poll; kept SCAN_JOB_TTL seconds.
+    """
+
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    file_name = models.CharField(max_length=255, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+
+    # The receipt draft (same shape as the synchronous scan response) once the job is done
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"ScanJob {self.id} ({self.status})"
+
+
+class ExportJob(models.Model):
+    """
+    An export written to a file in the background (POST /api/receipts/export/jobs/?as=xlsx),
+    for exports too large to wait on. The file is downloaded once status is "done" and kept for
+    EXPORT_JOBS['TTL'] seconds.
+    """
+
+    STATUS_CHOICES = ScanJob.STATUS_CHOICES
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    format = models.CharField(max_length=20)
+    # The request's filters (?month=, ?ids=, ...), replayed by the job
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+
+    rows = models.PositiveIntegerField(default=0)
+    size = models.PositiveBigIntegerField(default=0)
+    error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def file_path(self):
+        return os.path.join(settings.EXPORT_JOBS['DIR'], f"{self.id}.{self.format}")
+
+    def __str__(self):
+        return f"ExportJob {self.id} ({self.format}, {self.status})"
+
+
+class OcrCacheEntry(models.Model):
+    """
+    OCR result cached by the SHA-256 of the uploaded image (OCR_CACHE backend "database").
+    Holds the raw Vision text and the parsed receipt dict.
+    """
+
+    key = models.CharField(max_length=80, primary_key=True)
+    text = models.TextField()
+    data = models.JSONField()
+    size = models.PositiveIntegerField(default=0)
+
+    created_at = models.DateTimeField(db_index=True)
+    last_used_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return self.key
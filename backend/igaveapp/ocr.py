@@ -1,255 +1,395 @@
 import os
 import io
-import re
 import json
-from datetime import datetime # <--- 1. NEW IMPORT
+import hashlib
+import logging
+import threading
+from django.conf import settings
 from google.oauth2.service_account import Credentials
+from google.api_core import exceptions as google_exceptions
 from google.cloud import vision
 
+from .parsing import parse_receipt_text, parse_date, parse_total, parse_vendor, is_tracing, trace_step  # noqa: F401
+from .ocr_cache import get_ocr_cache, image_hash
+from .preprocess import preprocess_image
+from .pdf import is_pdf, extract_pdf_text
+from .ocr_backends import get_ocr_backend
+
+logger = logging.getLogger(__name__)
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
-def extract_receipt_data(file_path):
+# Errors that mean the gRPC channel (or the credentials behind it) is no longer usable.
+# When we see one of these we throw the pooled client away and build a fresh one.
+BROKEN_CHANNEL_ERRORS = (
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.Unauthenticated,
+)
+
+
+def _credentials_fingerprint():
     """
-    Scans a receipt using Google Cloud Vision API and intelligently extracts:
-    - Vendor (Store Name)
-    - Date (US & EU formats)
-    - Total Amount
-    - Category (Food, Transport, etc.)
+    Identifies the credentials currently configured, so the pool can tell when they rotate.
+    Returns None when no credentials are available at all.
     """
-    client = None
+    google_json_str = os.environ.get("GOOGLE_CREDENTIALS_JSON")
+    if google_json_str:
+        return ("env", hashlib.sha256(google_json_str.encode("utf-8")).hexdigest())
 
-    # --- 1. SETUP GOOGLE CLIENT ---
-    try:
-        # Check environment variable first (Production / Secure)
-        google_json_str = os.environ.get("GOOGLE_CREDENTIALS_JSON")
+    creds_path = os.path.join(BASE_DIR, "google_credentials.json")
+    if os.path.exists(creds_path):
+        return ("file", creds_path, os.stat(creds_path).st_mtime_ns)
+    return None
 
-        if google_json_str:
-            creds_dict = json.loads(google_json_str)
-            credentials = Credentials.from_service_account_info(creds_dict)
-            client = vision.ImageAnnotatorClient(credentials=credentials)
-        else:
-            # Check local file (Development)
-            creds_path = os.path.join(BASE_DIR, "google_credentials.json")
-            if os.path.exists(creds_path):
-                client = vision.ImageAnnotatorClient.from_service_account_json(creds_path)
-            else:
-                print(" OCR Error: No Google Credentials found.")
+
+def _build_client(fingerprint):
+    if fingerprint[0] == "env":
+        creds_dict = json.loads(os.environ.get("GOOGLE_CREDENTIALS_JSON"))
+        credentials = Credentials.from_service_account_info(creds_dict)
+        return vision.ImageAnnotatorClient(credentials=credentials)
+    return vision.ImageAnnotatorClient.from_service_account_json(fingerprint[1])
+
+
+class VisionClientPool:
+    """
+    Holds one ImageAnnotatorClient per worker process, shared by every thread.
+
+    The client (and its gRPC channel) is created lazily on the first scan and reused after that.
+    It is rebuilt when the credentials change, when the process has forked (gunicorn workers),
+    or when a call reports a broken channel through discard().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._client = None
+        self._fingerprint = None
+        self._pid = None
+        self.created = 0
+        self.reused = 0
+        self.discarded = 0
+
+    def get(self):
+        """Returns the shared client, or None when no credentials are configured."""
+        fingerprint = _credentials_fingerprint()
+
+        with self._lock:
+            if fingerprint is None:
+                self._client = None
+                self._fingerprint = None
                 return None
+
+            if (self._client is not None
+                    and self._fingerprint == fingerprint
+                    and self._pid == os.getpid()):
+                self.reused += 1
+                return self._client
+
+            self._client = _build_client(fingerprint)
+            self._fingerprint = fingerprint
+            self._pid = os.getpid()
+            self.created += 1
+            return self._client
+
+    def discard(self, client):
+        """Drops the client if it is still the pooled one, so the next get() rebuilds it."""
+        with self._lock:
+            if client is not None and client is self._client:
+                self._client = None
+                self.discarded += 1
+
+    def reset(self):
+        """Forgets the client and zeroes the counters (used by tests)."""
+        with self._lock:
+            self._client = None
+            self._fingerprint = None
+            self._pid = None
+            self.created = 0
+            self.reused = 0
+            self.discarded = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "created": self.created,
+                "reused": self.reused,
+                "discarded": self.discarded,
+                "active": self._client is not None,
+            }
+
+
+# One pool per process (each gunicorn worker gets its own after the fork)
+vision_client_pool = VisionClientPool()
+
+
+def _call_vision(call):
+    """
+    Runs call(client) on the shared Vision client, rebuilding the client and retrying once
+    when the channel turns out to be broken. Returns None when there are no credentials.
+    """
+    # --- 1. GET THE SHARED GOOGLE CLIENT ---
+    try:
+        client = vision_client_pool.get()
+        if client is None:
+            logger.warning("OCR: no Google credentials found")
+            return None
     except Exception as e:
-        print(f" OCR Client Setup Error: {e}")
+        logger.error("OCR client setup failed: %s", e)
         return None
 
     # --- 2. CALL VISION API  ---
     try:
-        with io.open(file_path, 'rb') as image_file:
-            content = image_file.read()
+        return call(client)
+    except BROKEN_CHANNEL_ERRORS as e:
+        # The pooled channel went bad (or the token was revoked): rebuild it and retry once
+        logger.warning("OCR: Vision client unusable (%s), reconnecting", e)
+        vision_client_pool.discard(client)
+        client = vision_client_pool.get()
+        if client is None:
+            return None
+        return call(client)
+
 
-        image = vision.Image(content=content)
+def _vision_image(content):
+    # The request needs its own bytes object; this is the only copy of the upload we make
+    return vision.Image(content=content if isinstance(content, bytes) else bytes(content))
+
+
+def _annotation_text(response):
+    if not response.text_annotations:
+        logger.info("OCR: no text found in image")
+        return None
+    # The first annotation contains the entire text
+    return response.text_annotations[0].description
+
+
+def detect_text(content):
+    """
+    Sends the image (bytes or any buffer) to Google Cloud Vision and returns the full OCR text,
+    or None when there are no credentials, the call fails, or no text was found.
+    """
+    try:
         # We use text_detection to get the full block of text
-        response = client.text_detection(image=image)
-        
-        if not response.text_annotations:
-            print(" OCR: No text found in image.")
+        image = _vision_image(content)
+        response = _call_vision(lambda client: client.text_detection(image=image))
+        if response is None:
             return None
+        return _annotation_text(response)
 
-        # The first annotation contains the entire text
-        full_text = response.text_annotations[0].description
-        lines = full_text.split('\n')
-        
     except Exception as e:
-        print(f" OCR Processing Error: {e}")
+        logger.warning("OCR failed: %s", e)
         return None
 
-    # --- 3. SMART EXTRACTION LOGIC  ---
-    
-    data = {
-        "vendor": None,
-        "date": None,
-        "total": None,
-        "category": "general", # Default value
-        "items": [] 
-    }
 
-    # Regex Patterns
-    
-    # --- 2. UPDATED DATE PATTERN (Bilingual: Math & English) ---
-    date_pattern = r'(?i)(\d{1,2}[./-]\d{1,2}[./-]\d{2,4}|\d{4}-\d{2}-\d{2}|(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*[\s.,-]+\d{1,2}[a-z]{0,2}[\s.,-]+\d{2,4}|\d{1,2}[\s.,-]+(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*[\s.,-]+\d{2,4})'
-    
-    total_pattern = r'(?i)(total|amount|balance|due|grand total)\s*[:$]?\s*(\d+[.,]\d{2})'
-    
-    # NEW: Item Pattern (Text followed by a price at the end of the line)
-    item_pattern = r'(.+?)\s+(\d+[.,]\d{2})$'
-
-    # Words to ignore when looking for items
-    blacklist_words = ["total", "subtotal", "tax", "vat", "change", "cash", "due", "balance", "visa", "mastercard", "date"]
-
-    # --- A. EXECUTE DATE SEARCH (Smart & Standardized) 📅 ---
-    date_matches = re.findall(date_pattern, full_text)
-    
-    if date_matches:
-        raw_date = date_matches[0]
-        # Clean up the string (remove weird spaces or suffixes like "th")
-        clean_date = re.sub(r'(st|nd|rd|th|,)', '', raw_date).strip()
-        
-        # The Translator: Try to understand the format
-        formats_to_try = [
-            "%m/%d/%Y", "%m-%d-%Y", "%m.%d.%Y",   # 12/25/2023
-            "%Y-%m-%d",                           # 2023-12-25
-            "%b %d %Y", "%B %d %Y",               # Dec 25 2023
-            "%d %b %Y", "%d %B %Y",               # 25 Dec 2023
-            "%m/%d/%y", "%m-%d-%y"                # 12/25/23 (Short year)
-        ]
-        
-        for fmt in formats_to_try:
-            try:
-                # Try to convert to YYYY-MM-DD
-                dt_obj = datetime.strptime(clean_date, fmt)
-                data['date'] = dt_obj.strftime("%Y-%m-%d")
-                print(f" Date Fixed: {raw_date} -> {data['date']}")
-                break
-            except ValueError:
-                continue
-        
-        # Fallback: If translation fails, just save the raw string
-        if not data['date']:
-            data['date'] = raw_date
-
-    # --- B. EXECUTE VENDOR SEARCH ---
-    ignored_vendor_words = ["welcome", "receipt", "copy", "customer", "transaction", "original", "date"]
-    for line in lines[:6]:
-        clean_line = line.strip()
-        if not clean_line or len(clean_line) < 2: continue
-        if re.search(date_pattern, clean_line): continue
-        if any(word in clean_line.lower() for word in ignored_vendor_words): continue
-        if re.search(r'\d{3}[-.]\d{3}[-.]\d{4}', clean_line): continue # Phone numbers
-        if re.match(r'^\$?\d+[.,]\d{2}$', clean_line): continue # Standalone prices
-        
-        data['vendor'] = clean_line
-        break 
-    if not data['vendor']: data['vendor'] = "Unknown Vendor"
-
-    # --- C. EXECUTE TOTAL SEARCH ---
-    total_match = re.search(total_pattern, full_text)
-    if total_match:
-        data['total'] = total_match.group(2).replace(',', '.')
-    else:
-        # Fallback max number
-        all_prices = re.findall(r'\$?\s*(\d+\.\d{2})', full_text)
-        if all_prices:
-            try:
-                floats = [float(p) for p in all_prices]
-                data['total'] = str(max(floats))
-            except: pass
-
-    # --- D. EXECUTE ITEM SEARCH (THE MATCHMAKER FIX)  ---
-    print("\n --- DEBUG: MATCHMAKER MODE ---")
-    
-    single_line_pattern = r'(.+?)\s+[$]?(\d+[.,]\d{2})$'
-    price_only_pattern = r'^[$]?\s*(\d+[.,]\d{2})$'
-
-    i = 0
-    while i < len(lines):
-        line = lines[i].strip()
-        if not line:
-            i += 1
-            continue
-
-        print(f"Line {i}: '{line}'", end=" ... ")
-
-        # Check 1: Single Line Item
-        match = re.search(single_line_pattern, line)
-        if match:
-            item_name = match.group(1).strip()
-            item_price = match.group(2).replace(',', '.')
-            
-            if any(bad in item_name.lower() for bad in blacklist_words):
-                print(" Ignored (Blacklist)")
-            elif data['date'] and data['date'] in item_name:
-                print(" Ignored (Date)")
-            else:
-                print(f" MATCH (Single Line)! {item_name} -> {item_price}")
-                data['items'].append({"name": item_name, "price": float(item_price)})
-            i += 1
-            continue
-
-        # Check 2: Split Line Item
-        if i + 1 < len(lines):
-            next_line = lines[i+1].strip()
-            price_match = re.match(price_only_pattern, next_line)
-            
-            if price_match:
-                item_name = line
-                item_price = price_match.group(1).replace(',', '.')
-                
-                if any(bad in item_name.lower() for bad in blacklist_words):
-                    print(" Ignored (Blacklist)")
-                elif re.match(r'^[\d\W]+$', item_name): 
-                    print(" Ignored (Just Numbers)")
-                    i += 1
-                    continue 
-                else:
-                    print(f" MATCH (Split Line)! {item_name} -> {item_price}")
-                    data['items'].append({"name": item_name, "price": float(item_price)})
-                    i += 2 
-                    continue
-
-        print(" No match")
-        i += 1
-
-    print(" --- END DEBUG ---\n")
-
-    # --- E. INTELLIGENT CATEGORIZATION  ---
-    categories = {
-        'food': [
-            'burger', 'pizza', 'restaurant', 'cafe', 'coffee', 'grill', 'kitchen', 'food', 'market', 
-            'diner', 'bistro', 'steak', 'mcdonalds', 'kfc', 'starbucks', 'subway', 'wendys', 'taco bell',
-            'dunkin', 'chipotle', 'domino', 'meal', 'bread', 'bakery', 'sushi'
-        ],
-        'transport': [
-            'uber', 'lyft', 'taxi', 'shell', 'exxon', 'bp', 'chevron', 'fuel', 'gas', 'station', 
-            'train', 'metro', 'bus', 'airline', 'flight', 'parking', 'garage'
-        ],
-        'utilities': [
-            'water', 'electric', 'power', 'energy', 'internet', 'wifi', 'telecom', 'mobile', 
-            'at&t', 'verizon', 't-mobile', 'comcast', 'bill', 'insurance'
-        ],
-        'shopping': [
-            'amazon', 'walmart', 'target', 'ikea', 'mall', 'shop', 'clothing', 'shoes', 'apparel',
-            'nike', 'adidas', 'zara', 'h&m', 'retail', 'outlet', 'boutique', 'book'
-        ],
-        
-        'entertainment': [
-            'cinema', 'movie', 'theatre', 'netflix', 'spotify', 'ticket', 'event', 'bowling', 
-            'golf', 'game', 'concert', 'museum'
-        ],
-        'health': [
-            'pharmacy', 'cvs', 'walgreens', 'hospital', 'clinic', 'doctor', 'dental', 'gym', 
-            'fitness', 'medicine', 'drug'
-        ]
-    }
+# Vision accepts at most 16 images per synchronous batch_annotate_images call
+VISION_BATCH_LIMIT = 16
+
+
+def batch_detect_text(contents):
+    """
+    OCRs up to VISION_BATCH_LIMIT images in a single batch_annotate_images round trip.
+    Returns one text (or None) per image, in order, or None when the batch call itself failed
+    so the caller can fall back to one text_detection call per image.
+    """
+    if len(contents) > VISION_BATCH_LIMIT:
+        raise ValueError(f"Vision batches hold at most {VISION_BATCH_LIMIT} images, got {len(contents)}")
+    try:
+        feature = vision.Feature(type_=vision.Feature.Type.TEXT_DETECTION)
+        requests = [vision.AnnotateImageRequest(image=_vision_image(c), features=[feature]) for c in contents]
+        batch = _call_vision(lambda client: client.batch_annotate_images(requests=requests))
+        if batch is None:
+            return None
+    except Exception as e:
+        logger.warning("OCR batch failed: %s", e)
+        return None
+
+    texts = []
+    for response in batch.responses:
+        if response.error.message:
+            logger.warning("OCR failed: %s", response.error.message)
+            texts.append(None)
+        else:
+            texts.append(_annotation_text(response))
+    return texts
 
-    # Helper to check text against keywords
-    def check_category(text):
-        if not text: return None
-        text = text.lower()
-        
-        # Check explicit keywords
-        for cat, keywords in categories.items():
-            if any(keyword in text for keyword in keywords):
-                return cat
+
+def open_image(source):
+    """
+    Returns the image content of source without copying it where possible:
+    - bytes / bytearray / memoryview are used as they are
+    - uploads that Django kept on disk (large files) are read from their temp path
+    - in-memory uploads and other BytesIO objects give back their internal bytes (getvalue()
+      shares the buffer instead of copying it, unlike getbuffer() or read())
+    - other file-like objects are read, and str / PathLike values are opened as files
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return source
+
+    if hasattr(source, 'temporary_file_path'):
+        source = source.temporary_file_path()
+
+    if isinstance(source, (str, os.PathLike)):
+        with io.open(source, 'rb') as image_file:
+            return image_file.read()
+
+    raw = getattr(source, 'file', source)  # Django UploadedFile wraps the real file object
+    if hasattr(raw, 'getvalue'):
+        return raw.getvalue()
+
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    return source.read()
+
+
+def _read_image(source):
+    try:
+        return open_image(source)
+    except Exception as e:
+        logger.warning("OCR failed: %s", e)
+        return None
+
+
+def prepare_image(content):
+    """
+    Runs the preprocessing pipeline (settings.OCR_PREPROCESS) on the image before it goes to Vision.
+    Falls back to the original bytes when it is disabled, the upload is not something Pillow can
+    read, or the re-encoded image would come out bigger.
+    """
+    config = getattr(settings, 'OCR_PREPROCESS', {})
+    if not config.get('ENABLED', True):
+        return content
+
+    try:
+        processed, report = preprocess_image(
+            content,
+            max_edge=config.get('MAX_EDGE', 2048),
+            grayscale=config.get('GRAYSCALE', True),
+            image_format=config.get('FORMAT', 'JPEG'),
+            quality=config.get('QUALITY', 85),
+        )
+    except Exception as e:
+        logger.info("OCR preprocess skipped: %s", e)
+        return content
+
+    logger.debug("OCR preprocess: %s -> %s bytes, %s -> %s, %s", report['bytes_in'], report['bytes_out'],
+                 report['size_in'], report['size_out'], report['timings_ms'])
+    if report['bytes_out'] >= report['bytes_in']:
+        return content
+    return processed
+
+
+def scan_pdf(content):
+    """
+    OCRs every page of a PDF (settings.OCR_PDF) and merges the text in page order.
+    Returns (text, report) with the page count and per-page render / OCR times.
+    """
+    config = getattr(settings, 'OCR_PDF', {})
+    full_text, report = extract_pdf_text(
+        content,
+        get_ocr_backend().detect_text,
+        dpi=config.get('DPI', 200),
+        max_pages=config.get('MAX_PAGES', 20),
+        workers=config.get('WORKERS', 4),
+    )
+    logger.debug("OCR PDF: %s/%s pages (render %sms, ocr %sms): %s", report['pages_scanned'], report['page_count'],
+                 report['render_ms'], report['ocr_ms'], report['per_page'])
+    return full_text, report
+
+
+def _scan(content):
+    """Image or PDF bytes -> (text, pdf report or None), read by the configured OCR backend."""
+    if is_pdf(content):
+        return scan_pdf(content)
+    return get_ocr_backend().detect_text(prepare_image(content)), None
+
+
+def cache_key(content, digest=None):
+    """
+    OCR cache key of an upload: its SHA-256 (digest, when the caller already has it), prefixed with the
+    engine name unless that is Google Vision.
+    """
+    key = digest or image_hash(content)
+    engine = get_ocr_backend().name
+    return key if engine == "google" else f"{engine}-{key}"
+
+
+def extract_text(source):
+    """Returns the raw OCR text of an image or PDF (anything open_image accepts), or None on failure."""
+    content = _read_image(source)
+    if content is None:
+        return None
+    try:
+        return _scan(content)[0]
+    except Exception as e:
+        logger.warning("OCR failed: %s", e)
         return None
 
-    # 1. Check Vendor First (High Priority)
-    cat_match = check_category(data['vendor'])
-    
-    # 2. If no vendor match, check the first few items
-    if not cat_match:
-        for item in data['items'][:5]: # Check first 5 items
-            cat_match = check_category(item['name'])
-            if cat_match: break
-    
-    if cat_match:
-        data['category'] = cat_match
-
-    return data
\ No newline at end of file
+
+def extract_receipt_data(source):
+    """
+    Scans a receipt with the configured OCR backend (Google Cloud Vision by default) and intelligently extracts:
+    - Vendor (Store Name)
+    - Date (US & EU formats)
+    - Total Amount
+    - Category (Food, Transport, etc.)
+
+    source can be raw bytes, a memoryview, a Django upload / file-like object or a file path;
+    uploads are handed over as they are, without a temp-file round trip.
+    PDFs (bills, e-invoices) are OCR'd page by page and come back with a "pages" report.
+    Results are cached by a SHA-256 of the image bytes, so re-uploading the
+    same photo skips the Vision call entirely. The hash comes back as "image_hash"
+    (duplicate detection, dedup.py).
+    """
+    content = _read_image(source)
+    if content is None:
+        return None
+
+    cache = get_ocr_cache()
+    digest = image_hash(content)
+    key = cache_key(content, digest)
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            trace_step("ocr", cache="hit", image_hash=digest)
+            if is_tracing():
+                # Parsed again from the cached text, for the decisions
+                return {**parse_receipt_text(cached["text"]), "image_hash": digest}
+            return {**cached["data"], "image_hash": digest}
+
+    try:
+        full_text, pdf_report = _scan(content)
+    except Exception as e:
+        logger.warning("OCR failed: %s", e)
+        return None
+    trace_step("ocr", cache="miss", image_hash=digest, engine=get_ocr_backend().name,
+               lines=None if full_text is None else full_text.count('\n') + 1)
+    if full_text is None:
+        return None
+
+    # --- 3. SMART EXTRACTION LOGIC (no network from here on) ---
+    data = parse_receipt_text(full_text)
+    if cache is not None:
+        cache.set(key, full_text, data)
+    data = {**data, "image_hash": digest}
+    if pdf_report is not None:
+        # Timings describe this scan only, so they are not cached with the data
+        data["pages"] = pdf_report
+    return data
+
+
+def build_draft(data):
+    """Turns the OCR result into the receipt draft the frontend pre-fills the form with."""
+    draft = {
+        "store_name": data.get('vendor') or "Unknown Vendor",
+        "date": data.get('date'),
+        "total_amount": data.get('total'),
+        "items": data.get('items', []),
+        "category": data.get('category'),
+        "status": "pending"
+    }
+    if data.get('image_hash'):
+        # Sent back with the receipt when it is saved, so a second scan of the same photo is caught
+        draft["image_hash"] = data['image_hash']
+    if 'pages' in data:
+        draft["pages"] = data['pages']
+    return draft
@@ -0,0 +1,180 @@
+import hashlib
+import io
+import logging
+import os
+import threading
+import time
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+logger = logging.getLogger(__name__)
+
+
+class BaseOcrBackend:
+    """
+    Turns image bytes into the raw OCR text of the receipt (or None when nothing was read).
+
+    detect_text() is the one method a backend must implement. Backends that can OCR several
+    images in one round trip set supports_batch and implement batch_detect_text().
+    """
+
+    name = None
+    supports_batch = False
+
+    def __init__(self, **options):
+        self.options = options
+
+    def detect_text(self, content):
+        raise NotImplementedError
+
+    def batch_detect_text(self, contents):
+        """One text (or None) per image, or None when the batch failed and callers should go one by one."""
+        return None
+
+
+class GoogleVisionBackend(BaseOcrBackend):
+    """Google Cloud Vision text detection through the shared client pool in ocr.py (the default)."""
+
+    name = "google"
+    supports_batch = True
+
+    def detect_text(self, content):
+        from . import ocr
+
+        return ocr.detect_text(content)
+
+    def batch_detect_text(self, contents):
+        from . import ocr
+
+        return ocr.batch_detect_text(contents)
+
+
+class TesseractBackend(BaseOcrBackend):
+    """
+    Local, offline OCR for self-hosted deployments. Needs the tesseract binary and the
+    optional pytesseract package (pip install pytesseract).
+    """
+
+    name = "tesseract"
+
+    def __init__(self, lang="eng", tesseract_cmd=None, **options):
+        super().__init__(**options)
+        try:
+            import pytesseract
+        except ImportError:
+            raise ImproperlyConfigured("OCR_BACKEND 'tesseract' needs pytesseract (pip install pytesseract)")
+        if tesseract_cmd:
+            pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+        self._pytesseract = pytesseract
+        self.lang = lang
+
+    def detect_text(self, content):
+        from PIL import Image
+
+        try:
+            image = Image.open(io.BytesIO(content))
+            text = self._pytesseract.image_to_string(image, lang=self.lang)
+        except Exception as e:
+            logger.warning("OCR failed: %s", e)
+            return None
+        text = text.strip()
+        if not text:
+            logger.info("OCR: no text found in image")
+            return None
+        return text
+
+
+class FakeOcrBackend(BaseOcrBackend):
+    """
+    Deterministic OCR for tests and load tests: no network, no credentials.
+
+    Answers with the text of a fixture file (*.txt under `fixtures`). An upload whose bytes are
+    b"fixture:<name>" gets <name>.txt; any other image always gets the same fixture, picked by
+    its SHA-256. Every call (a batch counts as one) sleeps latency_ms +/- jitter_ms first, like
+    a Vision round trip would take.
+    """
+
+    name = "fake"
+    supports_batch = True
+    PREFIX = b"fixture:"
+
+    def __init__(self, fixtures=None, latency_ms=0, jitter_ms=0, **options):
+        super().__init__(**options)
+        self.fixtures = fixtures or os.path.join(os.path.dirname(__file__), "testdata", "receipts")
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self._texts = None
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def _load(self):
+        with self._lock:
+            if self._texts is None:
+                if not os.path.isdir(self.fixtures):
+                    raise ImproperlyConfigured(f"OCR fake fixtures folder '{self.fixtures}' does not exist")
+                texts = {}
+                for name in sorted(os.listdir(self.fixtures)):
+                    if name.endswith(".txt"):
+                        with open(os.path.join(self.fixtures, name), encoding="utf-8", newline="") as f:
+                            texts[name[:-4]] = f.read()
+                self._texts = texts
+            return self._texts
+
+    def _wait(self, digest):
+        with self._lock:
+            self.calls += 1
+        delay = self.latency_ms
+        if self.jitter_ms:
+            # Same image, same delay: keeps runs repeatable
+            delay += (int(digest[:8], 16) % (2 * self.jitter_ms + 1)) - self.jitter_ms
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+    def _text(self, content, digest):
+        texts = self._load()
+        content = bytes(content)
+        if content.startswith(self.PREFIX):
+            return texts.get(content[len(self.PREFIX):].decode("utf-8", "replace").strip())
+        if not texts:
+            return None
+        names = list(texts)
+        return texts[names[int(digest, 16) % len(names)]]
+
+    def detect_text(self, content):
+        digest = hashlib.sha256(content).hexdigest()
+        self._wait(digest)
+        return self._text(content, digest)
+
+    def batch_detect_text(self, contents):
+        digests = [hashlib.sha256(content).hexdigest() for content in contents]
+        self._wait(digests[0] if digests else "0")
+        return [self._text(content, digest) for content, digest in zip(contents, digests)]
+
+
+BACKENDS = {
+    "google": GoogleVisionBackend,
+    "tesseract": TesseractBackend,
+    "fake": FakeOcrBackend,
+}
+
+_backend = None
+_backend_config = None
+_backend_lock = threading.Lock()
+
+
+def get_ocr_backend():
+    """Returns the OCR engine configured in settings.OCR_BACKEND (Google Vision by default)."""
+    global _backend, _backend_config
+
+    config = dict(getattr(settings, "OCR_BACKEND", {}))
+    with _backend_lock:
+        if _backend is None or _backend_config != config:
+            engine = config.get("ENGINE", "google")
+            if engine not in BACKENDS:
+                raise ImproperlyConfigured(
+                    f"Unknown OCR_BACKEND engine '{engine}' (expected one of {', '.join(BACKENDS)})"
+                )
+            options = {key.lower(): value for key, value in config.items() if key != "ENGINE"}
+            _backend = BACKENDS[engine](**options)
+            _backend_config = config
+        return _backend
@@ -0,0 +1,333 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import Sum
+from django.utils import timezone
+
+# Bump when the parser output changes shape so old cached drafts are not served
+CACHE_VERSION = 1
+
+
+def image_hash(content):
+    """Content address of an upload: SHA-256 of the raw bytes."""
+    return hashlib.sha256(content).hexdigest()
+
+
+def _entry_size(text, data):
+    return len(text.encode("utf-8")) + len(json.dumps(data))
+
+
+class BaseOcrCache:
+    """
+    Maps an image hash to {"text": raw OCR text, "data": parsed receipt dict}.
+
+    Subclasses implement _get/_set/_clear; this class keeps the hit/miss counters.
+    ttl is in seconds (0 = never expires); max_entries / max_bytes bound the size (0 = unbounded).
+    """
+
+    def __init__(self, ttl=0, max_entries=0, max_bytes=0, **options):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _key(self, key):
+        return f"v{CACHE_VERSION}:{key}"
+
+    def get(self, key):
+        entry = self._get(self._key(key))
+        with self._stats_lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return entry
+
+    def set(self, key, text, data):
+        self._set(self._key(key), text, data)
+
+    def clear(self):
+        self._clear()
+        with self._stats_lock:
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        with self._stats_lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": type(self).__name__,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def _evicted(self, count=1):
+        with self._stats_lock:
+            self.evictions += count
+
+    def _get(self, key):
+        raise NotImplementedError
+
+    def _set(self, key, text, data):
+        raise NotImplementedError
+
+    def _clear(self):
+        raise NotImplementedError
+
+
+class MemoryOcrCache(BaseOcrCache):
+    """In-process LRU. Each gunicorn worker has its own copy."""
+
+    def __init__(self, **options):
+        super().__init__(**options)
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, size, entry)
+        self._bytes = 0
+
+    def _get(self, key):
+        with self._lock:
+            found = self._entries.get(key)
+            if found is None:
+                return None
+            expires_at, size, entry = found
+            if expires_at and expires_at < time.monotonic():
+                self._remove(key)
+                self._evicted()
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def _set(self, key, text, data):
+        size = _entry_size(text, data)
+        expires_at = time.monotonic() + self.ttl if self.ttl else 0
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (expires_at, size, {"text": text, "data": data})
+            self._bytes += size
+
+            evicted = 0
+            while self._entries and (
+                (self.max_entries and len(self._entries) > self.max_entries)
+                or (self.max_bytes and self._bytes > self.max_bytes)
+            ):
+                self._remove(next(iter(self._entries)))
+                evicted += 1
+        if evicted:
+            self._evicted(evicted)
+
+    def _remove(self, key):
+        expires_at, size, entry = self._entries.pop(key)
+        self._bytes -= size
+
+    def _clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+class DatabaseOcrCache(BaseOcrCache):
+    """Shared by every worker through the OcrCacheEntry table."""
+
+    # Trimming costs an ordered scan + DELETE, so only do it every so many writes
+    PRUNE_EVERY = 50
+
+    def __init__(self, **options):
+        super().__init__(**options)
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def _get(self, key):
+        from .models import OcrCacheEntry
+
+        entry = OcrCacheEntry.objects.filter(key=key).only("text", "data", "created_at").first()
+        if entry is None:
+            return None
+        if self.ttl and entry.created_at < timezone.now() - timedelta(seconds=self.ttl):
+            OcrCacheEntry.objects.filter(key=key).delete()
+            self._evicted()
+            return None
+        OcrCacheEntry.objects.filter(key=key).update(last_used_at=timezone.now())
+        return {"text": entry.text, "data": entry.data}
+
+    def _set(self, key, text, data):
+        from .models import OcrCacheEntry
+
+        now = timezone.now()
+        OcrCacheEntry.objects.update_or_create(
+            key=key,
+            defaults={
+                "text": text,
+                "data": data,
+                "size": _entry_size(text, data),
+                "created_at": now,
+                "last_used_at": now,
+            },
+        )
+        with self._lock:
+            self._writes += 1
+            due = self._writes % self.PRUNE_EVERY == 0
+        if due:
+            self.prune()
+
+    def prune(self):
+        """Drops expired rows, then the least recently used ones above max_entries / max_bytes."""
+        from .models import OcrCacheEntry
+
+        removed = 0
+        if self.ttl:
+            cutoff = timezone.now() - timedelta(seconds=self.ttl)
+            removed += OcrCacheEntry.objects.filter(created_at__lt=cutoff).delete()[0]
+        if self.max_entries:
+            stale = OcrCacheEntry.objects.order_by("-last_used_at").values_list("key", flat=True)[self.max_entries:]
+            stale_keys = list(stale)
+            if stale_keys:
+                removed += OcrCacheEntry.objects.filter(key__in=stale_keys).delete()[0]
+        if self.max_bytes and (OcrCacheEntry.objects.aggregate(total=Sum("size"))["total"] or 0) > self.max_bytes:
+            kept_bytes = 0
+            stale_keys = []
+            for key, size in OcrCacheEntry.objects.order_by("-last_used_at").values_list("key", "size").iterator():
+                kept_bytes += size
+                if kept_bytes > self.max_bytes:
+                    stale_keys.append(key)
+            if stale_keys:
+                removed += OcrCacheEntry.objects.filter(key__in=stale_keys).delete()[0]
+        if removed:
+            self._evicted(removed)
+        return removed
+
+    def _clear(self):
+        from .models import OcrCacheEntry
+
+        OcrCacheEntry.objects.all().delete()
+
+
+class FileOcrCache(BaseOcrCache):
+    """
+    One JSON file per image hash under LOCATION, shared by every worker on the machine.
+    The file's mtime is its write time: it drives the TTL, and size eviction drops the oldest files first.
+    """
+
+    PRUNE_EVERY = 50
+
+    def __init__(self, location=None, **options):
+        super().__init__(**options)
+        self.location = location or os.path.join(settings.BASE_DIR, "ocr_cache")
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        digest = key.split(":", 1)[-1]
+        return os.path.join(self.location, digest[:2], f"{key.replace(':', '-')}.json")
+
+    def _get(self, key):
+        path = self._path(key)
+        try:
+            if self.ttl and os.stat(path).st_mtime < time.time() - self.ttl:
+                os.remove(path)
+                self._evicted()
+                return None
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _set(self, key, text, data):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"text": text, "data": data}, f)
+        os.replace(temp_path, path)  # atomic, so readers never see half a file
+
+        with self._lock:
+            self._writes += 1
+            due = self._writes % self.PRUNE_EVERY == 0
+        if due:
+            self.prune()
+
+    def _files(self):
+        for dirpath, dirnames, filenames in os.walk(self.location):
+            for name in filenames:
+                if name.endswith(".json"):
+                    path = os.path.join(dirpath, name)
+                    try:
+                        yield path, os.stat(path)
+                    except OSError:
+                        continue
+
+    def prune(self):
+        """Drops expired files, then the oldest ones above max_entries / max_bytes."""
+        now = time.time()
+        files = []
+        removed = 0
+        for path, stat in self._files():
+            if self.ttl and stat.st_mtime < now - self.ttl:
+                removed += self._unlink(path)
+            else:
+                files.append((stat.st_mtime, stat.st_size, path))
+
+        files.sort(reverse=True)  # newest first
+        kept_bytes = 0
+        for index, (mtime, size, path) in enumerate(files):
+            kept_bytes += size
+            if (self.max_entries and index >= self.max_entries) or (self.max_bytes and kept_bytes > self.max_bytes):
+                removed += self._unlink(path)
+        if removed:
+            self._evicted(removed)
+        return removed
+
+    @staticmethod
+    def _unlink(path):
+        try:
+            os.remove(path)
+            return 1
+        except OSError:
+            return 0
+
+    def _clear(self):
+        for path, stat in list(self._files()):
+            self._unlink(path)
+
+
+BACKENDS = {
+    "memory": MemoryOcrCache,
+    "database": DatabaseOcrCache,
+    "file": FileOcrCache,
+}
+
+_cache = None
+_cache_config = None
+_cache_lock = threading.Lock()
+
+
+def get_ocr_cache():
+    """Returns the cache configured in settings.OCR_CACHE, or None when BACKEND is "none"."""
+    global _cache, _cache_config
+
+    config = dict(getattr(settings, "OCR_CACHE", {}))
+    with _cache_lock:
+        if _cache_config != config:
+            backend = config.get("BACKEND", "memory")
+            if backend == "none":
+                _cache = None
+            else:
+                if backend not in BACKENDS:
+                    raise ValueError(f"Unknown OCR_CACHE backend '{backend}' (expected one of {', '.join(BACKENDS)})")
+                _cache = BACKENDS[backend](
+                    ttl=config.get("TTL", 0),
+                    max_entries=config.get("MAX_ENTRIES", 0),
+                    max_bytes=config.get("MAX_BYTES", 0),
+                    location=config.get("LOCATION"),
+                )
+            _cache_config = config
+        return _cache
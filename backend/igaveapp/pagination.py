@@ -0,0 +1,167 @@
+import base64
+import json
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination on (ordering field, id).
+
+    Each page is a "WHERE (field, id) comes after the last row ... LIMIT n" query, so page 500 costs
+    the same as page 1 (an OFFSET would make the database walk past every earlier row), and rows
+    added or deleted meanwhile never shift a page. The cursor is an opaque token holding the ordering
+    and the last row's (value, id); it stays valid as long as the ordering does.
+
+    ?ordering= picks the field (one of the view's ordering_fields, "-" for descending) and
+    ?page_size= the page length, capped at max_page_size. Empty values (no date, no total) come last
+    in ascending order and first in descending order.
+    """
+
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    ordering_query_param = 'ordering'
+    default_ordering = '-created_at'
+    # The ordering of paginate_ranked() pages
+    ranked_ordering = 'rank'
+
+    def __init__(self):
+        self.page_size = getattr(settings, 'RECEIPT_PAGE_SIZE', 50)
+        self.max_page_size = getattr(settings, 'RECEIPT_MAX_PAGE_SIZE', 200)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = self.get_ordering(request, view)
+        self.limit = self.get_page_size(request)
+        cursor = self.decode_cursor(request, queryset.model)
+
+        rows = []
+        for segment in self.segments(queryset, cursor):
+            rows += list(segment[:self.limit + 1 - len(rows)])  # one extra row tells us if there is a next page
+            if len(rows) > self.limit:
+                break
+        self.has_next = len(rows) > self.limit
+        self.page = rows[:self.limit]
+        return self.page
+
+    def paginate_ranked(self, ids, request):
+        """
+        A page of an already ranked id list (search results, best first). The cursor is then the offset
+        into that list: it is short (search.MAX_RESULTS at most) and its order has no column to seek on.
+        """
+        self.request = request
+        self.ordering = self.ranked_ordering
+        self.limit = self.get_page_size(request)
+        cursor = self.decode_cursor(request, None)
+        offset = max(0, cursor[0]) if cursor else 0
+        self.page = ids[offset:offset + self.limit]
+        self.has_next = len(ids) > offset + self.limit
+        self.next_offset = offset + self.limit
+        return self.page
+
+    def segments(self, queryset, cursor=None):
+        """
+        The querysets still to read for this page, in order. A nullable field is read as two runs, the rows
+        with a value and the rows without one, each a plain range on the (user, field, id) index; empty values
+        come where a btree keeps them (after the rest, so first when walked backwards). An OR across the two
+        would stop the database from seeking to the cursor and make deep pages walk every earlier row.
+        """
+        field, descending = self.ordering.lstrip('-'), self.ordering.startswith('-')
+        sign, beyond, reached = ('-', '__lt', '__lte') if descending else ('', '__gt', '__gte')
+
+        valued = queryset.order_by(sign + field, sign + 'id')
+        if not queryset.model._meta.get_field(field).null:
+            runs = [("valued", valued)]
+        else:
+            empty = queryset.filter(**{f'{field}__isnull': True}).order_by(sign + 'id')
+            valued = valued.filter(**{f'{field}__isnull': False})
+            runs = [("empty", empty), ("valued", valued)] if descending else [("valued", valued), ("empty", empty)]
+
+        if cursor is None:
+            return [run for name, run in runs]
+        value, pk = cursor
+        start = "empty" if value is None else "valued"
+        names = [name for name, run in runs]
+        remaining = [run for name, run in runs[names.index(start):]]
+        if value is None:
+            remaining[0] = remaining[0].filter(**{'id' + beyond: pk})
+        else:
+            # "field >= value" lets the index seek straight to the cursor; the Q only sorts out ties on value
+            remaining[0] = remaining[0].filter(**{field + reached: value}).filter(
+                Q(**{field + beyond: value}) | Q(**{'id' + beyond: pk})
+            )
+        return remaining
+
+    def get_ordering(self, request, view):
+        allowed = getattr(view, 'ordering_fields', None) or [self.default_ordering.lstrip('-')]
+        ordering = request.query_params.get(self.ordering_query_param, '').split(',')[0].strip()
+        if not ordering:
+            return (getattr(view, 'ordering', None) or [self.default_ordering])[0]
+        if ordering.lstrip('-') not in allowed:
+            raise ValidationError({"ordering": f"Order by one of: {', '.join(allowed)}."})
+        return ordering
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    # --- CURSOR TOKENS ---
+    def encode_cursor(self, row):
+        if self.ordering == self.ranked_ordering:
+            payload = {"o": self.ordering, "v": str(self.next_offset), "id": row}
+        else:
+            field = self.ordering.lstrip('-')
+            value = getattr(row, field)
+            payload = {"o": self.ordering, "v": None if value is None else str(value), "id": row.pk}
+        return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode().rstrip('=')
+
+    def decode_cursor(self, request, model):
+        """(value, id) of the last row of the previous page, or None on the first page."""
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+            if payload["o"] != self.ordering:
+                raise ValueError("cursor belongs to another ordering")
+            if self.ordering == self.ranked_ordering:
+                return int(payload["v"]), int(payload["id"])
+            field = model._meta.get_field(self.ordering.lstrip('-'))
+            value = None if payload["v"] is None else field.to_python(payload["v"])
+            return value, int(payload["id"])
+        except (ValueError, KeyError, TypeError, AttributeError, DjangoValidationError):
+            raise NotFound("Invalid cursor.")
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.get_next_link(),
+            "page_size": self.limit,
+            "ordering": self.ordering,
+            "results": data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'page_size': {'type': 'integer'},
+                'ordering': {'type': 'string'},
+                'results': schema,
+            },
+        }
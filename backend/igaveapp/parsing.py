@@ -0,0 +1,310 @@
+import contextlib
+import contextvars
+import logging
+import re
+from datetime import datetime
+
+from .categorizer import categorize_text
+
+logger = logging.getLogger(__name__)
+
+# All patterns are compiled once at import; the parser below is called for every scanned line.
+
+# Date (Bilingual: Math & English)
+DATE_PATTERN = (
+    r'(\d{1,2}[./-]\d{1,2}[./-]\d{2,4}|\d{4}-\d{2}-\d{2}'
+    r'|(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*[\s.,-]+\d{1,2}[a-z]{0,2}[\s.,-]+\d{2,4}'
+    r'|\d{1,2}[\s.,-]+(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*[\s.,-]+\d{2,4})'
+)
+DATE_RE = re.compile(DATE_PATTERN, re.IGNORECASE)
+DATE_SUFFIX_RE = re.compile(r'(st|nd|rd|th|,)')
+
+TOTAL_RE = re.compile(r'(?i)(total|amount|balance|due|grand total)\s*[:$]?\s*\$?(\d+[.,]\d{2})')
+ANY_PRICE_RE = re.compile(r'\$?\s*(\d+\.\d{2})')
+
+# Items: "Milk 2.99" on one line, or "Milk" followed by a "2.99" line
+SINGLE_LINE_ITEM_RE = re.compile(r'(.+?)\s+[$]?(\d+[.,]\d{2})$')
+PRICE_ONLY_RE = re.compile(r'^[$]?\s*(\d+[.,]\d{2})$')
+NUMBERS_ONLY_RE = re.compile(r'^[\d\W]+$')
+
+PHONE_RE = re.compile(r'\d{3}[-.]\d{3}[-.]\d{4}')
+STANDALONE_PRICE_RE = re.compile(r'^\$?\d+[.,]\d{2}$')
+
+# Words to ignore when looking for items / the store name
+BLACKLIST_WORDS = ("total", "subtotal", "tax", "vat", "change", "cash", "due", "balance", "visa", "mastercard", "date")
+IGNORED_VENDOR_WORDS = ("welcome", "receipt", "copy", "customer", "transaction", "original", "date")
+
+# One alternation instead of an any(word in text) loop per line
+BLACKLIST_RE = re.compile('|'.join(re.escape(word) for word in BLACKLIST_WORDS))
+IGNORED_VENDOR_RE = re.compile('|'.join(re.escape(word) for word in IGNORED_VENDOR_WORDS))
+
+# Labels a line that is not an item: the leftmost date, phone number or money keyword wins
+LINE_LABEL_RE = re.compile(
+    '(?P<date>' + DATE_PATTERN + ')'
+    r'|(?P<phone>\d{3}[-.]\d{3}[-.]\d{4})'
+    r'|(?P<total>total|amount|balance|due|tax|change|cash)',
+    re.IGNORECASE,
+)
+
+DATE_FORMATS = (
+    "%m/%d/%Y", "%m-%d-%Y", "%m.%d.%Y",   # 12/25/2023
+    "%Y-%m-%d",                           # 2023-12-25
+    "%b %d %Y", "%B %d %Y",               # Dec 25 2023
+    "%d %b %Y", "%d %B %Y",               # 25 Dec 2023
+    "%m/%d/%y", "%m-%d-%y",               # 12/25/23 (Short year)
+)
+
+# Line labels produced by classify_lines()
+LABELS = ("vendor", "date", "total", "item", "split-item", "phone", "noise")
+
+
+# --- TRACE ---
+# Every parsing decision (the date, then one per line: matched as an item, ignored and why) can be logged
+# at DEBUG on the "igaveapp.parsing" logger, and/or collected for one request with tracing() (scans with
+# ?trace=true send it back). Neither is on by default: the parser then only checks a flag per call.
+_trace = contextvars.ContextVar('parse_trace', default=None)
+
+
+@contextlib.contextmanager
+def tracing():
+    """Collects the parsing decisions made inside into the yielded list ([{"step", ...}, ...])."""
+    steps = []
+    token = _trace.set(steps)
+    try:
+        yield steps
+    finally:
+        _trace.reset(token)
+
+
+def is_tracing():
+    return _trace.get() is not None
+
+
+def trace_step(step, **details):
+    """Records one decision made outside the parser (the OCR call, the cache) when anyone is listening."""
+    record = _tracer()
+    if record:
+        record(step, **details)
+
+
+def _tracer():
+    """The function that records a decision, or None when nobody is listening (checked once per call)."""
+    steps = _trace.get()
+    debug = logger.isEnabledFor(logging.DEBUG)
+    if steps is None and not debug:
+        return None
+
+    def record(step, **details):
+        if steps is not None:
+            steps.append({"step": step, **details})
+        if debug:
+            logger.debug("%s %s", step, " ".join(f"{name}={value!r}" for name, value in details.items()))
+    return record
+
+
+def normalize_date(raw_date):
+    """Converts a matched date to YYYY-MM-DD, or returns it untouched when no format fits."""
+    clean_date = DATE_SUFFIX_RE.sub('', raw_date).strip()
+    record = _tracer()
+    for fmt in DATE_FORMATS:
+        try:
+            normalized = datetime.strptime(clean_date, fmt).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+        if record:
+            record("date", raw=raw_date, date=normalized)
+        return normalized
+    if record:
+        record("date", raw=raw_date, date=None)
+    return raw_date
+
+
+def _label(line):
+    match = LINE_LABEL_RE.search(line)
+    return match.lastgroup if match else "noise"
+
+
+def _is_vendor_candidate(line):
+    if len(line) < 2:
+        return False
+    if DATE_RE.search(line):
+        return False
+    if IGNORED_VENDOR_RE.search(line.lower()):
+        return False
+    if PHONE_RE.search(line):  # Phone numbers
+        return False
+    if STANDALONE_PRICE_RE.match(line):  # Standalone prices
+        return False
+    return True
+
+
+def find_vendor_index(lines):
+    """Index of the store-name line: the first usable line among the first 6 (or None)."""
+    for index, line in enumerate(lines[:6]):
+        if _is_vendor_candidate(line.strip()):
+            return index
+    return None
+
+
+def classify_lines(lines, date_value=None):
+    """
+    Walks the OCR lines once and labels each of them (see LABELS).
+
+    Returns (labels, items, vendor_index): one label per input line, the extracted
+    {"name", "price"} items, and the index of the store-name line (or None).
+    date_value is the already-parsed receipt date; item names containing it are skipped.
+    """
+    stripped = [line.strip() for line in lines]
+    count = len(stripped)
+    labels = ["noise"] * count
+    items = []
+
+    vendor_index = find_vendor_index(stripped)
+    record = _tracer()
+
+    # --- Items (THE MATCHMAKER) ---
+    i = 0
+    while i < count:
+        line = stripped[i]
+        if not line:
+            i += 1
+            continue
+
+        # Check 1: Single Line Item (a price always ends in a digit, so skip the regex otherwise)
+        match = SINGLE_LINE_ITEM_RE.match(line) if line[-1].isdecimal() else None
+        if match:
+            item_name = match.group(1).strip()
+            item_price = match.group(2).replace(',', '.')
+
+            if BLACKLIST_RE.search(item_name.lower()):
+                decision = "ignored-blacklist"
+                labels[i] = _label(line)
+            elif date_value and date_value in item_name:
+                decision = "ignored-date"
+                labels[i] = "date"
+            else:
+                decision = "item"
+                items.append({"name": item_name, "price": float(item_price)})
+                labels[i] = "item"
+            if record:
+                record("line", index=i, text=line, decision=decision)
+            i += 1
+            continue
+
+        # Check 2: Split Line Item
+        decision = None
+        if i + 1 < count:
+            next_line = stripped[i + 1]
+            price_match = PRICE_ONLY_RE.match(next_line) if next_line[-1:].isdecimal() else None
+
+            if price_match:
+                if BLACKLIST_RE.search(line.lower()):
+                    decision = "ignored-blacklist"
+                elif NUMBERS_ONLY_RE.match(line):
+                    if record:
+                        record("line", index=i, text=line, decision="ignored-numbers")
+                    labels[i] = _label(line)
+                    i += 1
+                    continue
+                else:
+                    item_price = price_match.group(1).replace(',', '.')
+                    if record:
+                        record("line", index=i, text=line, decision="split-item", price=item_price)
+                    items.append({"name": line, "price": float(item_price)})
+                    labels[i] = labels[i + 1] = "split-item"
+                    i += 2
+                    continue
+
+        labels[i] = _label(line)
+        if record:
+            record("line", index=i, text=line, decision=decision or labels[i])
+        i += 1
+
+    if vendor_index is not None and labels[vendor_index] == "noise":
+        labels[vendor_index] = "vendor"
+    return labels, items, vendor_index
+
+
+def parse_date(text):
+    """Returns the first date found in the text, exactly as printed (None if there is none)."""
+    match = DATE_RE.search(text)
+    return match.group(1) if match else None
+
+
+def parse_total(text):
+    """
+    Returns the amount after a total/amount/balance/due keyword as a string ("25.00").
+    Without a keyword it falls back to the largest price on the receipt (a float), or None.
+    """
+    total_match = TOTAL_RE.search(text)
+    if total_match:
+        return total_match.group(2).replace(',', '.')
+
+    # Fallback max number
+    all_prices = ANY_PRICE_RE.findall(text)
+    if all_prices:
+        return max(float(p) for p in all_prices)
+    return None
+
+
+def parse_vendor(annotations):
+    """Returns the store name from Vision text annotations (the first one holds the full text)."""
+    if not annotations:
+        return None
+    lines = annotations[0].description.split('\n')
+    vendor_index = find_vendor_index(lines)
+    return lines[vendor_index].strip() if vendor_index is not None else None
+
+
+def parse_receipt_fields(full_text):
+    """
+    Pulls vendor, date, total and items out of the raw OCR text.
+    The category is left at "general"; categorize() runs on top of this result.
+    """
+    data = {
+        "vendor": None,
+        "date": None,
+        "total": None,
+        "category": "general",  # Default value
+        "items": []
+    }
+
+    # --- A. DATE (Smart & Standardized) ---
+    raw_date = parse_date(full_text)
+    if raw_date:
+        data['date'] = normalize_date(raw_date)
+
+    # --- B. VENDOR + D. ITEMS (one pass over the lines) ---
+    lines = full_text.split('\n')
+    labels, items, vendor_index = classify_lines(lines, data['date'])
+    data['vendor'] = lines[vendor_index].strip() if vendor_index is not None else "Unknown Vendor"
+    data['items'] = items
+
+    # --- C. TOTAL ---
+    total = parse_total(full_text)
+    if total is not None:
+        data['total'] = str(total)
+
+    record = _tracer()
+    if record:
+        record("fields", vendor_line=vendor_index, vendor=data['vendor'], total=data['total'], items=len(items))
+    return data
+
+
+def categorize(data):
+    """Sets data['category'] from keywords in the vendor name, then in the first few items (categorizer.py)."""
+    category = categorize_text(data['vendor'], [item['name'] for item in data['items']])
+    if category:
+        data['category'] = category
+    record = _tracer()
+    if record:
+        record("category", category=data['category'], source="keywords" if category else "default")
+    return data
+
+
+def parse_receipt_text(full_text):
+    """
+    The whole parsing engine: raw OCR text in, receipt dict out
+    (vendor, date, total, items, category). Pure Python, no Vision call.
+    """
+    return categorize(parse_receipt_fields(full_text))
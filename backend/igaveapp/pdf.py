@@ -0,0 +1,88 @@
+import io
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pypdfium2 as pdfium
+
+PDF_MAGIC = b"%PDF-"
+
+
+def is_pdf(content):
+    return bytes(content[:len(PDF_MAGIC)]) == PDF_MAGIC
+
+
+def _elapsed_ms(start):
+    return (time.perf_counter() - start) * 1000
+
+
+def render_page(pdf, index, dpi=200):
+    """Renders one page to grayscale JPEG bytes; returns (jpeg_bytes, render_ms)."""
+    start = time.perf_counter()
+    page = pdf[index]
+    try:
+        image = page.render(scale=dpi / 72, grayscale=True).to_pil()  # PDF units are points
+    finally:
+        page.close()
+    output = io.BytesIO()
+    image.convert("L").save(output, format="JPEG", quality=90)
+    return output.getvalue(), _elapsed_ms(start)
+
+
+def _timed_ocr(ocr, content):
+    start = time.perf_counter()
+    text = ocr(content)
+    return text, _elapsed_ms(start)
+
+
+def extract_pdf_text(content, ocr, dpi=200, max_pages=20, workers=4):
+    """
+    OCRs a (multi-page) PDF: each page is rendered only when there is room for it and is sent to
+    ocr(image_bytes) on a pool of `workers` threads while the next page renders, so at most
+    2 x workers rendered pages sit in memory. Rendering stays on this thread (pdfium is not
+    thread-safe); only the OCR calls run in parallel.
+
+    Returns (merged_text, report). merged_text is the page texts in page order (None when no page
+    had any text); report holds the page count and the render / OCR time of every page.
+    """
+    pdf = pdfium.PdfDocument(bytes(content))
+    try:
+        total_pages = len(pdf)
+        page_count = min(total_pages, max_pages) if max_pages else total_pages
+        in_flight = threading.BoundedSemaphore(max(1, workers) * 2)
+        pages = []
+
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="pdf-ocr") as pool:
+            for index in range(page_count):
+                in_flight.acquire()
+                try:
+                    image_bytes, render_ms = render_page(pdf, index, dpi)
+                except Exception:
+                    in_flight.release()
+                    raise
+                future = pool.submit(_timed_ocr, ocr, image_bytes)
+                future.add_done_callback(lambda _: in_flight.release())
+                pages.append((index, render_ms, future))
+
+            texts = []
+            per_page = []
+            for index, render_ms, future in pages:
+                text, ocr_ms = future.result()
+                if text:
+                    texts.append(text)
+                per_page.append({
+                    "page": index + 1,
+                    "render_ms": round(render_ms, 1),
+                    "ocr_ms": round(ocr_ms, 1),
+                    "chars": len(text or ""),
+                })
+    finally:
+        pdf.close()
+
+    report = {
+        "page_count": total_pages,
+        "pages_scanned": page_count,
+        "render_ms": round(sum(p["render_ms"] for p in per_page), 1),
+        "ocr_ms": round(sum(p["ocr_ms"] for p in per_page), 1),
+        "per_page": per_page,
+    }
+    return ("\n".join(texts) if texts else None), report
@@ -0,0 +1,117 @@
+import datetime
+import functools
+import hashlib
+import json
+import time
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags
+from rest_framework.response import Response
+
+from .models import Receipt
+from .rollups import receipt_signals_muted
+
+# Cached GET responses (stats, time series, receipt list) for each user, under a per-user version
+# number. Any write to one of the user's receipts bumps the number, so every entry made before it
+# becomes unreachable at once; nothing has to find and delete them, they just expire (TTL).
+# The ETag is made from the same version, so a client revalidating with If-None-Match gets
+# a 304 from one cache read, without the view running at all.
+
+
+def get_cache():
+    return caches[settings.RESPONSE_CACHE['ALIAS']]
+
+
+def _version_key(user_id):
+    return f"receipts-version:{user_id}"
+
+
+def user_version(user_id, cache=None):
+    """The user's current data version (created on first use)."""
+    cache = cache or get_cache()
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        # Started from the clock, not 1: if the counter is evicted, a new one never reuses an old number
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_user_version(user_id):
+    """Makes every cached response of the user stale."""
+    cache = get_cache()
+    try:
+        cache.incr(_version_key(user_id))
+    except ValueError:  # no counter yet: nothing is cached under one either
+        cache.add(_version_key(user_id), time.time_ns(), timeout=None)
+
+
+def invalidate_user(user_id):
+    """
+    Bumps the version now (so the rest of this request and its transaction read fresh data) and again once the
+    transaction commits: a request that read the old rows between the first bump and the commit may have cached
+    them under the new version.
+    """
+    bump_user_version(user_id)
+    transaction.on_commit(lambda: bump_user_version(user_id))
+
+
+def _fingerprint(request, endpoint):
+    # Today's date is part of it: ?today=true and the default time-series range move at midnight
+    params = sorted((name, request.query_params.getlist(name)) for name in request.query_params)
+    raw = json.dumps([endpoint, request.get_host(), params, datetime.date.today().isoformat()])
+    return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+
+def cached_response(endpoint):
+    """
+    Caches a viewset action's 200 responses per (user, endpoint, query params, user's data version).
+    Cache hits and 304s never run the view, so they cost no queries beyond authentication.
+    """
+    def decorator(view_method):
+        @functools.wraps(view_method)
+        def wrapper(viewset, request, *args, **kwargs):
+            config = settings.RESPONSE_CACHE
+            if not config['ENABLED'] or request.method != 'GET':
+                return view_method(viewset, request, *args, **kwargs)
+
+            cache = get_cache()
+            user_id = request.user.pk
+            fingerprint = _fingerprint(request, endpoint)
+            version = user_version(user_id, cache)
+            etag = f'"{user_id}-{version}-{fingerprint[:16]}"'
+
+            if etag in parse_etags(request.headers.get('If-None-Match', '')):
+                response = Response(status=304)
+            else:
+                key = f"receipts-response:{user_id}:{version}:{fingerprint}"
+                data = cache.get(key)
+                if data is not None:
+                    response = Response(data)
+                else:
+                    response = view_method(viewset, request, *args, **kwargs)
+                    if response.status_code != 200:
+                        return response
+                    cache.set(key, response.data, config['TTL'])
+
+            response['ETag'] = etag
+            # Browsers may keep it, but must ask (If-None-Match) before reusing it; shared caches must not keep it
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ['Authorization'])
+            return response
+        return wrapper
+    return decorator
+
+
+# --- SIGNALS ---
+# queryset.update() and bulk_create() send no signals: call invalidate_user() after them.
+@receiver(post_save, sender=Receipt)
+@receiver(post_delete, sender=Receipt)
+def invalidate_on_receipt_change(sender, instance, raw=False, **kwargs):
+    if not raw and not receipt_signals_muted():
+        invalidate_user(instance.user_id)
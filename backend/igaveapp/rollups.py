@@ -0,0 +1,335 @@
+import contextlib
+import contextvars
+import datetime
+from decimal import Decimal
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .filters import month_after
+from .models import Receipt, SpendingRollup
+
+# What a receipt contributes to the rollups: (user_id, date, category, total_amount)
+ROLLUP_FIELDS = ('user_id', 'date', 'category', 'total_amount')
+_ROLLUP_UPDATE_FIELDS = {'user', 'user_id', 'date', 'category', 'total_amount'}
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def contribution(receipt):
+    """The instance's rollup fields as the database will store them (a new receipt may still hold strings)."""
+    fields = Receipt._meta
+    return (
+        receipt.user_id,
+        fields.get_field('date').to_python(receipt.date),
+        receipt.category,
+        fields.get_field('total_amount').to_python(receipt.total_amount),
+    )
+
+
+def _touches_rollups(update_fields):
+    return update_fields is None or not _ROLLUP_UPDATE_FIELDS.isdisjoint(update_fields)
+
+
+def apply_delta(user_id, day, category, amount, count):
+    """
+    Adds amount / count (negative to take a receipt out) to the day and month buckets of `day`.
+    A bucket is updated in place with F() so concurrent saves can't lose each other's changes;
+    one that would drop to zero receipts is deleted.
+    """
+    if day is None:
+        return
+    amount = amount or Decimal('0')
+    for period, start in (('day', day), ('month', month_start(day))):
+        bucket = SpendingRollup.objects.filter(user_id=user_id, period=period, start=start, category=category)
+        if count < 0:
+            bucket.filter(count__lte=-count).delete()
+        if bucket.update(total=F('total') + amount, count=F('count') + count) or count < 0:
+            continue
+        try:
+            with transaction.atomic():
+                SpendingRollup.objects.create(user_id=user_id, period=period, start=start, category=category,
+                                              total=amount, count=count)
+        except IntegrityError:
+            # Another request created the bucket between our update and insert
+            bucket.update(total=F('total') + amount, count=F('count') + count)
+
+
+def _bucket_deltas(contributions, sign, deltas):
+    for user_id, day, category, amount in contributions:
+        if day is None:
+            continue
+        for period, start in (('day', day), ('month', month_start(day))):
+            key = (user_id, period, start, category)
+            total, count = deltas.get(key, (Decimal('0'), 0))
+            deltas[key] = (total + sign * (amount or 0), count + sign)
+
+
+def _apply_bucket_deltas(deltas):
+    starts = [start for user_id, period, start, category in deltas]
+    buckets = SpendingRollup.objects.select_for_update().filter(
+        user_id__in={user_id for user_id, period, start, category in deltas},
+        start__range=(min(starts), max(starts)),
+    )
+    existing = {(b.user_id, b.period, b.start, b.category): b for b in buckets}
+
+    changed, emptied, created = [], [], []
+    for key, (total, count) in deltas.items():
+        bucket = existing.get(key)
+        if bucket is None:
+            user_id, period, start, category = key
+            created.append(SpendingRollup(user_id=user_id, period=period, start=start, category=category,
+                                          total=total, count=count))
+        elif bucket.count + count <= 0:
+            emptied.append(bucket.pk)
+        else:
+            bucket.total += total
+            bucket.count += count
+            changed.append(bucket)
+
+    for n in range(0, len(emptied), 500):
+        SpendingRollup.objects.filter(pk__in=emptied[n:n + 500]).delete()
+    SpendingRollup.objects.bulk_update(changed, ['total', 'count'], batch_size=500)
+    SpendingRollup.objects.bulk_create(created, batch_size=500)
+
+
+def apply_contributions(added=(), removed=()):
+    """
+    Adds and takes out many receipts' (user_id, date, category, amount) at once, for bulk writes.
+    The net change of every bucket is worked out first, then the buckets are read (and locked) in one
+    query and written back with bulk_update / bulk_create: the queries don't grow with the batch,
+    where apply_delta() per receipt would run a few per receipt.
+    """
+    deltas = {}
+    _bucket_deltas(removed, -1, deltas)
+    _bucket_deltas(added, 1, deltas)
+    deltas = {key: delta for key, delta in deltas.items() if delta[1] or delta[0]}
+    if not deltas:
+        return
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                _apply_bucket_deltas(deltas)
+        except IntegrityError:
+            # Another request created one of our new buckets first: read them again and retry
+            _apply_bucket_deltas(deltas)
+
+
+# --- SIGNALS ---
+# Receipt.save() / delete() keep the rollups in step. queryset.update() and bulk_create() send no
+# per-row signals: code using them must call apply_contributions() itself (or run rebuild_rollups).
+_signals_muted = contextvars.ContextVar('receipt_signals_muted', default=False)
+
+
+@contextlib.contextmanager
+def mute_receipt_signals():
+    """
+    For bulk writes that update the rollups and the response cache themselves (bulk.py): inside, the
+    per-row Receipt handlers here and in response_cache.py do nothing. queryset.delete() still sends
+    a post_delete per row, so without this a bulk delete would touch the rollups once per receipt.
+    """
+    token = _signals_muted.set(True)
+    try:
+        yield
+    finally:
+        _signals_muted.reset(token)
+
+
+def receipt_signals_muted():
+    return _signals_muted.get()
+
+
+@receiver(pre_save, sender=Receipt)
+def remember_rollup_contribution(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Before an update, note what the stored row added to the rollups so post_save can move it."""
+    instance._rollup_before = None
+    if raw or receipt_signals_muted() or instance.pk is None or not _touches_rollups(update_fields):
+        return
+    instance._rollup_before = Receipt.objects.filter(pk=instance.pk).values_list(*ROLLUP_FIELDS).first()
+
+
+@receiver(post_save, sender=Receipt)
+def update_rollups_on_save(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw or receipt_signals_muted() or not _touches_rollups(update_fields):
+        return
+    before = getattr(instance, '_rollup_before', None)
+    after = contribution(instance)
+    if before == after:
+        return
+    with transaction.atomic():
+        if before is not None:
+            user_id, day, category, amount = before
+            apply_delta(user_id, day, category, -(amount or 0), -1)
+        user_id, day, category, amount = after
+        apply_delta(user_id, day, category, amount, 1)
+
+
+@receiver(post_delete, sender=Receipt)
+def update_rollups_on_delete(sender, instance, **kwargs):
+    if receipt_signals_muted():
+        return
+    user_id, day, category, amount = contribution(instance)
+    apply_delta(user_id, day, category, -(amount or 0), -1)
+
+
+# --- REBUILD ---
+def rebuild_rollups(user_ids=None):
+    """
+    Recomputes the rollups from the receipts (all users, or just user_ids) with two GROUP BY queries.
+    Returns the number of buckets written.
+    """
+    receipts = Receipt.objects.filter(date__isnull=False)
+    rollups = SpendingRollup.objects.all()
+    if user_ids is not None:
+        receipts = receipts.filter(user_id__in=user_ids)
+        rollups = rollups.filter(user_id__in=user_ids)
+
+    groupings = [('day', F('date')), ('month', TruncMonth('date'))]
+    with transaction.atomic():
+        rollups.delete()
+        written = 0
+        for period, bucket in groupings:
+            rows = (
+                receipts.annotate(bucket=bucket)
+                .values('user_id', 'bucket', 'category')
+                .annotate(bucket_total=Sum('total_amount'), bucket_count=Count('id'))
+                .order_by()
+            )
+            written += len(SpendingRollup.objects.bulk_create([
+                SpendingRollup(user_id=row['user_id'], period=period, start=row['bucket'], category=row['category'],
+                               total=row['bucket_total'] or 0, count=row['bucket_count'])
+                for row in rows.iterator(chunk_size=2000)
+            ], batch_size=1000))
+    return written
+
+
+# --- READS ---
+def bucket_ranges(lo, hi):
+    """
+    The rollup rows covering the dates [lo, hi), as (period, first start, end start) ranges: whole months
+    from the month buckets, the ragged ends from the day buckets. At most ~60 day rows plus one row per
+    month, however long the range.
+    """
+    first_month = lo if lo.day == 1 else month_after(lo.year, lo.month)
+    last_month = month_start(hi)
+    if first_month >= last_month:
+        return [('day', lo, hi)]
+    ranges = [('day', lo, first_month), ('month', first_month, last_month), ('day', last_month, hi)]
+    return [(period, start, end) for period, start, end in ranges if start < end]
+
+
+def category_totals(user, bounds):
+    """
+    {category: total} for the user's receipts dated within bounds = (lo, hi), or all receipts when
+    bounds is None (month buckets plus the undated receipts, which have no bucket).
+    Each bucket range is summed on its own and the parts are glued with UNION ALL, so every part is
+    an index range scan (an OR of the ranges would make the database read all of the user's buckets).
+    """
+    totals = {}
+    if bounds is None:
+        parts = [('month', None, None)]
+        # Undated receipts are few; read them as rows, since a GROUP BY category here tempts the
+        # planner into the (user, category, date) index and a walk over every receipt the user has
+        undated = Receipt.objects.filter(user=user, date__isnull=True).values_list('category', 'total_amount')
+        for category, amount in undated.order_by():
+            totals[category] = totals.get(category, 0) + (amount or 0)
+    else:
+        lo, hi = bounds
+        if lo >= hi:
+            return totals
+        parts = bucket_ranges(lo, hi)
+
+    sums = []
+    for period, start, end in parts:
+        buckets = SpendingRollup.objects.filter(user=user, period=period)
+        if start is not None:
+            buckets = buckets.filter(start__gte=start, start__lt=end)
+        sums.append(buckets.values('category').annotate(bucket_total=Sum('total')).order_by())
+
+    for row in sums[0].union(*sums[1:], all=True):
+        totals[row['category']] = totals.get(row['category'], 0) + row['bucket_total']
+    return totals
+
+
+# --- TIME SERIES ---
+GRANULARITIES = ('day', 'week', 'month')
+MAX_SERIES_BUCKETS = 1000
+DEFAULT_SERIES_LENGTH = {'day': 30, 'week': 12, 'month': 12}
+
+
+def bucket_start(day, granularity):
+    """The first day of the day / week (Monday) / month bucket `day` falls in."""
+    if granularity == 'month':
+        return month_start(day)
+    if granularity == 'week':
+        return day - datetime.timedelta(days=day.weekday())
+    return day
+
+
+def default_series_start(end, granularity):
+    """The start of a series of DEFAULT_SERIES_LENGTH buckets ending with the one `end` is in."""
+    length = DEFAULT_SERIES_LENGTH[granularity]
+    start = bucket_start(end, granularity)
+    if granularity == 'month':
+        months = start.year * 12 + start.month - length
+        return datetime.date(months // 12, months % 12 + 1, 1)
+    return start - datetime.timedelta(days=(length - 1) * (7 if granularity == 'week' else 1))
+
+
+def bucket_starts(lo, hi, granularity):
+    """Every bucket touching the dates [lo, hi), in order, including the empty ones."""
+    starts = []
+    start = bucket_start(lo, granularity)
+    while start < hi:
+        starts.append(start)
+        if granularity == 'month':
+            start = month_after(start.year, start.month)
+        else:
+            start += datetime.timedelta(days=7 if granularity == 'week' else 1)
+    return starts
+
+
+def _series(rows, lo, hi, granularity):
+    """(bucket starts, {category: [total per bucket]}, [total per bucket]) from (day, category, amount) rows."""
+    starts = bucket_starts(lo, hi, granularity)
+    position = {start: n for n, start in enumerate(starts)}
+    by_category = {}
+    totals = [0] * len(starts)
+    for day, category, amount in rows:
+        n = position[bucket_start(day, granularity)]
+        series = by_category.setdefault(category, [0] * len(starts))
+        series[n] += amount or 0
+        totals[n] += amount or 0
+    return starts, dict(sorted(by_category.items())), totals
+
+
+def timeseries(user, lo, hi, granularity):
+    """
+    Spending per bucket and category for the dates [lo, hi), from the rollups, in one query.
+    Month buckets are read whole where the range covers them and from the day buckets at the ragged ends;
+    weeks are summed from the day buckets.
+    """
+    if granularity == 'month':
+        ranges = bucket_ranges(lo, hi)
+    else:
+        ranges = [('day', lo, hi)]
+    parts = [
+        SpendingRollup.objects.filter(user=user, period=period, start__gte=start, start__lt=end)
+        .values_list('start', 'category', 'total').order_by()
+        for period, start, end in ranges
+    ]
+    return _series(parts[0].union(*parts[1:], all=True), lo, hi, granularity)
+
+
+def timeseries_from_receipts(user, lo, hi, granularity):
+    """The same series as timeseries(), aggregated from the receipts (one GROUP BY on the truncated date)."""
+    trunc = {'day': TruncDay, 'week': TruncWeek, 'month': TruncMonth}[granularity]
+    rows = (
+        Receipt.objects.filter(user=user, date__gte=lo, date__lt=hi)
+        .annotate(bucket=trunc('date')).values_list('bucket', 'category').annotate(Sum('total_amount')).order_by()
+    )
+    return _series(rows, lo, hi, granularity)
@@ -0,0 +1,150 @@
+import re
+from django.db import connection, transaction
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .items import item_name
+from .models import Receipt, ReceiptItem
+from .rollups import receipt_signals_muted
+
+# Full-text search over each receipt's store name, item names and category (code and label), behind
+# GET /api/receipts/?q=. The index is a table next to igaveapp_receipt, created by migration 0013 for
+# the database in use and kept in step from Python (signals here, bulk.py, seed_data):
+#   PostgreSQL  igaveapp_receiptsearch(receipt_id, user_id, document tsvector), GIN index on document
+#               and a btree on user_id (0015), ranked with ts_rank (store name weighted over items over category)
+#   SQLite      an FTS5 table with the owner as a column of its own, ranked with bm25()
+# Other databases get an unranked icontains fallback.
+SEARCH_TABLE = 'igaveapp_receiptsearch'
+
+# Ranked matches a search returns at most (the list pages through them)
+MAX_RESULTS = 1000
+# Words of the query that are used (each one must match, as a prefix: "choc" finds "chocolate")
+MAX_TERMS = 8
+
+CATEGORY_LABELS = dict(Receipt.CATEGORY_CHOICES)
+_WORD = re.compile(r'[^\W_]+')
+# Columns weighted for ranking: store name first, then items, then category
+_SQLITE_WEIGHTS = (0.0, 10.0, 5.0, 2.0)
+
+
+def search_terms(query):
+    """The words of a query, case-folded (punctuation, quotes and operators dropped)."""
+    return _WORD.findall(query.casefold())[:MAX_TERMS]
+
+
+def document(receipt):
+    """(store name, item names, category) text indexed for a receipt."""
+    items = receipt.items if isinstance(receipt.items, list) else []
+    names = ' '.join(item_name(item) for item in items)
+    category = f"{receipt.category} {CATEGORY_LABELS.get(receipt.category, '')}"
+    return receipt.store_name or '', names, category
+
+
+def _backend():
+    return connection.vendor if connection.vendor in ('postgresql', 'sqlite') else None
+
+
+# --- INDEXING ---
+def index_receipts(receipts):
+    """(Re)indexes these saved receipts, in a few statements for the lot."""
+    receipts = list(receipts)
+    backend = _backend()
+    if not receipts or backend is None:
+        return
+    with transaction.atomic(), connection.cursor() as cursor:
+        if backend == 'postgresql':
+            cursor.executemany(
+                f"INSERT INTO {SEARCH_TABLE} (receipt_id, user_id, document) VALUES (%s, %s, "
+                "setweight(to_tsvector('simple', %s), 'A') || setweight(to_tsvector('simple', %s), 'B') "
+                "|| setweight(to_tsvector('simple', %s), 'C')) "
+                "ON CONFLICT (receipt_id) DO UPDATE SET user_id = EXCLUDED.user_id, document = EXCLUDED.document",
+                [(r.pk, r.user_id, *document(r)) for r in receipts],
+            )
+        else:
+            _sqlite_delete(cursor, [r.pk for r in receipts])
+            cursor.executemany(
+                f"INSERT INTO {SEARCH_TABLE} (rowid, owner, store_name, items, category) VALUES (%s, %s, %s, %s, %s)",
+                [(r.pk, f"u{r.user_id}", *document(r)) for r in receipts],
+            )
+
+
+def unindex_receipts(ids):
+    """Drops deleted receipts from the index (PostgreSQL's foreign key does it by itself)."""
+    if ids and _backend() == 'sqlite':
+        with connection.cursor() as cursor:
+            _sqlite_delete(cursor, list(ids))
+
+
+def _sqlite_delete(cursor, ids):
+    for start in range(0, len(ids), 500):
+        chunk = ids[start:start + 500]
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({', '.join(['%s'] * len(chunk))})", chunk)
+
+
+def rebuild_search_index(queryset, chunk_size=2000):
+    """Reindexes every receipt in queryset, a chunk at a time. Yields the receipts done per chunk."""
+    receipts = queryset.order_by('pk').only('pk', 'user_id', 'store_name', 'category', 'items')
+    last = 0
+    while True:
+        chunk = list(receipts.filter(pk__gt=last)[:chunk_size])
+        if not chunk:
+            return
+        index_receipts(chunk)
+        yield len(chunk)
+        last = chunk[-1].pk
+
+
+# --- SEARCH ---
+def search_receipt_ids(user, query, limit=MAX_RESULTS):
+    """The ids of the user's receipts matching every word of query, best match first."""
+    terms = search_terms(query)
+    backend = _backend()
+    if not terms:
+        return []
+    if backend is None:
+        return _search_fallback(user, terms, limit)
+
+    with connection.cursor() as cursor:
+        if backend == 'postgresql':
+            tsquery = ' & '.join(f"'{term}':*" for term in terms)
+            cursor.execute(
+                f"SELECT receipt_id FROM {SEARCH_TABLE}, to_tsquery('simple', %s) query "
+                "WHERE user_id = %s AND document @@ query "
+                "ORDER BY ts_rank(document, query) DESC, receipt_id DESC LIMIT %s",
+                [tsquery, user.pk, limit],
+            )
+        else:
+            # The owner is matched inside the FTS index too, so other users' matches are never read
+            match = f'owner:"u{user.pk}" AND ' + ' AND '.join(f'"{term}"*' for term in terms)
+            cursor.execute(
+                f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s "
+                f"ORDER BY bm25({SEARCH_TABLE}, {', '.join(map(str, _SQLITE_WEIGHTS))}), rowid DESC LIMIT %s",
+                [match, limit],
+            )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _search_fallback(user, terms, limit):
+    receipts = Receipt.objects.filter(user=user)
+    for term in terms:
+        labels = [code for code, label in CATEGORY_LABELS.items() if term in f"{code} {label}".casefold()]
+        in_items = ReceiptItem.objects.filter(user=user, normalized_name__icontains=term).values('receipt_id')
+        receipts = receipts.filter(Q(store_name__icontains=term) | Q(category__in=labels) | Q(id__in=in_items))
+    return list(receipts.order_by('-date', '-id').values_list('id', flat=True)[:limit])
+
+
+# --- SIGNALS ---
+# bulk.py and seed_data mute the receipt signals (or use bulk_create) and index the receipts themselves.
+@receiver(post_save, sender=Receipt)
+def index_on_save(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw or receipt_signals_muted():
+        return
+    if created or instance.may_have_changed(update_fields, 'user_id', 'store_name', 'category', 'items'):
+        index_receipts([instance])
+
+
+@receiver(post_delete, sender=Receipt)
+def unindex_on_delete(sender, instance, **kwargs):
+    if not receipt_signals_muted():
+        unindex_receipts([instance.pk])
@@ -1,7 +1,8 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
+from django.urls import reverse
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
-from .models import Receipt
+from .models import Receipt, ReceiptItem, ScanJob, ExportJob
 
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
@@ -55,6 +56,77 @@ class ReceiptSerializer(serializers.ModelSerializer):
             'category',
             'items',
             'status',
+            'image_hash',
             'created_at'
         ]
-        read_only_fields = ['id', 'created_at']
\ No newline at end of file
+        read_only_fields = ['id', 'created_at']
+
+    def update(self, instance, validated_data):
+        # Only the fields whose value changes: the line items and the search index skip a save that leaves them
+        instance.changed_fields = {name for name, value in validated_data.items() if getattr(instance, name) != value}
+        return super().update(instance, validated_data)
+
+
+class ReceiptListSerializer(ReceiptSerializer):
+    """
+    Lean receipt for list responses: the owner is just an id (it is always request.user anyway),
+    and fields=[...] keeps only the requested fields.
+    """
+    user = serializers.IntegerField(source='user_id', read_only=True)
+
+    class Meta(ReceiptSerializer.Meta):
+        # The image hash only matters when a receipt is saved
+        fields = [name for name in ReceiptSerializer.Meta.fields if name != 'image_hash']
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields:
+            self.check_field_names(fields)
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    @classmethod
+    def check_field_names(cls, fields):
+        unknown = set(fields) - set(cls.Meta.fields)
+        if unknown:
+            raise serializers.ValidationError(
+                {"fields": f"Unknown field(s): {', '.join(sorted(unknown))}. Choose from {', '.join(cls.Meta.fields)}."}
+            )
+
+
+class ScanJobSerializer(serializers.ModelSerializer):
+    # The finished receipt draft (null until the job is done)
+    draft = serializers.JSONField(source='result', read_only=True)
+
+    class Meta:
+        model = ScanJob
+        fields = ['id', 'status', 'file_name', 'draft', 'error', 'created_at', 'updated_at']
+        read_only_fields = fields
+
+
+class ReceiptItemSerializer(serializers.ModelSerializer):
+    # A search hit also says where and when it was bought
+    date = serializers.DateField(source='receipt.date', read_only=True)
+    store_name = serializers.CharField(source='receipt.store_name', read_only=True)
+
+    class Meta:
+        model = ReceiptItem
+        fields = ['id', 'receipt', 'name', 'price', 'quantity', 'date', 'store_name']
+        read_only_fields = fields
+
+
+class ExportJobSerializer(serializers.ModelSerializer):
+    # Where to fetch the file (null until the job is done)
+    download = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ExportJob
+        fields = ['id', 'status', 'format', 'rows', 'size', 'download', 'error', 'created_at', 'updated_at']
+        read_only_fields = fields
+
+    def get_download(self, job):
+        if job.status != 'done':
+            return None
+        path = reverse('receipt-export-job-download', kwargs={'job_id': job.id})
+        request = self.context.get('request')
+        return request.build_absolute_uri(path) if request else path
@@ -0,0 +1,159 @@
+import threading
+import time
+from collections import Counter, OrderedDict
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .items import compact_name
+from .models import Receipt
+from .response_cache import get_cache
+from .rollups import receipt_signals_muted
+
+# The category each user gives a store on their verified receipts (the most used one). Scan drafts take it
+# over the keyword guess (categorizer.py), so a correction sticks for the next scan of the same store.
+#
+# Each process keeps the memory of the users it served last, under a per-user version kept in the response
+# cache (shared by every worker, see settings.py). Saving or deleting a verified receipt (or verifying one)
+# bumps the version, and every process reloads that user on their next scan; other writes leave it alone.
+# Without a shared cache (STORE_MEMORY_CACHED off), every scan reads the user's stores from the database.
+
+# Users whose store memory is kept in each process
+MEMORY_MAX_USERS = 1024
+
+
+def _version_key(user_id):
+    return f"store-memory-version:{user_id}"
+
+
+def store_version(user_id):
+    """The version of the user's store memory (created on first use)."""
+    cache = get_cache()
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        # Started from the clock, like the response cache's: an evicted counter never comes back to an old number
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_store_version(user_id):
+    """Makes every process's copy of the user's memory stale."""
+    cache = get_cache()
+    try:
+        cache.incr(_version_key(user_id))
+    except ValueError:  # no counter yet: no process holds a copy under one either
+        cache.add(_version_key(user_id), time.time_ns(), timeout=None)
+
+
+def store_key(store_name):
+    return compact_name(store_name or '')
+
+
+def best_category(counter):
+    """The most used category; ties go to the first alphabetically, so the answer doesn't depend on row order."""
+    return min(counter.items(), key=lambda pair: (-pair[1], pair[0]))[0]
+
+
+def load_stores(user_id):
+    """{compact store name: category} of the user, from their verified receipts."""
+    counts = {}
+    rows = (Receipt.objects.filter(user_id=user_id, status='verified')
+            .values_list('store_name', 'category').annotate(receipts=Count('id')).order_by())
+    for store_name, category, receipts in rows:
+        key = store_key(store_name)
+        if key:
+            counts.setdefault(key, Counter())[category] += receipts
+    return {key: best_category(counter) for key, counter in counts.items()}
+
+
+class StoreMemory:
+    """An LRU of {compact store name: category} per user, each under the user's store_version()."""
+
+    def __init__(self, max_users=MEMORY_MAX_USERS):
+        self.max_users = max_users
+        self._entries = OrderedDict()  # user id -> (version, {key: category})
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id):
+        """The user's {compact store name: category}."""
+        if not settings.STORE_MEMORY_CACHED:
+            return load_stores(user_id)
+
+        version = store_version(user_id)
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        stores = load_stores(user_id)
+        with self._lock:
+            self._entries[user_id] = (version, stores)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+        return stores
+
+    def forget(self, user_id):
+        """Every process reloads the user on their next scan."""
+        bump_store_version(user_id)
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+
+store_memory = StoreMemory()
+
+
+def remembered_category(user_id, store_name):
+    """The category the user gives this store, or None if they have no verified receipt from it."""
+    key = store_key(store_name)
+    return store_memory.get(user_id).get(key) if key else None
+
+
+def categorize_draft(user_id, draft):
+    """Overrides a scan draft's keyword category with the one the user gives its store, if any."""
+    category = remembered_category(user_id, draft.get('store_name'))
+    if category is not None:
+        draft['category'] = category
+    return draft
+
+
+def forget_store_categories(user_id):
+    """After bulk writes that may have changed verified receipts (they send no per-row signals)."""
+    transaction.on_commit(lambda: store_memory.forget(user_id))
+
+
+# --- SIGNALS ---
+# bulk.py mutes the receipt signals and calls forget_store_categories() itself.
+MEMORY_FIELDS = ('user_id', 'store_name', 'category', 'status')
+
+
+@receiver(post_save, sender=Receipt)
+def forget_store_memory_on_save(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw or receipt_signals_muted():
+        return
+    if instance.status == 'verified':
+        changed = created or instance.may_have_changed(update_fields, *MEMORY_FIELDS)
+    else:  # only matters if it just stopped being verified
+        changed = not created and instance.may_have_changed(update_fields, 'status')
+    if changed:
+        forget_store_categories(instance.user_id)
+
+
+@receiver(post_delete, sender=Receipt)
+def forget_store_memory_on_delete(sender, instance, **kwargs):
+    if not receipt_signals_muted() and instance.status == 'verified':
+        forget_store_categories(instance.user_id)
@@ -6,7 +6,18 @@ from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 from igaveapp.models import Receipt
 from datetime import date
-from igaveapp.ocr import extract_receipt_data, parse_date, parse_total, parse_vendor
+from igaveapp.ocr import extract_receipt_data, parse_date, parse_total, parse_vendor, vision_client_pool
+from igaveapp.ocr_cache import get_ocr_cache
+from igaveapp.response_cache import invalidate_user
+
+
+@pytest.fixture(autouse=True)
+def fresh_vision_pool():
+    # The Vision client and the OCR cache are shared per process; start every test without either
+    vision_client_pool.reset()
+    get_ocr_cache().clear()
+    yield
+    vision_client_pool.reset()
 
 # --- CLASS-BASED API TESTS (User & Receipt Endpoints) ---
 
@@ -55,6 +66,59 @@ class ReceiptAPITest(APITestCase):
         self.assertEqual(Receipt.objects.count(), 1)
         self.assertEqual(Receipt.objects.get().store_name, "API Store")
 
+    def test_month_and_year_filters(self):
+        for day in [date(2025, 11, 30), date(2025, 12, 1), date(2025, 12, 31), date(2026, 1, 1)]:
+            Receipt.objects.create(user=self.user, store_name=f"Store {day}", date=day, total_amount="10.00")
+
+        def dates(query):
+            response = self.client.get(f"/api/receipts/?{query}")
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return sorted(r["date"] for r in response.data["results"])
+
+        self.assertEqual(dates("month=2025-12"), ["2025-12-01", "2025-12-31"])
+        self.assertEqual(dates("month=2026-01"), ["2026-01-01"])
+        self.assertEqual(dates("year=2025"), ["2025-11-30", "2025-12-01", "2025-12-31"])
+        for bad in ["month=2025-13", "month=2025-0", "month=2025", "year=soon", "year=0"]:
+            with self.subTest(bad):  # a bad filter matches nothing (it never returns the whole history)
+                self.assertEqual(dates(bad), [])
+                self.assertEqual(self.client.get(f"/api/receipts/stats/?{bad}").data["total_spent"], 0)
+                csv = b"".join(self.client.get(f"/api/receipts/export/?{bad}").streaming_content)
+                self.assertEqual(csv.count(b"\n"), 1)  # the header
+
+    def test_list_is_lean_and_takes_field_selection(self):
+        Receipt.objects.create(user=self.user, store_name="Lean", date=date(2026, 1, 5), total_amount="9.99")
+
+        response = self.client.get("/api/receipts/")
+        self.assertEqual(response.data["results"][0]["user"], self.user.id)  # an id, not the whole owner
+
+        response = self.client.get("/api/receipts/?fields=id,store_name,total_amount")
+        self.assertEqual(set(response.data["results"][0]), {"id", "store_name", "total_amount"})
+        self.assertEqual(response.data["results"][0]["store_name"], "Lean")
+
+        response = self.client.get("/api/receipts/?fields=store_name,password")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        # A single receipt still embeds its owner
+        response = self.client.get(f"/api/receipts/{Receipt.objects.get().id}/")
+        self.assertEqual(response.data["user"]["username"], "receiptuser")
+
+    def test_list_query_count_does_not_grow_with_rows(self):
+        def fill(count):
+            Receipt.objects.bulk_create(
+                [Receipt(user=self.user, store_name=f"Store {i}", total_amount="1.00") for i in range(count)]
+            )
+            invalidate_user(self.user.id)  # bulk_create sends no signals
+
+        fill(3)
+        with self.assertNumQueries(1):
+            self.assertEqual(len(self.client.get("/api/receipts/?page_size=100").data["results"]), 3)
+        fill(50)
+        with self.assertNumQueries(1):
+            self.assertEqual(len(self.client.get("/api/receipts/?page_size=100").data["results"]), 53)
+        receipt_id = Receipt.objects.first().id
+        with self.assertNumQueries(1):
+            self.client.get(f"/api/receipts/{receipt_id}/")
+
 
 # --- STANDALONE OCR LOGIC TESTS (Regex Checks) ---
 
@@ -140,7 +204,7 @@ def test_extract_receipt_data_success(mock_open, mock_creds, mock_client_class):
     # E. Verify the result
     assert data is not None
     assert data["vendor"] == "Target"
-    assert data["date"] == "Dec 25, 2023"
+    assert data["date"] == "2023-12-25"  # Dates come back normalized to YYYY-MM-DD
     assert data["total"] == "50.00"
     
     # F. Verify we mocked the file access (Critical for CI)
@@ -0,0 +1,116 @@
+import json
+from unittest.mock import patch, MagicMock
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from rest_framework.test import APITestCase, APIClient
+from igaveapp.ocr_cache import get_ocr_cache
+
+RECEIPTS = {
+    b"photo-target": "Target\n12/25/2023\nTotal: 50.00",
+    b"photo-shell": "Shell\n01/03/2024\nFuel 40.00\nTotal: 40.00",
+    b"photo-cafe": "Blue Bottle Cafe\n02/14/2024\nTotal: 7.25",
+}
+
+
+def _annotated(text):
+    response = MagicMock()
+    response.error.message = ""
+    annotation = MagicMock()
+    annotation.description = text
+    response.text_annotations = [annotation] if text else []
+    return response
+
+
+def _fake_client():
+    """A Vision client that 'reads' the fake photos above."""
+    client = MagicMock()
+    client.text_detection.side_effect = lambda image: _annotated(RECEIPTS.get(image.content))
+    client.batch_annotate_images.side_effect = lambda requests: MagicMock(
+        responses=[_annotated(RECEIPTS.get(r.image.content)) for r in requests]
+    )
+    return client
+
+
+class BatchScanTest(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="batcher", password="testpass123")
+        self.client.force_authenticate(user=self.user)
+        get_ocr_cache().clear()
+        self.vision = _fake_client()
+        patcher = patch("igaveapp.ocr.vision_client_pool.get", return_value=self.vision)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _post(self, *payloads):
+        files = [SimpleUploadedFile(f"r{i}.jpg", p, content_type="image/jpeg") for i, p in enumerate(payloads)]
+        response = self.client.post("/api/receipts/scan/batch/", {"files": files})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        return [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+
+    def test_batch_streams_drafts_in_input_order(self):
+        lines = self._post(b"photo-shell", b"photo-target", b"unreadable", b"photo-cafe")
+
+        self.assertEqual([line["index"] for line in lines], [0, 1, 2, 3])
+        self.assertEqual([line["file_name"] for line in lines], ["r0.jpg", "r1.jpg", "r2.jpg", "r3.jpg"])
+        self.assertEqual(lines[0]["draft"]["store_name"], "Shell")
+        self.assertEqual(lines[1]["draft"]["total_amount"], "50.00")
+        self.assertEqual(lines[2]["error"], "OCR failed.")
+        self.assertEqual(lines[3]["draft"]["store_name"], "Blue Bottle Cafe")
+
+        # All four images went to Vision in a single round trip
+        self.assertEqual(self.vision.batch_annotate_images.call_count, 1)
+        self.assertEqual(self.vision.text_detection.call_count, 0)
+
+    def test_failed_batch_falls_back_to_single_calls(self):
+        self.vision.batch_annotate_images.side_effect = RuntimeError("payload too large")
+
+        lines = self._post(b"photo-target", b"photo-cafe")
+
+        self.assertEqual([line["draft"]["store_name"] for line in lines], ["Target", "Blue Bottle Cafe"])
+        self.assertEqual(self.vision.text_detection.call_count, 2)
+
+    @override_settings(OCR_BATCH={"MAX_FILES": 50, "WORKERS": 2, "USE_BATCH_API": False})
+    def test_worker_pool_without_batch_api(self):
+        lines = self._post(b"photo-target", b"photo-shell", b"photo-cafe")
+
+        self.assertEqual([line["draft"]["store_name"] for line in lines], ["Target", "Shell", "Blue Bottle Cafe"])
+        self.assertEqual(self.vision.batch_annotate_images.call_count, 0)
+        self.assertEqual(self.vision.text_detection.call_count, 3)
+
+    def test_cached_and_duplicate_images_are_not_rescanned(self):
+        self._post(b"photo-target")
+        self.vision.reset_mock()
+
+        lines = self._post(b"photo-target", b"photo-shell", b"photo-shell")
+
+        self.assertEqual([line["draft"]["store_name"] for line in lines], ["Target", "Shell", "Shell"])
+        self.assertEqual(self.vision.text_detection.call_count, 1)  # only the first Shell photo
+        self.assertEqual(self.vision.batch_annotate_images.call_count, 0)
+
+    def test_batch_drafts_are_checked_for_duplicates(self):
+        lines = self._post(b"photo-target", b"photo-shell", b"photo-target")
+        drafts = [line["draft"] for line in lines]
+
+        self.assertEqual(len({draft["image_hash"] for draft in drafts}), 2)
+        self.assertEqual(drafts[2]["image_hash"], drafts[0]["image_hash"])
+        self.assertEqual([draft.get("duplicate_of") for draft in drafts], [None, None, 0])
+        self.assertEqual([draft["possible_duplicates"] for draft in drafts], [[], [], []])
+
+        # Once saved, the same photos are flagged against the saved receipt, cached OCR or not
+        saved = self.client.post("/api/receipts/", drafts[0], format="json")
+        lines = self._post(b"photo-target", b"photo-cafe")
+        self.assertEqual(lines[0]["draft"]["image_hash"], drafts[0]["image_hash"])
+        self.assertEqual(lines[0]["draft"]["possible_duplicates"], [saved.data["id"]])
+        self.assertEqual(lines[1]["draft"]["possible_duplicates"], [])
+
+    @override_settings(OCR_BATCH={"MAX_FILES": 2, "WORKERS": 2, "USE_BATCH_API": True})
+    def test_batch_limits(self):
+        response = self.client.post("/api/receipts/scan/batch/", {})
+        self.assertEqual(response.status_code, 400)
+
+        files = [SimpleUploadedFile(f"r{i}.jpg", b"x", content_type="image/jpeg") for i in range(3)]
+        response = self.client.post("/api/receipts/scan/batch/", {"files": files})
+        self.assertEqual(response.status_code, 400)
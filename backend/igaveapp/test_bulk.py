@@ -0,0 +1,129 @@
+import io
+import math
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase, APIClient
+from igaveapp.bulk import BATCH_SIZE
+from igaveapp.models import Receipt, SpendingRollup
+from igaveapp.test_rollups import buckets
+
+URL = "/api/receipts/bulk/"
+
+
+def receipts_payload(count, **fields):
+    return [
+        {"store_name": f"Store {n}", "date": f"2026-01-{n % 28 + 1:02d}", "total_amount": f"{n + 1}.50",
+         "category": "food", **fields}
+        for n in range(count)
+    ]
+
+
+class BulkReceiptsTest(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="bulky", password="testpass123")
+        self.client.force_authenticate(user=self.user)
+
+    def assert_rollups_match_a_rebuild(self):
+        incremental = buckets(self.user)
+        SpendingRollup.objects.all().delete()
+        call_command("rebuild_rollups", stdout=io.StringIO())
+        self.assertEqual(buckets(self.user), incremental)
+
+    def test_create_update_and_delete(self):
+        response = self.client.post(URL, receipts_payload(30), format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data), 30)
+        self.assertEqual(Receipt.objects.filter(user=self.user).count(), 30)
+        ids = [receipt["id"] for receipt in response.data]
+
+        updates = [{"id": pk, "status": "verified"} for pk in ids[:10]]
+        updates.append({"id": ids[10], "total_amount": "100.00", "date": "2026-02-01", "category": "health"})
+        response = self.client.patch(URL, updates, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Receipt.objects.filter(user=self.user, status="verified").count(), 10)
+        moved = Receipt.objects.get(id=ids[10])
+        self.assertEqual((moved.total_amount, moved.category), (Decimal("100.00"), "health"))
+        self.assert_rollups_match_a_rebuild()
+
+        response = self.client.delete(URL, {"ids": ids[:5] + [999999]}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {"deleted": sorted(ids[:5]), "not_found": [999999]})
+        response = self.client.delete(f"{URL}?ids={ids[5]},{ids[6]}")
+        self.assertEqual(response.data["deleted"], [ids[5], ids[6]])
+        self.assertEqual(Receipt.objects.filter(user=self.user).count(), 23)
+        self.assert_rollups_match_a_rebuild()
+
+    def test_one_invalid_item_writes_nothing(self):
+        payload = receipts_payload(5)
+        payload[3]["total_amount"] = "not money"
+        response = self.client.post(URL, payload, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error["index"] for error in response.data["errors"]], [3])
+        self.assertIn("total_amount", response.data["errors"][0]["errors"])
+        self.assertFalse(Receipt.objects.exists())
+        self.assertFalse(SpendingRollup.objects.exists())
+
+        receipt = Receipt.objects.create(user=self.user, store_name="Kept", total_amount="5.00")
+        response = self.client.patch(URL, [{"id": receipt.id, "status": "verified"},
+                                           {"id": receipt.id, "status": "pending"},
+                                           {"id": 999999, "status": "verified"},
+                                           {"status": "verified"}], format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error["index"] for error in response.data["errors"]], [1, 2, 3])
+        receipt.refresh_from_db()
+        self.assertNotEqual(receipt.status, "verified")
+
+    def test_other_users_receipts_are_not_found(self):
+        other = User.objects.create_user(username="other", password="testpass123")
+        theirs = Receipt.objects.create(user=other, store_name="Theirs", total_amount="5.00")
+
+        response = self.client.patch(URL, [{"id": theirs.id, "status": "verified"}], format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["errors"][0]["errors"], {"id": ["Not found."]})
+        response = self.client.delete(URL, {"ids": [theirs.id]}, format="json")
+        self.assertEqual(response.data, {"deleted": [], "not_found": [theirs.id]})
+        self.assertTrue(Receipt.objects.filter(id=theirs.id).exists())
+
+    def test_bad_payloads(self):
+        self.assertEqual(self.client.post(URL, [], format="json").status_code, 400)
+        self.assertEqual(self.client.post(URL, {"store_name": "One"}, format="json").status_code, 400)
+        self.assertEqual(self.client.delete(URL, {"ids": ["x"]}, format="json").status_code, 400)
+        with self.settings(RECEIPT_BULK_MAX_ITEMS=3):
+            self.assertEqual(self.client.post(URL, receipts_payload(4), format="json").status_code, 400)
+
+    def test_writes_refresh_the_cached_stats(self):
+        self.assertEqual(self.client.get("/api/receipts/stats/").data["total_spent"], 0)
+        response = self.client.post(URL, receipts_payload(3), format="json")
+        self.assertEqual(self.client.get("/api/receipts/stats/").data["total_spent"], 7.5)
+        self.client.delete(URL, {"ids": [receipt["id"] for receipt in response.data]}, format="json")
+        self.assertEqual(self.client.get("/api/receipts/stats/").data["total_spent"], 0)
+
+    def test_query_count_does_not_grow_with_the_batch(self):
+        def count_queries(method, payload):
+            with CaptureQueriesContext(connection) as captured:
+                method(URL, payload, format="json")
+            return len(captured)
+
+        def statements(count, fields):
+            """The INSERT / UPDATE statements Django splits `count` rows into (the database caps the parameters)."""
+            per_statement = min(BATCH_SIZE, connection.ops.bulk_batch_size(fields, [None] * count))
+            return math.ceil(count / per_statement)
+
+        # Rollup work grows with the buckets touched (one day and its month here), not with the receipts;
+        # the first batch creates the two buckets, later ones update them. Only the receipt statements
+        # themselves may grow, as the database splits them.
+        inserted = [field for field in Receipt._meta.concrete_fields if not field.primary_key]
+        self.client.post(URL, receipts_payload(1, date="2026-03-03"), format="json")
+        small = count_queries(self.client.post, receipts_payload(5, date="2026-03-03"))
+        large = count_queries(self.client.post, receipts_payload(100, date="2026-03-03"))
+        self.assertEqual(large - small, statements(100, inserted) - statements(5, inserted))
+
+        updated = ["pk", "pk", "status", "updated_at"]  # bulk_update's CASE WHEN pk = ... THEN per field
+        ids = list(Receipt.objects.values_list("id", flat=True))
+        small = count_queries(self.client.patch, [{"id": pk, "status": "verified"} for pk in ids[:5]])
+        large = count_queries(self.client.patch, [{"id": pk, "status": "rejected"} for pk in ids[5:105]])
+        self.assertEqual(large - small, statements(100, updated) - statements(5, updated))
@@ -0,0 +1,115 @@
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from rest_framework.test import APITestCase, APIClient
+from igaveapp.categorizer import categorize_text, keyword_category
+from igaveapp.models import Receipt
+from igaveapp.ocr_cache import get_ocr_cache
+from igaveapp.store_memory import remembered_category, store_memory
+
+FAKE = {"ENGINE": "fake", "LATENCY_MS": 0}
+
+
+def test_keywords_keep_the_category_order():
+    assert keyword_category("SHELL STATION") == "transport"
+    assert keyword_category("Shell Cafe") == "food"  # food comes first, wherever its keyword is
+    assert keyword_category("T-Mobile Store") == "utilities"
+    assert keyword_category("Gasoline Grill") == "food"  # overlapping keywords ("gas", "grill") are all seen
+    assert keyword_category("Corner Shop") == "shopping"
+    assert keyword_category("Joe's") is None
+    assert keyword_category("") is None
+
+
+def test_items_are_checked_after_the_vendor():
+    assert categorize_text("Joe's", ["Socks", "Movie Ticket"]) == "entertainment"
+    assert categorize_text("Joe's", ["x"] * 5 + ["Movie Ticket"]) is None  # only the first five items
+    assert categorize_text("Walmart", ["Bread"]) == "shopping"
+
+
+class StoreMemoryTest(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="corrector", password="testpass123")
+        self.client.force_authenticate(user=self.user)
+        store_memory.clear()
+        get_ocr_cache().clear()
+
+    def verified(self, store_name, category):
+        with self.captureOnCommitCallbacks(execute=True):  # the memory follows changes once they commit
+            return Receipt.objects.create(user=self.user, store_name=store_name, category=category, status="verified")
+
+    def test_verified_receipts_teach_the_store(self):
+        self.verified("Joe's Corner", "food")
+        self.verified("JOES CORNER", "food")
+        self.verified("Joe's Corner", "health")
+        Receipt.objects.create(user=self.user, store_name="Lucky's", category="health")  # not verified
+        self.assertEqual(remembered_category(self.user.id, "joes corner"), "food")
+        self.assertIsNone(remembered_category(self.user.id, "Lucky's"))
+
+        other = User.objects.create_user(username="other", password="testpass123")
+        self.assertIsNone(remembered_category(other.id, "Joe's Corner"))
+
+        with self.assertNumQueries(0):  # cached
+            self.assertEqual(remembered_category(self.user.id, "Joe's Corner"), "food")
+        self.assertEqual((store_memory.hits, store_memory.misses), (2, 2))
+
+    def test_changes_to_verified_receipts_reload_the_memory(self):
+        lunch = self.verified("Joe's Corner", "food")
+        self.assertEqual(remembered_category(self.user.id, "Joe's Corner"), "food")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            pending = Receipt.objects.create(user=self.user, store_name="Lucky's", category="health")
+            pending.save(update_fields=["total_amount"])
+            self.client.patch(f"/api/receipts/{lunch.pk}/", {"store_name": "Joe's Corner"}, format="json")
+        with self.assertNumQueries(0):  # nothing the memory holds changed
+            self.assertEqual(remembered_category(self.user.id, "Joe's Corner"), "food")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f"/api/receipts/{pending.pk}/", {"status": "verified"}, format="json")
+            self.client.patch(f"/api/receipts/{lunch.pk}/", {"category": "entertainment"}, format="json")
+        self.assertEqual(remembered_category(self.user.id, "Lucky's"), "health")
+        self.assertEqual(remembered_category(self.user.id, "Joe's Corner"), "entertainment")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f"/api/receipts/{lunch.pk}/", {"status": "pending"}, format="json")
+        self.assertIsNone(remembered_category(self.user.id, "Joe's Corner"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Receipt.objects.get(pk=pending.pk).delete()
+        self.assertIsNone(remembered_category(self.user.id, "Lucky's"))
+
+        # A bulk write sends no per-row signals: it asks for the reload itself
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post("/api/receipts/bulk/", [{"store_name": "Joes Corner", "category": "food",
+                                                      "status": "verified"}], format="json")
+        self.assertEqual(remembered_category(self.user.id, "Joe's Corner"), "food")
+        self.assertEqual((store_memory.hits, store_memory.misses), (2, 5))
+
+    def test_a_copy_read_by_another_process_is_reloaded(self):
+        self.verified("Joe's Corner", "food")
+        self.assertEqual(remembered_category(self.user.id, "Joe's Corner"), "food")
+        store_memory.forget(self.user.id)  # what another worker's bulk write does to the shared version
+        self.verified("Joe's Corner", "health")
+        self.verified("Joe's Corner", "health")
+        self.assertEqual(remembered_category(self.user.id, "Joe's Corner"), "health")
+        self.assertEqual(store_memory.misses, 2)
+
+    @override_settings(STORE_MEMORY_CACHED=False)
+    def test_without_a_shared_cache_every_scan_reads_the_database(self):
+        self.verified("Joe's Corner", "food")
+        for _ in range(2):
+            with self.assertNumQueries(1):
+                self.assertEqual(remembered_category(self.user.id, "Joe's Corner"), "food")
+
+    @override_settings(OCR_BACKEND=FAKE)
+    def test_scan_uses_the_memory(self):
+        def scan():
+            upload = SimpleUploadedFile("r.jpg", b"fixture:walmart_grocery", content_type="image/jpeg")
+            return self.client.post("/api/receipts/scan/", {"file": upload}).data
+
+        draft = scan()
+        self.assertEqual(draft["category"], "shopping")
+
+        # The user files their Walmart groceries under food
+        self.verified(draft["store_name"], "food")
+        self.assertEqual(scan()["category"], "food")
@@ -0,0 +1,111 @@
+import io
+from datetime import date
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import override_settings
+from rest_framework.test import APITestCase, APIClient
+from igaveapp.dedup import fingerprint
+from igaveapp.models import Receipt, SpendingRollup
+from igaveapp.ocr_cache import get_ocr_cache
+
+FAKE = {"ENGINE": "fake", "LATENCY_MS": 0}
+MILK_RUN = {"store_name": "Trader Joe's", "date": "2026-03-01", "total_amount": "5.49",
+            "items": [{"name": "Milk", "price": 2.49}, {"name": "Bread", "price": 3}]}
+
+
+class FingerprintTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="twice", password="testpass123")
+
+    def test_fingerprint_ignores_formatting(self):
+        items = [{"name": "Milk", "price": 2.49}, {"desc": "Bread", "price": "3.00"}]
+        reordered = [items[1], {"name": "milk", "price": "2.49"}]
+        same = fingerprint("TRADER JOES", date(2026, 3, 1), Decimal("5.49"), reordered)
+        self.assertEqual(fingerprint("Trader Joe's", "2026-03-01", 5.49, items), same)
+        self.assertNotEqual(fingerprint("Trader Joe's", "2026-03-02", 5.49, items), same)
+        self.assertNotEqual(fingerprint("Trader Joe's", "2026-03-01", 5.49, items[:1]), same)
+        self.assertEqual(fingerprint("Trader Joe's", None, 5.49, items), "")  # too little to go on
+
+    def test_fingerprint_follows_saves(self):
+        receipt = Receipt.objects.create(user=self.user, **MILK_RUN)
+        first = receipt.fingerprint
+        self.assertEqual(len(first), 32)
+
+        receipt.status = "verified"
+        with self.assertNumQueries(1):  # the fingerprint isn't written when its fields weren't
+            receipt.save(update_fields=["status"])
+        receipt.total_amount = Decimal("6.00")
+        receipt.save(update_fields=["total_amount"])
+        receipt.refresh_from_db()
+        self.assertNotEqual(receipt.fingerprint, first)
+
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        client.patch("/api/receipts/bulk/", [{"id": receipt.pk, "total_amount": "5.49"}], format="json")
+        receipt.refresh_from_db()
+        self.assertEqual(receipt.fingerprint, first)
+
+
+class DuplicateFlagTest(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="twice", password="testpass123")
+        self.client.force_authenticate(user=self.user)
+        get_ocr_cache().clear()
+
+    def test_create_flags_duplicates(self):
+        first = self.client.post("/api/receipts/", MILK_RUN, format="json")
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(first.data["possible_duplicates"], [])
+
+        again = {**MILK_RUN, "store_name": "trader joes", "items": MILK_RUN["items"][::-1]}
+        second = self.client.post("/api/receipts/", again, format="json")
+        self.assertEqual(second.data["possible_duplicates"], [first.data["id"]])
+
+        other = User.objects.create_user(username="other", password="testpass123")
+        self.client.force_authenticate(user=other)
+        self.assertEqual(self.client.post("/api/receipts/", MILK_RUN, format="json").data["possible_duplicates"], [])
+
+    @override_settings(OCR_BACKEND=FAKE)
+    def test_scan_flags_an_image_saved_before(self):
+        def scan():
+            upload = SimpleUploadedFile("r.jpg", b"fixture:walmart_grocery", content_type="image/jpeg")
+            return self.client.post("/api/receipts/scan/", {"file": upload}).data
+
+        draft = scan()
+        self.assertEqual(draft["possible_duplicates"], [])
+        self.assertEqual(len(draft["image_hash"]), 64)
+
+        # Saved with a different total (corrected by hand): still caught by the image
+        saved = {**draft, "total_amount": "1.00", "date": draft["date"] or "2026-01-01"}
+        receipt_id = self.client.post("/api/receipts/", saved, format="json").data["id"]
+        self.assertEqual(scan()["possible_duplicates"], [receipt_id])
+        self.assertNotIn("image_hash", self.client.get("/api/receipts/").data["results"][0])
+
+
+class DedupCommandTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="twice", password="testpass123")
+
+    def test_dedup_command(self):
+        receipts = Receipt.objects.bulk_create(
+            [Receipt(user=self.user, **MILK_RUN) for _ in range(3)]
+            + [Receipt(user=self.user, **{**MILK_RUN, "date": "2026-03-02"})]
+            + [Receipt(user=self.user, store_name="A", image_hash="ab" * 32),
+               Receipt(user=self.user, store_name="B", image_hash="ab" * 32)]
+        )
+        call_command("rebuild_rollups", stdout=io.StringIO())
+        self.assertFalse(Receipt.objects.exclude(fingerprint="").exists())  # bulk_create skipped save()
+
+        out = io.StringIO()
+        call_command("dedup_receipts", "--chunk-size", "2", stdout=out)
+        self.assertIn("Found 3 duplicate receipts in 2 groups", out.getvalue())
+        self.assertEqual(Receipt.objects.count(), 6)
+
+        call_command("dedup_receipts", "--delete", stdout=io.StringIO())
+        self.assertEqual(sorted(Receipt.objects.values_list("id", flat=True)),
+                         [receipts[0].pk, receipts[3].pk, receipts[4].pk])
+        march = SpendingRollup.objects.get(user=self.user, period="month", start="2026-03-01")
+        self.assertEqual((march.total, march.count), (Decimal("10.98"), 2))
@@ -0,0 +1,165 @@
+import csv
+import io
+import json
+import os
+import tempfile
+import zipfile
+from datetime import date
+from xml.etree import ElementTree
+from django.contrib.auth.models import User
+from django.test import override_settings
+from rest_framework.test import APITestCase, APIClient
+from igaveapp.exports import stream_csv
+from igaveapp.models import Receipt, ExportJob
+from igaveapp.xlsx import stream_xlsx
+
+SHEET_NS = {"x": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+
+
+def _read_csv(response):
+    body = b"".join(response.streaming_content).decode("utf-8")
+    assert body.startswith("\ufeff")
+    return list(csv.reader(io.StringIO(body[1:])))
+
+
+class ExportFormatTest(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="exporter", password="testpass123")
+        self.client.force_authenticate(user=self.user)
+        self.lunch = Receipt.objects.create(user=self.user, store_name="Deli, Inc.", date=date(2026, 1, 5),
+                                            total_amount="12.50", category="food", status="verified",
+                                            items=[{"name": "Soup", "price": 4.5}, {"name": "Sandwich", "price": 8}])
+        self.bus = Receipt.objects.create(user=self.user, store_name="Metro", date=date(2026, 2, 1),
+                                          total_amount="2.75", category="transport")
+        self.undated = Receipt.objects.create(user=self.user, store_name="Mystery", category="general")
+
+    def test_export_streams_the_report(self):
+        response = self.client.get("/api/receipts/export/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="iSave_Report.csv"')
+        rows = _read_csv(response)
+        self.assertEqual(rows[0], ["Date", "Store Name", "Category", "Amount", "Status"])
+        dated = [row for row in rows[1:] if row[0] != "N/A"]  # where an empty date sorts depends on the database
+        self.assertEqual(dated, [
+            ["01 Feb 2026", "Metro", "Transportation", "$2.75", "Pending Verification"],
+            ["05 Jan 2026", "Deli, Inc.", "Food & Dining", "$12.50", "Verified"],
+        ])
+        self.assertIn(["N/A", "Mystery", "General", "$0.00", "Pending Verification"], rows)
+
+    def test_export_keeps_filters_and_selection(self):
+        rows = _read_csv(self.client.get("/api/receipts/export/?month=2026-01"))
+        self.assertEqual([row[1] for row in rows[1:]], ["Deli, Inc."])
+
+        rows = _read_csv(self.client.get(f"/api/receipts/export/?ids={self.bus.id},{self.undated.id}"))
+        self.assertEqual(sorted(row[1] for row in rows[1:]), ["Metro", "Mystery"])
+
+    def test_export_line_items(self):
+        response = self.client.get("/api/receipts/export/?as=items&year=2026")
+
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="iSave_Items.csv"')
+        rows = _read_csv(response)
+        self.assertEqual(rows[0][4:6], ["Item", "Price"])
+        self.assertEqual(rows[1:], [
+            [str(self.bus.id), "2026-02-01", "Metro", "Transportation", "", "", "2.75", "Pending Verification"],
+            [str(self.lunch.id), "2026-01-05", "Deli, Inc.", "Food & Dining", "Soup", "4.50", "12.50", "Verified"],
+            [str(self.lunch.id), "2026-01-05", "Deli, Inc.", "Food & Dining", "Sandwich", "8.00", "12.50", "Verified"],
+        ])
+
+    def test_export_xlsx(self):
+        response = self.client.get("/api/receipts/export/?as=xlsx&month=2026-01")
+
+        self.assertEqual(response["Content-Type"], "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+        workbook = zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content)))
+        self.assertIsNone(workbook.testzip())
+        receipts = ElementTree.fromstring(workbook.read("xl/worksheets/sheet1.xml"))
+        items = ElementTree.fromstring(workbook.read("xl/worksheets/sheet2.xml"))
+        self.assertEqual(len(receipts.findall(".//x:row", SHEET_NS)), 2)
+        self.assertEqual(len(items.findall(".//x:row", SHEET_NS)), 3)
+        cells = receipts.findall(".//x:row", SHEET_NS)[1]
+        values = [c.findtext(".//x:v", namespaces=SHEET_NS) or c.findtext(".//x:t", namespaces=SHEET_NS) for c in cells]
+        self.assertEqual(values, [str(self.lunch.id), "46027", "Deli, Inc.", "Food & Dining", "12.50", "Verified"])
+
+    def test_export_jsonl_and_columnar(self):
+        response = self.client.get("/api/receipts/export/?as=jsonl&month=2026-01")
+        records = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0]["total_amount"], "12.50")
+        self.assertEqual(records[0]["items"][1], {"name": "Sandwich", "price": 8})
+
+        response = self.client.get("/api/receipts/export/?as=columnar")
+        blocks = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        self.assertEqual(len(blocks), 1)
+        self.assertEqual(blocks[0]["rows"], 3)
+        self.assertCountEqual(blocks[0]["columns"]["store_name"], ["Deli, Inc.", "Metro", "Mystery"])
+
+    def test_unknown_format_is_rejected(self):
+        response = self.client.get("/api/receipts/export/?as=pdf")
+        self.assertEqual(response.status_code, 400)
+
+
+class ExportJobTest(APITestCase):
+    def setUp(self):
+        self.export_dir = tempfile.TemporaryDirectory()
+        settings = override_settings(EXPORT_JOBS={"DIR": self.export_dir.name, "WORKERS": 0, "QUEUE_SIZE": 0,
+                                                  "TTL": 3600})
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.addCleanup(self.export_dir.cleanup)
+
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="exporter", password="testpass123")
+        self.client.force_authenticate(user=self.user)
+        Receipt.objects.create(user=self.user, store_name="Deli", date=date(2026, 1, 5), total_amount="12.50")
+        Receipt.objects.create(user=self.user, store_name="Metro", date=date(2026, 2, 1), total_amount="2.75")
+
+    def test_export_job_is_written_and_downloaded(self):
+        response = self.client.post("/api/receipts/export/jobs/?as=items&month=2026-01")
+        self.assertEqual(response.status_code, 202)
+        job_id = response.data["id"]
+
+        response = self.client.get(f"/api/receipts/export/jobs/{job_id}/")
+        self.assertEqual(response.data["status"], "done")
+        self.assertEqual(response.data["rows"], 1)
+        self.assertTrue(response.data["download"].endswith(f"/api/receipts/export/jobs/{job_id}/download/"))
+
+        response = self.client.get(f"/api/receipts/export/jobs/{job_id}/download/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="iSave_Items.csv"')
+        body = b"".join(response.streaming_content).decode("utf-8")
+        self.assertEqual([row[2] for row in csv.reader(io.StringIO(body[1:]))][1:], ["Deli"])
+
+    def test_export_jobs_are_private_and_expire(self):
+        job_id = self.client.post("/api/receipts/export/jobs/").data["id"]
+        path = ExportJob.objects.get(pk=job_id).file_path
+        self.assertTrue(os.path.exists(path))
+
+        other = User.objects.create_user(username="other", password="testpass123")
+        self.client.force_authenticate(user=other)
+        self.assertEqual(self.client.get(f"/api/receipts/export/jobs/{job_id}/download/").status_code, 404)
+
+        with self.settings(EXPORT_JOBS={"DIR": self.export_dir.name, "WORKERS": 0, "QUEUE_SIZE": 0, "TTL": -1}):
+            self.client.post("/api/receipts/export/jobs/")
+        self.assertFalse(ExportJob.objects.filter(pk=job_id).exists())
+        self.assertFalse(os.path.exists(path))
+
+
+def test_stream_csv_chunks():
+    chunks = list(stream_csv(["n"], ([i] for i in range(1001)), rows_per_chunk=500))
+
+    assert len(chunks) == 3
+    assert b"".join(chunks).decode("utf-8") == "\ufeffn\r\n" + "".join(f"{i}\r\n" for i in range(1001))
+
+
+def test_stream_xlsx_is_a_valid_workbook():
+    rows = ([i, f"row <{i}>\x0c", date(2026, 1, 1), None] for i in range(1200))
+    data = b"".join(stream_xlsx([("Rows", ["n", "text", "day", "empty"], rows)], rows_per_chunk=500))
+
+    workbook = zipfile.ZipFile(io.BytesIO(data))
+    assert workbook.testzip() is None
+    sheet = ElementTree.fromstring(workbook.read("xl/worksheets/sheet1.xml"))
+    rows = sheet.findall(".//x:row", SHEET_NS)
+    assert len(rows) == 1201
+    assert rows[-1][1].findtext(".//x:t", namespaces=SHEET_NS) == "row <1199>"
@@ -0,0 +1,119 @@
+import io
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase, APIClient
+from igaveapp.items import normalize_item_name
+from igaveapp.models import Receipt, ReceiptItem
+
+
+def stored_items(receipt):
+    return list(ReceiptItem.objects.filter(receipt=receipt).order_by('position')
+                .values_list('name', 'normalized_name', 'price', 'quantity'))
+
+
+class ReceiptItemSyncTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="shopper", password="testpass123")
+
+    def test_items_follow_the_receipt(self):
+        receipt = Receipt.objects.create(user=self.user, store_name="Deli", items=[
+            {"name": "Organic MILK 2%", "price": 3.49},
+            {"desc": "Bread", "price": "2.5", "qty": 2},
+            {"name": "", "price": 1},
+            {"name": "Mystery", "price": "n/a"},
+        ])
+        self.assertEqual(stored_items(receipt), [
+            ("Organic MILK 2%", "organic milk 2", Decimal("3.49"), Decimal("1")),
+            ("Bread", "bread", Decimal("2.50"), Decimal("2")),
+            ("Mystery", "mystery", None, Decimal("1")),
+        ])
+
+        receipt.items = [{"name": "Eggs", "price": 4}]
+        receipt.save()
+        self.assertEqual(stored_items(receipt), [("Eggs", "eggs", Decimal("4.00"), Decimal("1"))])
+        with self.assertNumQueries(1):
+            receipt.save(update_fields=["status"])
+
+        item_ids = list(ReceiptItem.objects.filter(receipt=receipt).values_list('id', flat=True))
+        self.client.force_authenticate(user=self.user)
+        response = self.client.patch(f"/api/receipts/{receipt.pk}/", {"status": "verified"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        # A request that leaves the items as they are doesn't rewrite them
+        self.assertEqual(list(ReceiptItem.objects.filter(receipt=receipt).values_list('id', flat=True)), item_ids)
+        response = self.client.patch(f"/api/receipts/{receipt.pk}/", {"items": receipt.items}, format="json")
+        self.assertEqual(list(ReceiptItem.objects.filter(receipt=receipt).values_list('id', flat=True)), item_ids)
+
+        receipt = Receipt.objects.get(pk=receipt.pk)
+        receipt.items.append({"name": "Jam", "price": 3})  # edited in place
+        receipt.save()
+        self.assertEqual([row[0] for row in stored_items(receipt)], ["Eggs", "Jam"])
+
+        receipt.delete()
+        self.assertFalse(ReceiptItem.objects.exists())
+
+    def test_normalize(self):
+        self.assertEqual(normalize_item_name("  Café-Crème   (Large) "), "café crème large")
+        self.assertEqual(normalize_item_name("%%"), "")
+
+    def test_backfill_command(self):
+        receipts = Receipt.objects.bulk_create([
+            Receipt(user=self.user, store_name=f"Store {n}", items=[{"name": "Milk", "price": n}, {"desc": "Tea"}])
+            for n in range(5)
+        ])
+        self.assertFalse(ReceiptItem.objects.exists())
+        out = io.StringIO()
+        call_command("backfill_items", "--chunk-size", "2", stdout=out)
+        self.assertIn("Wrote 10 items for 5 receipts", out.getvalue())
+        self.assertEqual(stored_items(receipts[3])[0][2], Decimal("3.00"))
+
+        call_command("backfill_items", stdout=io.StringIO())  # rerunning rewrites, never duplicates
+        self.assertEqual(ReceiptItem.objects.count(), 10)
+
+
+class ItemEndpointsTest(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="milkman", password="testpass123")
+        self.client.force_authenticate(user=self.user)
+        Receipt.objects.create(user=self.user, store_name="Grocer", date="2026-01-10", items=[
+            {"name": "Milk", "price": 2.00}, {"name": "Milk Chocolate", "price": 3.00}, {"name": "Bread", "price": 2},
+        ])
+        Receipt.objects.create(user=self.user, store_name="Corner Shop", date="2026-02-03", items=[
+            {"name": "MILK", "price": 2.50, "quantity": 2}, {"name": "Oat milk", "price": 4},
+        ])
+        other = User.objects.create_user(username="other", password="testpass123")
+        Receipt.objects.create(user=other, store_name="Theirs", date="2026-01-10",
+                               items=[{"name": "Milk", "price": 99}])
+
+    def test_search(self):
+        response = self.client.get("/api/receipts/items/search/?q=MILK")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["query"], "milk")
+        self.assertEqual([(hit["name"], hit["store_name"]) for hit in response.data["results"]],
+                         [("MILK", "Corner Shop"), ("Milk", "Grocer"), ("Milk Chocolate", "Grocer")])
+
+        response = self.client.get("/api/receipts/items/search/?q=milk&month=2026-01&limit=1")
+        self.assertEqual([hit["name"] for hit in response.data["results"]], ["Milk"])
+        self.assertEqual(self.client.get("/api/receipts/items/search/?q=%25").status_code, 400)
+        self.assertEqual(self.client.get("/api/receipts/items/search/?q=milk&date=soon").status_code, 400)
+
+    def test_stats_and_top(self):
+        data = self.client.get("/api/receipts/items/stats/?q=milk").data
+        self.assertEqual((data["matches"], data["receipts"]), (3, 2))
+        self.assertEqual(data["total_spent"], Decimal("7.50"))
+        self.assertEqual(data["quantity"], Decimal("4"))
+        self.assertEqual(str(data["first_bought"]), "2026-01-10")
+        self.assertEqual([(row["name"], row["count"]) for row in data["names"]],
+                         [("milk", 2), ("milk chocolate", 1)])
+
+        data = self.client.get("/api/receipts/items/top/?limit=2").data
+        self.assertEqual([row["name"] for row in data["items"]], ["milk", "oat milk"])
+
+    def test_stats_are_two_indexed_queries(self):
+        with CaptureQueriesContext(connection) as captured:
+            self.client.get("/api/receipts/items/stats/?q=milk")
+        self.assertEqual(len(captured), 2)  # the totals and the matched names
+        self.assertTrue(all('"normalized_name" LIKE' in q["sql"] for q in captured))
@@ -0,0 +1,101 @@
+import json
+import sys
+import time
+import pytest
+from unittest.mock import patch
+from django.contrib.auth.models import User
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from rest_framework.test import APIClient
+from igaveapp.ocr import cache_key, extract_receipt_data
+from igaveapp.ocr_backends import FakeOcrBackend, GoogleVisionBackend, get_ocr_backend
+from igaveapp.ocr_cache import get_ocr_cache
+
+FAKE = {"ENGINE": "fake", "LATENCY_MS": 0}
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    get_ocr_cache().clear()
+
+
+def test_google_is_the_default():
+    assert isinstance(get_ocr_backend(), GoogleVisionBackend)
+
+    with override_settings(OCR_BACKEND={"ENGINE": "carrier-pigeon"}):
+        with pytest.raises(ImproperlyConfigured):
+            get_ocr_backend()
+
+
+@patch.dict(sys.modules, {"pytesseract": None})  # not installed
+def test_tesseract_needs_pytesseract():
+    with override_settings(OCR_BACKEND={"ENGINE": "tesseract"}):
+        with pytest.raises(ImproperlyConfigured):
+            get_ocr_backend()
+
+
+def test_fake_backend_serves_fixtures_deterministically():
+    fake = FakeOcrBackend()
+
+    assert fake.detect_text(b"fixture:walmart_grocery").startswith("Walmart Supercenter")
+    assert fake.detect_text(b"fixture:no_such_receipt") is None
+
+    photo = b"\xff\xd8\xff\xe0 any photo"
+    assert fake.detect_text(photo) == fake.detect_text(photo)
+    assert fake.batch_detect_text([b"fixture:shell_station", photo]) == [
+        fake.detect_text(b"fixture:shell_station"), fake.detect_text(photo)
+    ]
+    assert fake.calls == 7  # the batch was a single round trip
+
+
+def test_fake_backend_latency():
+    fake = FakeOcrBackend(latency_ms=30, jitter_ms=10)
+
+    start = time.perf_counter()
+    fake.batch_detect_text([b"fixture:walmart_grocery"] * 5)
+    assert 0.019 <= time.perf_counter() - start < 0.5
+
+
+@override_settings(OCR_BACKEND=FAKE)
+def test_pipeline_runs_on_the_fake_backend():
+    data = extract_receipt_data(b"fixture:shell_station")
+
+    assert data["vendor"] == "SHELL"
+    assert cache_key(b"x").startswith("fake-")  # never mixed up with real Vision results
+
+
+@pytest.mark.django_db
+@override_settings(OCR_BACKEND=FAKE)
+def test_scan_endpoints_without_credentials():
+    client = APIClient()
+    client.force_authenticate(user=User.objects.create_user(username="offline", password="testpass123"))
+
+    upload = SimpleUploadedFile("r.jpg", b"fixture:walmart_grocery", content_type="image/jpeg")
+    response = client.post("/api/receipts/scan/", {"file": upload})
+    assert response.status_code == 200
+    assert response.data["store_name"] == "Walmart Supercenter"
+
+    files = [SimpleUploadedFile(f"r{i}.jpg", f"fixture:{name}".encode(), content_type="image/jpeg")
+             for i, name in enumerate(["shell_station", "walmart_grocery"])]
+    response = client.post("/api/receipts/scan/batch/", {"files": files})
+    lines = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+    assert [line["draft"]["store_name"] for line in lines] == ["SHELL", "Walmart Supercenter"]
+
+
+@pytest.mark.django_db
+@override_settings(OCR_BACKEND=FAKE)
+def test_scan_trace_mode():
+    client = APIClient()
+    client.force_authenticate(user=User.objects.create_user(username="debugger", password="testpass123"))
+
+    def scan(query=""):
+        upload = SimpleUploadedFile("r.jpg", b"fixture:walmart_grocery", content_type="image/jpeg")
+        return client.post(f"/api/receipts/scan/{query}", {"file": upload}).data
+
+    assert "trace" not in scan()
+    draft = scan("?trace=true")  # the OCR result is cached now: the text is parsed again for the trace
+    steps = [step["step"] for step in draft["trace"]]
+    assert steps[0] == "ocr" and draft["trace"][0]["cache"] == "hit"
+    assert "line" in steps and steps[-1] == "category"
+    assert any(step.get("decision") == "item" for step in draft["trace"])
@@ -0,0 +1,117 @@
+import json
+import os
+import pytest
+from unittest.mock import patch, MagicMock
+from django.test import override_settings
+from igaveapp.ocr import extract_receipt_data, vision_client_pool
+from igaveapp.ocr_cache import (
+    MemoryOcrCache, DatabaseOcrCache, FileOcrCache, get_ocr_cache, image_hash,
+)
+
+DATA = {"vendor": "Target", "date": None, "total": "5.00", "category": "shopping", "items": []}
+
+
+@pytest.fixture(autouse=True)
+def fresh_state():
+    vision_client_pool.reset()
+    get_ocr_cache().clear()
+    yield
+    vision_client_pool.reset()
+    get_ocr_cache().clear()
+
+
+# --- BACKENDS ---
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = MemoryOcrCache(max_entries=2)
+    cache.set("a", "text a", DATA)
+    cache.set("b", "text b", DATA)
+    cache.get("a")  # "a" is now the most recently used
+    cache.set("c", "text c", DATA)
+
+    assert cache.get("b") is None
+    assert cache.get("a")["text"] == "text a"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_memory_cache_respects_byte_limit():
+    cache = MemoryOcrCache(max_bytes=300)
+    cache.set("a", "x" * 150, DATA)
+    cache.set("b", "y" * 150, DATA)
+    assert cache.get("a") is None
+    assert cache.get("b") is not None
+
+
+def test_memory_cache_ttl():
+    cache = MemoryOcrCache(ttl=10)
+    with patch("igaveapp.ocr_cache.time.monotonic", return_value=1000):
+        cache.set("a", "text", DATA)
+    with patch("igaveapp.ocr_cache.time.monotonic", return_value=1005):
+        assert cache.get("a") is not None
+    with patch("igaveapp.ocr_cache.time.monotonic", return_value=1011):
+        assert cache.get("a") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+@pytest.mark.django_db
+def test_database_cache_roundtrip_and_prune():
+    cache = DatabaseOcrCache(max_entries=2)
+    for key in ("a", "b", "c"):
+        cache.set(key, f"text {key}", DATA)
+
+    assert cache.get("c") == {"text": "text c", "data": DATA}
+    assert cache.prune() == 1
+    assert cache.get("a") is None
+
+
+@pytest.mark.django_db
+def test_database_cache_prunes_to_max_bytes():
+    size = len("text a".encode("utf-8")) + len(json.dumps(DATA))
+    cache = DatabaseOcrCache(max_bytes=2 * size)
+    for key in ("a", "b", "c"):
+        cache.set(key, f"text {key}", DATA)
+    cache.get("a")  # now the most recently used
+
+    assert cache.prune() == 1
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+
+def test_file_cache_roundtrip_and_prune(tmp_path):
+    cache = FileOcrCache(location=str(tmp_path), max_entries=1)
+    cache.set("aa11", "first", DATA)
+    os.utime(next(tmp_path.rglob("*.json")), (1, 1))  # make it the oldest file
+    cache.set("bb22", "second", DATA)
+
+    assert cache.get("aa11")["text"] == "first"
+    assert cache.prune() == 1
+    assert cache.get("aa11") is None
+    assert cache.get("bb22")["data"] == DATA
+
+
+@override_settings(OCR_CACHE={"BACKEND": "none"})
+def test_cache_can_be_disabled():
+    assert get_ocr_cache() is None
+
+
+# --- IN FRONT OF extract_receipt_data ---
+
+@patch("igaveapp.ocr.vision.ImageAnnotatorClient")
+@patch("igaveapp.ocr.Credentials")
+@patch("igaveapp.ocr.io.open")
+@patch.dict(os.environ, {"GOOGLE_CREDENTIALS_JSON": '{"type": "service_account"}'})
+def test_duplicate_upload_skips_vision(mock_open, mock_creds, mock_client_class):
+    mock_open.return_value.__enter__.return_value.read.return_value = b"same photo"
+    annotation = MagicMock()
+    annotation.description = "Target\nTotal 50.00"
+    mock_client_class.return_value.text_detection.return_value.text_annotations = [annotation]
+
+    first = extract_receipt_data("receipt.jpg")
+    second = extract_receipt_data("receipt_again.jpg")
+
+    assert first == second
+    assert mock_client_class.return_value.text_detection.call_count == 1
+    stats = get_ocr_cache().stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+    assert get_ocr_cache().get(image_hash(b"same photo"))["text"] == "Target\nTotal 50.00"
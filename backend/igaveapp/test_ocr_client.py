@@ -0,0 +1,116 @@
+import os
+import threading
+import pytest
+from unittest.mock import patch, MagicMock
+from google.api_core import exceptions as google_exceptions
+from igaveapp.ocr import extract_receipt_data, vision_client_pool
+from igaveapp.ocr_cache import get_ocr_cache
+
+
+@pytest.fixture(autouse=True)
+def fresh_pool():
+    vision_client_pool.reset()
+    get_ocr_cache().clear()
+    yield
+    vision_client_pool.reset()
+
+
+def _fake_response(text):
+    annotation = MagicMock()
+    annotation.description = text
+    response = MagicMock()
+    response.text_annotations = [annotation]
+    return response
+
+
+@patch("igaveapp.ocr.vision.ImageAnnotatorClient")
+@patch("igaveapp.ocr.Credentials")
+@patch.dict(os.environ, {"GOOGLE_CREDENTIALS_JSON": '{"type": "service_account"}'})
+def test_client_is_built_once_and_reused(mock_creds, mock_client_class):
+    first = vision_client_pool.get()
+    second = vision_client_pool.get()
+
+    assert first is second
+    assert mock_client_class.call_count == 1
+    assert vision_client_pool.stats()["created"] == 1
+    assert vision_client_pool.stats()["reused"] == 1
+
+
+@patch("igaveapp.ocr.vision.ImageAnnotatorClient")
+@patch("igaveapp.ocr.Credentials")
+def test_client_is_rebuilt_when_credentials_rotate(mock_creds, mock_client_class):
+    mock_client_class.side_effect = [MagicMock(), MagicMock()]
+
+    with patch.dict(os.environ, {"GOOGLE_CREDENTIALS_JSON": '{"type": "service_account", "key": "a"}'}):
+        old_client = vision_client_pool.get()
+    with patch.dict(os.environ, {"GOOGLE_CREDENTIALS_JSON": '{"type": "service_account", "key": "b"}'}):
+        new_client = vision_client_pool.get()
+
+    assert old_client is not new_client
+    assert vision_client_pool.stats()["created"] == 2
+
+
+@patch("igaveapp.ocr.vision.ImageAnnotatorClient")
+@patch("igaveapp.ocr.Credentials")
+@patch.dict(os.environ, {"GOOGLE_CREDENTIALS_JSON": '{"type": "service_account"}'})
+def test_threads_share_one_client(mock_creds, mock_client_class):
+    seen = []
+
+    def grab():
+        seen.append(vision_client_pool.get())
+
+    threads = [threading.Thread(target=grab) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len({id(c) for c in seen}) == 1
+    assert mock_client_class.call_count == 1
+
+
+@patch("igaveapp.ocr.vision.ImageAnnotatorClient")
+@patch("igaveapp.ocr.Credentials")
+@patch("igaveapp.ocr.io.open")
+@patch.dict(os.environ, {"GOOGLE_CREDENTIALS_JSON": '{"type": "service_account"}'})
+def test_broken_channel_rebuilds_client(mock_open, mock_creds, mock_client_class):
+    mock_open.return_value.__enter__.return_value.read.return_value = b"fake_binary_image_data"
+
+    broken = MagicMock()
+    broken.text_detection.side_effect = google_exceptions.ServiceUnavailable("channel closed")
+    healthy = MagicMock()
+    healthy.text_detection.return_value = _fake_response("Target\nTotal 50.00")
+    mock_client_class.side_effect = [broken, healthy]
+
+    data = extract_receipt_data("fake_receipt.jpg")
+
+    assert data is not None
+    assert data["vendor"] == "Target"
+    assert vision_client_pool.stats() == {"created": 2, "reused": 0, "discarded": 1, "active": True}
+
+
+# --- IMAGE SOURCES (no temp-file round trip) ---
+
+def test_open_image_accepts_buffers_uploads_and_paths(tmp_path):
+    from io import BytesIO
+    from django.core.files.uploadedfile import InMemoryUploadedFile, TemporaryUploadedFile
+    from igaveapp.ocr import open_image
+
+    assert open_image(b"abc") == b"abc"
+
+    payload = b"small upload"
+    in_memory = InMemoryUploadedFile(BytesIO(payload), "file", "r.jpg", "image/jpeg", 12, None)
+    assert open_image(in_memory) is payload  # the upload's own buffer, not a copy
+
+    view = memoryview(b"a view")
+    assert open_image(view) is view
+
+    on_disk = TemporaryUploadedFile("big.jpg", "image/jpeg", 10, None)
+    on_disk.write(b"big upload")
+    on_disk.flush()
+    assert open_image(on_disk) == b"big upload"
+    on_disk.close()
+
+    path = tmp_path / "receipt.jpg"
+    path.write_bytes(b"from disk")
+    assert open_image(str(path)) == b"from disk"
@@ -0,0 +1,78 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.test import override_settings
+from rest_framework.test import APITestCase, APIClient
+from igaveapp.models import Receipt
+
+
+class KeysetPaginationTest(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="pager", password="testpass123")
+        self.client.force_authenticate(user=self.user)
+        other = User.objects.create_user(username="someone_else", password="testpass123")
+
+        # Plenty of ties (same date / same total) and some empty values, which is where keysets go wrong
+        receipts = []
+        for i in range(40):
+            receipts.append(Receipt(
+                user=self.user,
+                store_name=f"Store {i}",
+                date=None if i % 9 == 0 else date(2025, 1, 1) + timedelta(days=i % 5),
+                total_amount=None if i % 7 == 0 else Decimal(i % 4) + Decimal("0.50"),
+            ))
+        receipts.append(Receipt(user=other, store_name="Not mine", date=date(2025, 1, 1)))
+        Receipt.objects.bulk_create(receipts)
+
+    def walk(self, query):
+        """Follows "next" links and returns every receipt id in the order the pages gave them."""
+        ids = []
+        url = f"/api/receipts/?{query}"
+        pages = 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data["results"]), response.data["page_size"])
+            ids += [r["id"] for r in response.data["results"]]
+            url = response.data["next"]
+            pages += 1
+        return ids, pages
+
+    def expected(self, field, descending):
+        rows = list(Receipt.objects.filter(user=self.user).values_list(field, "id"))
+        present = sorted((r for r in rows if r[0] is not None), reverse=descending)
+        empty = sorted((r for r in rows if r[0] is None), reverse=descending)
+        ordered = empty + present if descending else present + empty
+        return [pk for value, pk in ordered]
+
+    def test_every_ordering_pages_through_all_rows_once(self):
+        for ordering in ["-created_at", "created_at", "date", "-date", "total_amount", "-total_amount"]:
+            with self.subTest(ordering=ordering):
+                ids, pages = self.walk(f"ordering={ordering}&page_size=7")
+                self.assertEqual(pages, 6)
+                self.assertEqual(ids, self.expected(ordering.lstrip("-"), ordering.startswith("-")))
+
+    def test_pages_do_not_shift_when_receipts_are_added(self):
+        first = self.client.get("/api/receipts/?ordering=-created_at&page_size=10").data
+        Receipt.objects.create(user=self.user, store_name="Brand new", date=date(2025, 2, 1))
+
+        second = self.client.get(first["next"]).data
+        every_id, pages = self.walk("ordering=-created_at&page_size=10")
+        first_ids = [r["id"] for r in first["results"]]
+        second_ids = [r["id"] for r in second["results"]]
+        self.assertEqual(every_id[1:21], first_ids + second_ids)  # the new one is on top, nothing repeated
+
+    @override_settings(RECEIPT_PAGE_SIZE=5, RECEIPT_MAX_PAGE_SIZE=12)
+    def test_page_size_is_capped(self):
+        self.assertEqual(len(self.client.get("/api/receipts/").data["results"]), 5)
+        self.assertEqual(len(self.client.get("/api/receipts/?page_size=1000").data["results"]), 12)
+
+    def test_bad_cursor_and_ordering(self):
+        self.assertEqual(self.client.get("/api/receipts/?cursor=not-a-cursor").status_code, 404)
+        self.assertEqual(self.client.get("/api/receipts/?ordering=store_name").status_code, 400)
+
+        # A cursor only works with the ordering it was made for
+        next_url = self.client.get("/api/receipts/?ordering=date&page_size=5").data["next"]
+        cursor = next_url.split("cursor=")[1].split("&")[0]
+        self.assertEqual(self.client.get(f"/api/receipts/?ordering=-date&cursor={cursor}").status_code, 404)
@@ -0,0 +1,98 @@
+import json
+import logging
+import os
+import pytest
+from io import StringIO
+from django.core.management import call_command
+from igaveapp.parsing import classify_lines, parse_receipt_fields, parse_receipt_text, tracing
+
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), "testdata", "receipts")
+
+with open(os.path.join(CORPUS_DIR, "expected.json")) as f:
+    EXPECTED = json.load(f)
+
+
+# --- REGRESSION CORPUS (recorded outputs; only update them on purpose) ---
+
+@pytest.mark.parametrize("name", sorted(EXPECTED))
+def test_corpus_matches_expected(name):
+    with open(os.path.join(CORPUS_DIR, name), newline="") as f:
+        text = f.read()
+    assert parse_receipt_fields(text) == EXPECTED[name]
+
+
+def test_every_corpus_file_has_expectations():
+    dumps = {name for name in os.listdir(CORPUS_DIR) if name.endswith(".txt")}
+    assert dumps == set(EXPECTED)
+
+
+# --- LINE CLASSIFIER ---
+
+def test_classify_lines_labels_each_line():
+    lines = [
+        "Corner Market",
+        "555-123-4567",
+        "12/05/2023",
+        "Apples 2.40",
+        "Grapes",
+        "5.99",
+        "",
+        "TOTAL 8.39",
+    ]
+    labels, items, vendor_index = classify_lines(lines, "2023-12-05")
+
+    assert labels == ["vendor", "phone", "date", "item", "split-item", "split-item", "noise", "total"]
+    assert items == [{"name": "Apples", "price": 2.40}, {"name": "Grapes", "price": 5.99}]
+    assert vendor_index == 0
+
+
+def test_classify_lines_skips_numbers_only_names():
+    labels, items, vendor_index = classify_lines(["123 456", "9.99"])
+    assert items == []
+    assert vendor_index == 0
+
+
+# --- LOGGING + TRACE ---
+
+def test_parser_is_silent_by_default(capsys, caplog):
+    caplog.set_level(logging.INFO, logger="igaveapp")
+    parse_receipt_text("Corner Market\n12/05/2023\nApples 2.40\nTOTAL 2.40")
+    assert capsys.readouterr().out == ""
+    assert caplog.records == []
+
+    caplog.set_level(logging.DEBUG, logger="igaveapp.parsing")
+    parse_receipt_text("Corner Market\nApples 2.40")
+    assert "decision='item'" in caplog.text
+
+
+def test_tracing_collects_the_decisions():
+    with tracing() as steps:
+        parse_receipt_text("Corner Market\n12/05/2023\nApples 2.40\nGrapes\n5.99\nTOTAL 8.39")
+    lines = [(step["index"], step["decision"]) for step in steps if step["step"] == "line"]
+    assert lines == [(0, "noise"), (1, "date"), (2, "item"), (3, "split-item"), (5, "ignored-blacklist")]
+    assert steps[0] == {"step": "date", "raw": "12/05/2023", "date": "2023-12-05"}
+    assert steps[-1] == {"step": "category", "category": "food", "source": "keywords"}
+
+    parse_receipt_text("Corner Market")
+    assert len(steps) == len(lines) + 3  # collected inside the block only
+
+
+# --- FULL ENGINE + CORPUS COMMAND ---
+
+def test_parse_receipt_text_adds_category():
+    data = parse_receipt_text("Shell\n2023-08-14\nFuel Sale 44.63\nTOTAL 44.63")
+    assert data["vendor"] == "Shell"
+    assert data["category"] == "transport"
+    assert data["total"] == "44.63"
+
+
+def test_parse_corpus_command_reports_hit_rates(tmp_path):
+    output = tmp_path / "parsed.jsonl"
+    out = StringIO()
+    call_command("parse_corpus", CORPUS_DIR, "--workers", "1", "--output", str(output), stdout=out)
+
+    report = out.getvalue()
+    assert f"Receipts:    {len(EXPECTED)}" in report
+    assert "Latency p99" in report
+    assert "vendor" in report
+    assert len(output.read_text().splitlines()) == len(EXPECTED)
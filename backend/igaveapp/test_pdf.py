@@ -0,0 +1,99 @@
+import io
+import threading
+import time
+import pytest
+from unittest.mock import patch
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
+from rest_framework.test import APIClient
+from igaveapp.ocr_cache import get_ocr_cache
+from igaveapp.pdf import extract_pdf_text, is_pdf
+
+# Page width (in PDF points, = pixels at 72 dpi) -> the text "printed" on that page
+PAGE_TEXT = {
+    300: "CITY POWER & LIGHT\nStatement Date: 12/01/2023",
+    320: "Usage charges 80.00\nTaxes 4.50",
+    340: "Amount Due: $84.50",
+}
+
+
+def _pdf(widths=(300, 320, 340)):
+    pages = [Image.new("L", (width, 400), 255) for width in widths]
+    output = io.BytesIO()
+    pages[0].save(output, format="PDF", save_all=True, append_images=pages[1:], resolution=72)
+    return output.getvalue()
+
+
+def _fake_ocr(content):
+    """Reads a page back by its size, like Vision would read the text on it."""
+    return PAGE_TEXT.get(Image.open(io.BytesIO(content)).width)
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    get_ocr_cache().clear()
+
+
+def test_is_pdf():
+    assert is_pdf(_pdf())
+    assert not is_pdf(b"\xff\xd8\xff\xe0 a jpeg")
+
+
+def test_pages_are_merged_in_order_and_timed():
+    text, report = extract_pdf_text(_pdf(), _fake_ocr, dpi=72, workers=3)
+
+    assert text == "\n".join(PAGE_TEXT.values())
+    assert report["page_count"] == 3
+    assert report["pages_scanned"] == 3
+    assert [p["page"] for p in report["per_page"]] == [1, 2, 3]
+    assert all(p["render_ms"] >= 0 and p["ocr_ms"] >= 0 and p["chars"] for p in report["per_page"])
+
+
+def test_max_pages_and_blank_pages():
+    text, report = extract_pdf_text(_pdf((300, 999, 340, 340)), _fake_ocr, dpi=72, max_pages=3)
+
+    assert report["page_count"] == 4
+    assert report["pages_scanned"] == 3
+    assert report["per_page"][1]["chars"] == 0  # nothing on that page
+    assert text == PAGE_TEXT[300] + "\n" + PAGE_TEXT[340]
+
+    assert extract_pdf_text(_pdf((999,)), _fake_ocr, dpi=72)[0] is None
+
+
+def test_pages_are_ocrd_concurrently():
+    lock = threading.Lock()
+    running = [0]
+    peak = [0]
+
+    def slow_ocr(content):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+        return _fake_ocr(content)
+
+    text, report = extract_pdf_text(_pdf((300, 320, 340) * 3), slow_ocr, dpi=72, workers=3)
+
+    assert 1 < peak[0] <= 3
+    assert report["pages_scanned"] == 9
+
+
+@pytest.mark.django_db
+@patch("igaveapp.ocr.detect_text", side_effect=_fake_ocr)
+def test_scan_endpoint_accepts_pdf(mock_detect, settings):
+    settings.OCR_PDF = {"DPI": 72, "MAX_PAGES": 20, "WORKERS": 2}
+    client = APIClient()
+    client.force_authenticate(user=User.objects.create_user(username="biller", password="testpass123"))
+
+    upload = SimpleUploadedFile("bill.pdf", _pdf(), content_type="application/pdf")
+    response = client.post("/api/receipts/scan/", {"file": upload})
+
+    assert response.status_code == 200
+    assert response.data["store_name"] == "CITY POWER & LIGHT"
+    assert response.data["date"] == "2023-12-01"
+    assert response.data["total_amount"] == "84.50"
+    assert response.data["pages"]["page_count"] == 3
+    assert mock_detect.call_count == 3
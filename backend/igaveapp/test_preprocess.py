@@ -0,0 +1,57 @@
+import io
+import pytest
+from django.test import override_settings
+from PIL import Image, ImageDraw
+from igaveapp.ocr import prepare_image
+from igaveapp.preprocess import preprocess_image, STAGES
+
+
+def _photo(width=3000, height=2000, orientation=None, image_format="JPEG"):
+    """A colourful 'phone photo' with some text on it."""
+    image = Image.new("RGB", (width, height), (200, 180, 150))
+    draw = ImageDraw.Draw(image)
+    for row in range(0, height, 80):
+        draw.text((40, row), "MILK 2% GAL 3.48", fill=(20, 20, 20))
+    output = io.BytesIO()
+    exif = Image.Exif()
+    if orientation:
+        exif[0x0112] = orientation
+    image.save(output, format=image_format, exif=exif.tobytes(), quality=95)
+    return output.getvalue()
+
+
+def _open(content):
+    return Image.open(io.BytesIO(content))
+
+
+def test_preprocess_shrinks_grays_and_rotates():
+    original = _photo(orientation=6)  # stored landscape, meant to be viewed rotated 90°
+    processed, report = preprocess_image(original, max_edge=1000)
+
+    image = _open(processed)
+    assert image.mode == "L"
+    assert image.format == "JPEG"
+    assert image.size == (667, 1000)  # rotated to portrait, longest edge capped
+    assert report["bytes_out"] < report["bytes_in"]
+    assert set(report["timings_ms"]) == set(STAGES)
+
+
+def test_preprocess_keeps_small_images_and_can_emit_png():
+    processed, report = preprocess_image(_photo(400, 300, image_format="PNG"), max_edge=2048, image_format="PNG")
+    image = _open(processed)
+    assert image.format == "PNG"
+    assert image.size == (400, 300)
+
+
+def test_preprocess_rejects_non_images():
+    with pytest.raises(Exception):
+        preprocess_image(b"not an image")
+
+
+def test_prepare_image_falls_back_to_original():
+    assert prepare_image(b"not an image") == b"not an image"
+
+    original = _photo()
+    with override_settings(OCR_PREPROCESS={"ENABLED": False}):
+        assert prepare_image(original) is original
+    assert len(prepare_image(original)) < len(original)
@@ -0,0 +1,74 @@
+from datetime import date
+from django.contrib.auth.models import User
+from django.test import override_settings
+from rest_framework.test import APITestCase, APIClient
+from igaveapp.models import Receipt
+
+
+# On by default only in DEBUG or with a shared backend; the tests' local memory is shared by the one process
+ENABLED = {"ENABLED": True, "ALIAS": "responses", "TTL": 300}
+
+
+@override_settings(RESPONSE_CACHE=ENABLED)
+class ResponseCacheTest(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="cached", password="testpass123")
+        self.client.force_authenticate(user=self.user)
+        self.receipt = Receipt.objects.create(user=self.user, store_name="Deli", date=date(2026, 1, 5),
+                                              total_amount="12.50", category="food")
+
+    def test_repeated_requests_are_served_from_the_cache(self):
+        for url in ["/api/receipts/stats/?month=2026-01", "/api/receipts/?page_size=10",
+                    "/api/receipts/stats/timeseries/?start=2026-01-01&end=2026-03-31"]:
+            with self.subTest(url=url):
+                first = self.client.get(url)
+                with self.assertNumQueries(0):
+                    second = self.client.get(url)
+                self.assertEqual(second.status_code, 200)
+                self.assertEqual(second.data, first.data)
+                self.assertEqual(second["ETag"], first["ETag"])
+                self.assertIn("private", second["Cache-Control"])
+
+    def test_writes_invalidate_the_user_entries(self):
+        self.assertEqual(self.client.get("/api/receipts/stats/").data["total_spent"], 12.5)
+
+        Receipt.objects.create(user=self.user, store_name="Cafe", date=date(2026, 1, 6), total_amount="3.00")
+        self.assertEqual(self.client.get("/api/receipts/stats/").data["total_spent"], 15.5)
+
+        self.receipt.total_amount = "2.50"
+        self.receipt.save()
+        self.assertEqual(self.client.get("/api/receipts/stats/").data["total_spent"], 5.5)
+
+        self.client.delete(f"/api/receipts/{self.receipt.id}/")
+        self.assertEqual(len(self.client.get("/api/receipts/").data["results"]), 1)
+
+    def test_if_none_match_gets_304_until_the_data_changes(self):
+        etag = self.client.get("/api/receipts/stats/").headers["ETag"]
+
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/receipts/stats/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+        self.assertEqual(self.client.get("/api/receipts/stats/?month=2026-01", HTTP_IF_NONE_MATCH=etag).status_code,
+                         200)
+
+        self.client.patch(f"/api/receipts/{self.receipt.id}/", {"status": "verified"}, format="json")
+        response = self.client.get("/api/receipts/stats/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_users_never_see_each_other_entries(self):
+        self.client.get("/api/receipts/stats/")
+
+        other = User.objects.create_user(username="other", password="testpass123")
+        self.client.force_authenticate(user=other)
+        self.assertEqual(self.client.get("/api/receipts/stats/").data["total_spent"], 0)
+
+    @override_settings(RESPONSE_CACHE={"ENABLED": False, "ALIAS": "responses", "TTL": 300})
+    def test_cache_can_be_switched_off(self):
+        self.client.get("/api/receipts/stats/?month=2026-01")
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/receipts/stats/?month=2026-01")
+        self.assertNotIn("ETag", response)
@@ -0,0 +1,157 @@
+import io
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework.test import APITestCase, APIClient
+from igaveapp.models import Receipt, SpendingRollup
+
+
+def buckets(user):
+    return {
+        (r.period, r.start.isoformat(), r.category): (r.total, r.count)
+        for r in SpendingRollup.objects.filter(user=user)
+    }
+
+
+class RollupMaintenanceTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="roller", password="testpass123")
+
+    def test_create_update_delete_move_the_buckets(self):
+        receipt = Receipt.objects.create(user=self.user, store_name="Deli", date="2026-01-05",
+                                         total_amount="12.50", category="food")
+        Receipt.objects.create(user=self.user, store_name="Cafe", date=date(2026, 1, 20), total_amount=3,
+                               category="food")
+        Receipt.objects.create(user=self.user, store_name="Undated", total_amount="9.99")
+        self.assertEqual(buckets(self.user), {
+            ("day", "2026-01-05", "food"): (Decimal("12.50"), 1),
+            ("day", "2026-01-20", "food"): (Decimal("3.00"), 1),
+            ("month", "2026-01-01", "food"): (Decimal("15.50"), 2),
+        })
+
+        receipt.date = date(2026, 2, 1)
+        receipt.category = "shopping"
+        receipt.save()
+        self.assertEqual(buckets(self.user), {
+            ("day", "2026-01-20", "food"): (Decimal("3.00"), 1),
+            ("month", "2026-01-01", "food"): (Decimal("3.00"), 1),
+            ("day", "2026-02-01", "shopping"): (Decimal("12.50"), 1),
+            ("month", "2026-02-01", "shopping"): (Decimal("12.50"), 1),
+        })
+
+        receipt.delete()
+        self.assertEqual(set(buckets(self.user)), {("day", "2026-01-20", "food"), ("month", "2026-01-01", "food")})
+
+    def test_saves_that_do_not_change_the_totals_skip_the_rollups(self):
+        receipt = Receipt.objects.create(user=self.user, store_name="Deli", date=date(2026, 1, 5), total_amount=5)
+        receipt.status = "verified"
+        with self.assertNumQueries(1):
+            receipt.save(update_fields=["status"])
+        receipt.changed_fields = {"status"}  # as ReceiptSerializer.update() leaves it, so items and search skip too
+        with self.assertNumQueries(2):  # the update, and the lookup of what it stored before
+            receipt.save()
+
+    def test_rebuild_matches_the_incremental_rollups(self):
+        rng = random.Random(7)
+        for n in range(60):
+            receipt = Receipt.objects.create(
+                user=self.user, store_name=f"Store {n}", category=rng.choice(["food", "general", "health"]),
+                date=None if n % 10 == 0 else date(2025, 11, 1) + timedelta(days=rng.randint(0, 120)),
+                total_amount=None if n % 7 == 0 else Decimal(rng.randint(100, 9999)) / 100,
+            )
+            if n % 3 == 0:
+                receipt.total_amount = Decimal("1.00")
+                receipt.date = date(2026, 3, 3)
+                receipt.save()
+            if n % 5 == 0:
+                receipt.delete()
+        incremental = buckets(self.user)
+
+        SpendingRollup.objects.all().delete()
+        call_command("rebuild_rollups", stdout=io.StringIO())
+        self.assertEqual(buckets(self.user), incremental)
+
+
+class RollupStatsTest(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="stats", password="testpass123")
+        self.client.force_authenticate(user=self.user)
+        rng = random.Random(11)
+        for n in range(120):
+            Receipt.objects.create(
+                user=self.user, store_name=f"Store {n}", category=rng.choice(["food", "transport", "general"]),
+                date=None if n % 15 == 0 else date(2025, 1, 1) + timedelta(days=rng.randint(0, 500)),
+                total_amount=None if n % 13 == 0 else Decimal(rng.randint(100, 20000)) / 100,
+            )
+        other = User.objects.create_user(username="other", password="testpass123")
+        Receipt.objects.create(user=other, store_name="Not mine", date=date(2025, 3, 3), total_amount=99)
+
+    def test_rollup_stats_match_the_raw_aggregate(self):
+        queries = [
+            "", "month=2025-03", "month=2025-12", "year=2025", "year=2026", "date=2025-03-03",
+            "start=2025-01-15&end=2025-04-10", "start=2025-02-01&end=2025-02-28", "start=2025-03-01&end=2026-02-14",
+            "year=2025&month=2025-06", "month=2025-13", "start=2025-05-01&end=2025-04-01",
+        ]
+        for query in queries:
+            with self.subTest(query=query):
+                fast = self.client.get(f"/api/receipts/stats/?{query}").data
+                with override_settings(STATS_FROM_ROLLUPS=False):
+                    raw = self.client.get(f"/api/receipts/stats/?{query}").data
+                self.assertEqual(dict(zip(fast["labels"], fast["data"])), dict(zip(raw["labels"], raw["data"])))
+                self.assertEqual(fast["total_spent"], raw["total_spent"])
+                self.assertEqual(fast["data"], sorted(fast["data"], reverse=True))
+
+    def test_long_ranges_read_a_bounded_number_of_buckets(self):
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/receipts/stats/?start=2025-01-15&end=2026-05-10")
+        self.assertEqual(response.status_code, 200)
+
+
+class TimeseriesTest(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="trends", password="testpass123")
+        self.client.force_authenticate(user=self.user)
+        for day, amount, category in [
+            (date(2025, 1, 30), "10.00", "food"), (date(2025, 2, 3), "5.50", "food"),
+            (date(2025, 2, 4), "20.00", "transport"), (date(2025, 4, 15), "7.25", "food"),
+        ]:
+            Receipt.objects.create(user=self.user, store_name="Store", date=day, total_amount=amount, category=category)
+
+    def test_monthly_series_fills_empty_months(self):
+        response = self.client.get("/api/receipts/stats/timeseries/?granularity=month&start=2025-01-15&end=2025-05-31")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([str(start) for start in response.data["buckets"]],
+                         ["2025-01-01", "2025-02-01", "2025-03-01", "2025-04-01", "2025-05-01"])
+        self.assertEqual(response.data["totals"], [Decimal("10"), Decimal("25.5"), 0, Decimal("7.25"), 0])
+        self.assertEqual(response.data["categories"]["transport"], [0, Decimal("20"), 0, 0, 0])
+        self.assertEqual(response.data["total_spent"], Decimal("42.75"))
+
+    def test_rollups_and_raw_aggregate_agree(self):
+        for granularity in ["day", "week", "month"]:
+            url = f"/api/receipts/stats/timeseries/?granularity={granularity}&start=2025-01-20&end=2025-04-20"
+            with self.subTest(granularity=granularity):
+                fast = self.client.get(url).data
+                with override_settings(STATS_FROM_ROLLUPS=False):
+                    raw = self.client.get(url).data
+                self.assertEqual(fast, raw)
+                self.assertEqual(fast["total_spent"], Decimal("42.75"))
+
+        weeks = self.client.get("/api/receipts/stats/timeseries/?granularity=week&start=2025-01-30&end=2025-02-09")
+        self.assertEqual([str(start) for start in weeks.data["buckets"]], ["2025-01-27", "2025-02-03"])
+        self.assertEqual(weeks.data["totals"], [Decimal("10"), Decimal("25.5")])
+
+    def test_defaults_and_bad_parameters(self):
+        response = self.client.get("/api/receipts/stats/timeseries/?end=2025-04-15")
+        self.assertEqual(len(response.data["buckets"]), 12)
+        self.assertEqual(str(response.data["buckets"][0]), "2024-05-01")
+
+        for query in ["granularity=year", "start=soon", "start=2025-03-01&end=2025-02-01",
+                      "granularity=day&start=2000-01-01&end=2025-01-01"]:
+            with self.subTest(query=query):
+                self.assertEqual(self.client.get(f"/api/receipts/stats/timeseries/?{query}").status_code, 400)
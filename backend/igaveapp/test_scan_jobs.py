@@ -0,0 +1,126 @@
+import os
+import threading
+from datetime import timedelta
+from unittest.mock import patch
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase, APIClient
+from igaveapp.jobs import BoundedExecutor, QueueFull
+from igaveapp.models import ScanJob
+from igaveapp.ocr_cache import get_ocr_cache
+
+FAKE_OCR = {
+    "vendor": "Target",
+    "date": "2023-12-25",
+    "total": "50.00",
+    "category": "shopping",
+    "items": [{"name": "Socks", "price": 50.0}],
+}
+
+
+@override_settings(SCAN_JOB_WORKERS=0)
+class AsyncScanTest(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="scanner", password="testpass123")
+        self.client.force_authenticate(user=self.user)
+        get_ocr_cache().clear()
+
+    def _upload(self):
+        return SimpleUploadedFile("receipt.jpg", b"fake_binary_image_data", content_type="image/jpeg")
+
+    @patch("igaveapp.jobs.extract_receipt_data", return_value=FAKE_OCR)
+    def test_async_scan_returns_job_and_draft(self, mock_extract):
+        response = self.client.post("/api/receipts/scan/?async=true", {"file": self._upload()})
+        self.assertEqual(response.status_code, 202)
+        job_id = response.data["id"]
+
+        response = self.client.get(f"/api/receipts/scan/{job_id}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["status"], "done")
+        self.assertEqual(response.data["draft"]["store_name"], "Target")
+        self.assertEqual(response.data["draft"]["status"], "pending")
+
+    @patch("igaveapp.jobs.extract_receipt_data", return_value=None)
+    def test_failed_scan_reports_error(self, mock_extract):
+        response = self.client.post("/api/receipts/scan/?async=true", {"file": self._upload()})
+        job = ScanJob.objects.get(pk=response.data["id"])
+        self.assertEqual(job.status, "failed")
+        self.assertEqual(job.error, "OCR failed.")
+
+    @patch("igaveapp.jobs.extract_receipt_data", return_value=FAKE_OCR)
+    def test_jobs_are_private(self, mock_extract):
+        response = self.client.post("/api/receipts/scan/?async=true", {"file": self._upload()})
+        job_id = response.data["id"]
+
+        other = User.objects.create_user(username="other", password="testpass123")
+        self.client.force_authenticate(user=other)
+        response = self.client.get(f"/api/receipts/scan/{job_id}/")
+        self.assertEqual(response.status_code, 404)
+
+    @patch("igaveapp.jobs.extract_receipt_data", return_value=FAKE_OCR)
+    def test_large_upload_is_handed_to_the_job_as_a_file(self, mock_extract):
+        big = SimpleUploadedFile("receipt.jpg", b"x" * 64, content_type="image/jpeg")
+        with self.settings(FILE_UPLOAD_MAX_MEMORY_SIZE=10):
+            response = self.client.post("/api/receipts/scan/?async=true", {"file": big})
+        self.assertEqual(response.status_code, 202)
+        source = mock_extract.call_args[0][0]
+        self.assertIsInstance(source, str)  # job-owned temp file, removed after the scan
+        self.assertFalse(os.path.exists(source))
+
+    @patch("igaveapp.ocr.detect_text", return_value="Target\nTotal 50.00")
+    def test_sync_scan_passes_upload_without_temp_file(self, mock_detect):
+        with patch("tempfile.NamedTemporaryFile") as mock_temp:
+            response = self.client.post("/api/receipts/scan/", {"file": self._upload()})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["store_name"], "Target")
+        mock_temp.assert_not_called()
+
+    @patch("igaveapp.jobs.extract_receipt_data", return_value=FAKE_OCR)
+    def test_stale_and_expired_jobs_are_cleaned_up(self, mock_extract):
+        stuck = ScanJob.objects.create(user=self.user, status="running")
+        queued = ScanJob.objects.create(user=self.user)
+        ScanJob.objects.update(updated_at=timezone.now() - timedelta(minutes=5))
+
+        # A job whose worker died fails when polled...
+        with self.settings(SCAN_JOB_TIMEOUT=60):
+            response = self.client.get(f"/api/receipts/scan/{stuck.id}/")
+        self.assertEqual((response.data["status"], response.data["error"]), ("failed", "Scan timed out."))
+        self.assertEqual(self.client.get(f"/api/receipts/scan/{queued.id}/").data["status"], "queued")
+
+        # ...or when the next scan is queued, which also deletes the expired jobs
+        with self.settings(SCAN_JOB_TIMEOUT=60):
+            self.client.post("/api/receipts/scan/?async=true", {"file": self._upload()})
+        self.assertEqual(ScanJob.objects.get(pk=queued.id).status, "failed")
+        with self.settings(SCAN_JOB_TTL=-1):
+            job_id = self.client.post("/api/receipts/scan/?async=true", {"file": self._upload()}).data["id"]
+        self.assertEqual([str(pk) for pk in ScanJob.objects.values_list("id", flat=True)], [str(job_id)])
+
+    @patch("igaveapp.views.enqueue_scan", side_effect=QueueFull())
+    def test_full_queue_returns_503(self, mock_enqueue):
+        response = self.client.post("/api/receipts/scan/?async=true", {"file": self._upload()})
+        self.assertEqual(response.status_code, 503)
+
+
+def test_bounded_executor_rejects_when_queue_is_full():
+    executor = BoundedExecutor(max_workers=1, queue_size=1)
+    release = threading.Event()
+    try:
+        executor.submit(release.wait)  # busy worker
+        executor.submit(release.wait)  # waits in the queue
+        try:
+            executor.submit(release.wait)
+            assert False, "third job should not fit"
+        except QueueFull:
+            pass
+    finally:
+        release.set()
+        executor.shutdown()
+
+    # Slots are given back once the jobs finish
+    executor = BoundedExecutor(max_workers=1, queue_size=0)
+    executor.submit(lambda: None).result()
+    executor.submit(lambda: None).result()
+    executor.shutdown()
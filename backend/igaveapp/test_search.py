@@ -0,0 +1,74 @@
+import io
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from rest_framework.test import APITestCase, APIClient
+from igaveapp.models import Receipt
+from igaveapp.search import search_receipt_ids, search_terms
+
+
+class ReceiptSearchTest(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="searcher", password="testpass123")
+        self.client.force_authenticate(user=self.user)
+
+        def receipt(store, date, category="general", items=()):
+            return Receipt.objects.create(user=self.user, store_name=store, date=date, category=category,
+                                          items=[{"name": name, "price": 1} for name in items])
+
+        self.milk_bar = receipt("Milk Bar", "2026-01-05", "food", ["Cake"])
+        self.grocer = receipt("Grocer", "2026-02-01", "food", ["Oat Milk", "Bread"])
+        self.pharmacy = receipt("CVS Pharmacy", "2026-02-10", "health", ["Milk of Magnesia"])
+        self.garage = receipt("Shell Station", "2026-03-01", "transport", ["Unleaded Fuel"])
+        other = User.objects.create_user(username="other", password="testpass123")
+        Receipt.objects.create(user=other, store_name="Milk Bar", items=[{"name": "Milk"}])
+
+    def search(self, query, **params):
+        response = self.client.get("/api/receipts/", {"q": query, **params})
+        self.assertEqual(response.status_code, 200)
+        return [receipt["id"] for receipt in response.data["results"]]
+
+    def test_matches_store_items_and_category_labels(self):
+        self.assertEqual(self.search("milk")[0], self.milk_bar.id)  # a store-name match ranks first
+        self.assertEqual(set(self.search("milk")), {self.milk_bar.id, self.grocer.id, self.pharmacy.id})
+        self.assertEqual(self.search("oat MILK"), [self.grocer.id])
+        self.assertEqual(self.search("choc"), [])
+        self.assertEqual(self.search("unlead"), [self.garage.id])  # prefixes match
+        self.assertEqual(self.search("fitness"), [self.pharmacy.id])  # "Health & Fitness"
+        self.assertEqual(self.search('"milk"* -'), self.search("milk"))  # no query syntax gets through
+
+    def test_filters_ordering_and_pages(self):
+        self.assertEqual(set(self.search("milk", month="2026-02")), {self.grocer.id, self.pharmacy.id})
+        self.assertEqual(self.search("milk", ordering="date"), [self.milk_bar.id, self.grocer.id, self.pharmacy.id])
+
+        response = self.client.get("/api/receipts/", {"q": "milk", "page_size": 2})
+        self.assertEqual(response.data["ordering"], "rank")
+        first = [receipt["id"] for receipt in response.data["results"]]
+        rest = [receipt["id"] for receipt in self.client.get(response.data["next"]).data["results"]]
+        self.assertEqual(first + rest, self.search("milk"))
+
+    def test_index_follows_changes(self):
+        self.garage.store_name = "Milk Depot"
+        self.garage.save()
+        self.assertIn(self.garage.id, self.search("depot"))
+        self.milk_bar.delete()
+        self.assertNotIn(self.milk_bar.id, self.search("milk"))
+
+        response = self.client.post("/api/receipts/bulk/", [{"store_name": "Bulk Dairy"}], format="json")
+        created = response.data[0]["id"]
+        self.assertEqual(self.search("dairy"), [created])
+        self.client.patch("/api/receipts/bulk/", [{"id": created, "store_name": "Bulk Bakery"}], format="json")
+        self.assertEqual(self.search("dairy"), [])
+        self.client.delete("/api/receipts/bulk/", {"ids": [created]}, format="json")
+        self.assertEqual(self.search("bakery"), [])
+
+    def test_rebuild_command(self):
+        Receipt.objects.bulk_create([Receipt(user=self.user, store_name=f"Backfilled {n}") for n in range(3)])
+        self.assertEqual(search_receipt_ids(self.user, "backfilled"), [])
+        out = io.StringIO()
+        call_command("rebuild_search_index", stdout=out)
+        self.assertIn("Indexed 8 receipts", out.getvalue())
+        self.assertEqual(len(search_receipt_ids(self.user, "backfilled")), 3)
+
+    def test_terms(self):
+        self.assertEqual(search_terms('Café "crème" -brûlée_OR*'), ["café", "crème", "brûlée", "or"])
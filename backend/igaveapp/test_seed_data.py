@@ -0,0 +1,54 @@
+import io
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from igaveapp.models import Receipt, SpendingRollup
+from igaveapp.test_rollups import buckets
+
+
+def seeded_rows(prefix):
+    return [
+        (r.user.username[len(prefix):], r.store_name, r.date, r.total_amount, r.category, r.status, r.items)
+        for r in Receipt.objects.filter(user__username__startswith=prefix).select_related('user').order_by('id')
+    ]
+
+
+class SeedDataTest(TestCase):
+    def seed(self, *args):
+        out = io.StringIO()
+        call_command("seed_data", *args, stdout=out)
+        return out.getvalue()
+
+    def test_same_seed_gives_the_same_data(self):
+        options = ["--users", "3", "--count", "40", "--days", "400", "--end", "2026-06-30", "--chunk-size", "15"]
+        report = self.seed(*options, "--seed", "5", "--prefix", "a_")
+        self.assertIn("Successfully added", report)
+        self.seed(*options, "--seed", "5", "--prefix", "b_")
+        self.seed(*options, "--seed", "6", "--prefix", "c_")
+
+        self.assertEqual(User.objects.filter(username__startswith="a_").count(), 3)
+        self.assertEqual(seeded_rows("a_"), seeded_rows("b_"))
+        self.assertNotEqual(seeded_rows("a_"), seeded_rows("c_"))
+
+    def test_receipts_rollups_and_items_are_consistent(self):
+        self.seed("--users", "2", "--count", "60", "--days", "700", "--seed", "1")
+        for receipt in Receipt.objects.all():
+            self.assertTrue(receipt.items)
+            if receipt.total_amount is not None:
+                self.assertEqual(sum(Decimal(str(item["price"])) for item in receipt.items), receipt.total_amount)
+
+        for user in User.objects.all():
+            seeded = buckets(user)
+            self.assertTrue(seeded)
+            SpendingRollup.objects.filter(user=user).delete()
+            call_command("rebuild_rollups", "--user", str(user.id), stdout=io.StringIO())
+            self.assertEqual(buckets(user), seeded)
+
+    def test_single_existing_user(self):
+        user = User.objects.create_user(username="demo", password="testpass123")
+        self.seed("demo", "--count", "25")
+        self.assertEqual(Receipt.objects.filter(user=user).count(), 25)
+        with self.assertRaises(CommandError):
+            self.seed("nobody")
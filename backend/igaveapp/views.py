@@ -1,7 +1,11 @@
+import contextlib
+import datetime
+import json
+import logging
 import os
-import csv
-import tempfile
-from django.http import HttpResponse
+from django.conf import settings
+from django.http import FileResponse, StreamingHttpResponse
+from django.core.exceptions import ValidationError
 from django.contrib.auth.models import User
 from django.db.models import Sum
 from rest_framework import viewsets, status, filters
@@ -11,10 +15,32 @@ from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from rest_framework_simplejwt.views import TokenObtainPairView
 
-from .models import Receipt
-from .serializers import UserSerializer, ReceiptSerializer, CustomTokenObtainPairSerializer
-from .ocr import extract_receipt_data
-import datetime
+from .models import Receipt, ScanJob, ExportJob
+from .serializers import (
+    UserSerializer, ReceiptSerializer, ReceiptListSerializer, ReceiptItemSerializer, ScanJobSerializer,
+    ExportJobSerializer,
+    CustomTokenObtainPairSerializer,
+)
+from .ocr import extract_receipt_data, build_draft, open_image
+from .parsing import tracing
+from .batch import scan_batch
+from .store_memory import categorize_draft
+from .dedup import draft_fingerprint, flag_draft_duplicates, receipt_duplicates
+from .bulk import BulkError, bulk_create_receipts, bulk_update_receipts, bulk_delete_receipts
+from .pagination import KeysetPagination
+from .filters import FILTER_PARAMS, filter_receipts, date_bounds, parse_day
+from .rollups import (
+    GRANULARITIES, MAX_SERIES_BUCKETS, category_totals, bucket_starts, default_series_start,
+    timeseries, timeseries_from_receipts,
+)
+from .exports import EXPORT_FORMATS, export_queryset
+from .items import ITEM_RESULTS_LIMIT, MAX_ITEM_RESULTS, normalize_item_name, item_matches, item_totals, top_items
+from .jobs import check_scan_timeout, enqueue_scan, enqueue_export, QueueFull
+from .response_cache import cached_response
+from .search import search_receipt_ids
+
+logger = logging.getLogger(__name__)
+
 
 # --- Custom Login View ---
 class CustomTokenObtainPairView(TokenObtainPairView):
@@ -48,94 +74,239 @@ class ReceiptViewSet(viewsets.ModelViewSet):
     filter_backends = [filters.OrderingFilter]
     ordering_fields = ['created_at', 'date', 'total_amount']
     ordering = ['-created_at']
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         """
         The Brain: This handles ALL filters for Lists, Stats, and Exports.
         """
-        queryset = Receipt.objects.filter(user=self.request.user)
-        
-        # 1. Today (?today=true)
-        if self.request.query_params.get('today'):
-            queryset = queryset.filter(date=datetime.date.today())
-
-        # 2. Specific Date (?date=YYYY-MM-DD)
-        date_param = self.request.query_params.get('date')
-        if date_param:
-            queryset = queryset.filter(date=date_param)
+        queryset = filter_receipts(Receipt.objects.filter(user=self.request.user), self.request.query_params)
 
-        # 3. Month (?month=YYYY-MM)
-        month_param = self.request.query_params.get('month')
-        if month_param:
-            try:
-                y, m = month_param.split('-')
-                queryset = queryset.filter(date__year=y, date__month=m)
-            except ValueError:
-                pass 
+        # ?q= on the list: only the full-text matches (list() runs the search)
+        if getattr(self, 'search_ids', None) is not None:
+            queryset = queryset.filter(id__in=self.search_ids)
 
-        # 4. Year (?year=YYYY)
-        year_param = self.request.query_params.get('year')
-        if year_param:
-            queryset = queryset.filter(date__year=year_param)
-
-        # 5. Range (?start=...&end=...)
-        start_date = self.request.query_params.get('start')
-        end_date = self.request.query_params.get('end')
-        if start_date and end_date:
-            queryset = queryset.filter(date__range=[start_date, end_date])
+        # Lists load only the columns they serialize (plus the ones a page cursor may be built from);
+        # single receipts embed the owner in the same query
+        if self.action == 'list':
+            fields = self.requested_fields() or ReceiptListSerializer.Meta.fields
+            queryset = queryset.only(*fields, *self.ordering_fields)
+        else:
+            queryset = queryset.select_related('user')
 
         return queryset
 
+    def requested_fields(self):
+        """?fields=id,store_name,total_amount -> ['id', 'store_name', 'total_amount'] (None = all fields)."""
+        fields = self.request.query_params.get('fields')
+        if not fields:
+            return None
+        fields = [name.strip() for name in fields.split(',') if name.strip()]
+        ReceiptListSerializer.check_field_names(fields)
+        return fields or None
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return ReceiptListSerializer
+        return ReceiptSerializer
+
+    def get_serializer(self, *args, **kwargs):
+        if self.action == 'list':
+            kwargs.setdefault('fields', self.requested_fields())
+        return super().get_serializer(*args, **kwargs)
+
+    @cached_response('list')
+    def list(self, request, *args, **kwargs):
+        """
+        ?q=milk searches the store names, item names and categories (search.py): the matches come best
+        first, or in the usual keyset pages when an ?ordering= is given. Date filters still apply.
+        """
+        query = request.query_params.get('q', '').strip()
+        if query:
+            self.search_ids = search_receipt_ids(request.user, query)
+            if not request.query_params.get('ordering'):
+                return self.ranked_list(request)
+        return super().list(request, *args, **kwargs)
+
+    def ranked_list(self, request):
+        ids = self.search_ids
+        queryset = self.get_queryset()
+        if any(request.query_params.get(name) for name in FILTER_PARAMS):
+            kept = set(queryset.values_list('id', flat=True))
+            ids = [pk for pk in ids if pk in kept]
+        page_ids = self.paginator.paginate_ranked(ids, request)
+        rows = queryset.in_bulk(page_ids)
+        page = [rows[pk] for pk in page_ids if pk in rows]
+        return self.paginator.get_paginated_response(self.get_serializer(page, many=True).data)
+
+    def create(self, request, *args, **kwargs):
+        """The 201 also lists the user's receipts this one likely duplicates ("possible_duplicates", dedup.py)."""
+        response = super().create(request, *args, **kwargs)
+        response.data["possible_duplicates"] = self.possible_duplicates
+        return response
+
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        receipt = serializer.save(user=self.request.user)
+        self.possible_duplicates = receipt_duplicates(receipt)
+
+    @action(detail=False, methods=['post', 'patch', 'delete'], url_path='bulk')
+    def bulk(self, request):
+        """
+        Endpoint: /api/receipts/bulk/ (at most RECEIPT_BULK_MAX_ITEMS items, one transaction)
+        POST   [{receipt}, ...]                        -> 201 with the created receipts
+        PATCH  [{"id": 1, "status": "verified"}, ...]  -> 200 with the updated receipts
+        DELETE {"ids": [1, 2, 3]} or ?ids=1,2,3        -> 200 with {"deleted": [...], "not_found": [...]}
+        All or nothing: if any item is invalid nothing is written, and the 400 lists the errors by item index.
+        """
+        limit = settings.RECEIPT_BULK_MAX_ITEMS
+        if request.method == 'DELETE':
+            ids = request.data.get('ids') if isinstance(request.data, dict) else None
+            if ids is None and request.query_params.get('ids'):
+                ids = request.query_params['ids'].split(',')
+            try:
+                ids = [int(pk) for pk in ids or []]
+            except (TypeError, ValueError):
+                return Response({"error": "ids must be a list of receipt ids."}, status=400)
+            if not 0 < len(ids) <= limit:
+                return Response({"error": f"Send between 1 and {limit} ids."}, status=400)
+            deleted, not_found = bulk_delete_receipts(request.user, ids)
+            return Response({"deleted": deleted, "not_found": not_found})
+
+        items = request.data
+        if not isinstance(items, list) or not 0 < len(items) <= limit:
+            return Response({"error": f"Send a JSON list of 1 to {limit} receipts."}, status=400)
+        try:
+            if request.method == 'POST':
+                receipts, status_code = bulk_create_receipts(request.user, items), 201
+            else:
+                receipts, status_code = bulk_update_receipts(request.user, items), 200
+        except BulkError as e:
+            return Response({"error": str(e), "errors": e.errors}, status=400)
+        return Response(ReceiptListSerializer(receipts, many=True).data, status=status_code)
 
     @action(detail=False, methods=['post'], url_path='scan')
     def analyze_receipt(self, request):
+        """
+        Endpoint: POST /api/receipts/scan/ (multipart "file"). ?async=true queues the scan as a job;
+        ?trace=true adds "trace", the OCR and parsing decisions made for this scan (for debugging).
+        """
         uploaded_file = request.FILES.get('file')
         if not uploaded_file:
             return Response({"error": "No file provided."}, status=400)
 
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as temp_file:
-            for chunk in uploaded_file.chunks():
-                temp_file.write(chunk)
-            temp_file_path = temp_file.name
+        # Job mode (?async=true): answer right away and let the scan pool do the OCR
+        if request.query_params.get('async') == 'true':
+            try:
+                job = enqueue_scan(request.user, uploaded_file)
+            except QueueFull:
+                return Response({"error": "Scanner is busy, please retry shortly."}, status=503)
+            job.refresh_from_db()
+            return Response(ScanJobSerializer(job).data, status=202)
 
+        trace = request.query_params.get('trace') == 'true'
         try:
-            print(f"Analyzing: {uploaded_file.name}...")
-            data = extract_receipt_data(temp_file_path)
+            logger.info("Analyzing %s", uploaded_file.name)
+            # The upload goes straight to the OCR engine (no temp-file copy)
+            with tracing() if trace else contextlib.nullcontext() as steps:
+                data = extract_receipt_data(uploaded_file)
 
             if not data:
-                return Response({"error": "OCR failed."}, status=400)
-
-            draft_data = {
-                "store_name": data.get('vendor') or "Unknown Vendor",
-                "date": data.get('date'),
-                "total_amount": data.get('total'),
-                "items": data.get('items', []),
-                "category": data.get('category'),
-                "status": "pending"
-            }
-            return Response(draft_data, status=200)
+                return Response({"error": "OCR failed.", **({"trace": steps} if trace else {})}, status=400)
+
+            draft = categorize_draft(request.user.id, build_draft(data))
+            if trace:
+                if draft["category"] != data.get("category"):
+                    steps.append({"step": "category", "category": draft["category"], "source": "memory"})
+                draft["trace"] = steps
+            return Response(flag_draft_duplicates(request.user.id, draft), status=200)
 
         except Exception as e:
             return Response({"error": str(e)}, status=500)
 
-        finally:
-            if os.path.exists(temp_file_path):
-                os.remove(temp_file_path)
+    @action(detail=False, methods=['post'], url_path='scan/batch')
+    def analyze_batch(self, request):
+        """
+        Endpoint: POST /api/receipts/scan/batch/ (multipart, one "files" field per image or PDF)
+        OCRs the whole batch at once and streams one JSON line per file, in upload order:
+        {"index": 0, "file_name": "...", "draft": {...}} or {"index": 1, "file_name": "...", "error": "..."}
+        Drafts are checked for duplicates like a single scan's ("possible_duplicates": saved receipts), and a
+        draft with the same photo or receipt as an earlier file of the batch gets "duplicate_of": its index.
+        """
+        uploaded_files = request.FILES.getlist('files')
+        if not uploaded_files:
+            return Response({"error": "No files provided."}, status=400)
+
+        config = getattr(settings, 'OCR_BATCH', {})
+        max_files = config.get('MAX_FILES', 50)
+        if len(uploaded_files) > max_files:
+            return Response({"error": f"At most {max_files} files per batch."}, status=400)
+
+        # Read everything now: the uploads are closed once the view returns, before the stream ends
+        names = [f.name for f in uploaded_files]
+        contents = [open_image(f) for f in uploaded_files]
+        logger.info("Analyzing batch of %d files", len(contents))
+
+        def lines():
+            results = scan_batch(
+                contents,
+                workers=config.get('WORKERS', 4),
+                use_batch_api=config.get('USE_BATCH_API', True),
+            )
+            seen = {}  # image hash / fingerprint -> index of the first file that had it
+            for index, data in results:
+                line = {"index": index, "file_name": names[index]}
+                if data:
+                    draft = flag_draft_duplicates(request.user.id, categorize_draft(request.user.id, build_draft(data)))
+                    keys = [key for key in (draft.get('image_hash'), draft_fingerprint(draft)) if key]
+                    earlier = next((seen[key] for key in keys if key in seen), None)
+                    if earlier is not None:
+                        draft["duplicate_of"] = earlier
+                    for key in keys:
+                        seen.setdefault(key, index)
+                    line["draft"] = draft
+                else:
+                    line["error"] = "OCR failed."
+                yield json.dumps(line) + "\n"
+
+        return StreamingHttpResponse(lines(), content_type='application/x-ndjson')
+
+    @action(detail=False, methods=['get'], url_path=r'scan/(?P<job_id>[0-9a-f-]{36})')
+    def scan_job(self, request, job_id=None):
+        """
+        Endpoint: GET /api/receipts/scan/<job_id>/
+        Poll an async scan; the draft is included once status is "done".
+        """
+        try:
+            job = ScanJob.objects.get(pk=job_id, user=request.user)
+        except (ScanJob.DoesNotExist, ValidationError):
+            return Response({"error": "Scan job not found."}, status=404)
+        return Response(ScanJobSerializer(check_scan_timeout(job)).data)
+
+    def category_totals(self, request):
+        """[{"category", "total"}] for the filtered receipts, largest total first."""
+        if settings.STATS_FROM_ROLLUPS:
+            try:
+                bounds = date_bounds(request.query_params)
+            except ValueError:
+                pass  # let the raw query deal with it, as it always has
+            else:
+                totals = category_totals(request.user, bounds)
+                return sorted(({'category': c, 'total': t} for c, t in totals.items()), key=lambda e: -e['total'])
+
+        queryset = self.get_queryset()
+        return queryset.values('category').annotate(total=Sum('total_amount')).order_by('-total')
 
     # --- THE ACCOUNTANT V2 (Fixed) ---
     @action(detail=False, methods=['get'], url_path='stats')
+    @cached_response('stats')
     def get_stats(self, request):
         """
         Endpoint: GET /api/receipts/stats/?month=2026-01
         Now supports ALL filters because it uses self.get_queryset()!
         """
-        # 1. Get the filtered list (This respects Month, Year, Today, etc.)
-        queryset = self.get_queryset()
-
-        # 2. Calculate Stats on that list
-        stats = queryset.values('category').annotate(total=Sum('total_amount')).order_by('-total')
+        # 1. Per-category totals: from the spending rollups when the filters are plain dates
+        # (a few bucket rows however long the history), else aggregated from the filtered list
+        stats = self.category_totals(request)
 
         labels = []
         values = []
@@ -160,43 +331,170 @@ class ReceiptViewSet(viewsets.ModelViewSet):
             "filter": "Custom Filter" 
         })
 
-    # --- DATA EXPORT (CSV) ---
+    @action(detail=False, methods=['get'], url_path='stats/timeseries')
+    @cached_response('timeseries')
+    def get_timeseries(self, request):
+        """
+        Endpoint: GET /api/receipts/stats/timeseries/?granularity=month&start=2025-01-01&end=2025-12-31
+        Spending per day / week / month and category over a date range, empty buckets included, in one
+        query (instead of one /stats/?month= call per month). Defaults to the last 12 weeks/months or 30 days.
+        """
+        granularity = request.query_params.get('granularity', 'month')
+        if granularity not in GRANULARITIES:
+            return Response({"error": f"granularity must be one of: {', '.join(GRANULARITIES)}."}, status=400)
+
+        try:
+            end = parse_day(request.query_params.get('end') or datetime.date.today().isoformat())
+            start = request.query_params.get('start')
+            start = parse_day(start) if start else default_series_start(end, granularity)
+        except ValueError:
+            return Response({"error": "start and end must be dates (YYYY-MM-DD)."}, status=400)
+        if start > end:
+            return Response({"error": "start must not be after end."}, status=400)
+
+        hi = end + datetime.timedelta(days=1)
+        if len(bucket_starts(start, hi, granularity)) > MAX_SERIES_BUCKETS:
+            return Response({"error": f"At most {MAX_SERIES_BUCKETS} buckets; use a wider granularity."},
+                            status=400)
+
+        series = timeseries if settings.STATS_FROM_ROLLUPS else timeseries_from_receipts
+        starts, by_category, totals = series(request.user, start, hi, granularity)
+        return Response({
+            "granularity": granularity,
+            "start": start,
+            "end": end,
+            "buckets": starts,
+            "totals": totals,
+            "categories": by_category,
+            "total_spent": sum(totals),
+        })
+
+    # --- LINE ITEMS ---
+    def item_query(self, request):
+        """(normalized ?q=, date bounds, ?limit=) of an item request, or an error Response."""
+        query = normalize_item_name(request.query_params.get('q', ''))
+        try:
+            bounds = date_bounds(request.query_params)
+            limit = int(request.query_params.get('limit') or ITEM_RESULTS_LIMIT)
+        except ValueError:
+            return Response({"error": "Dates must be YYYY-MM-DD and limit a number."}, status=400)
+        return query, bounds, max(1, min(limit, MAX_ITEM_RESULTS))
+
+    @action(detail=False, methods=['get'], url_path='items/search')
+    @cached_response('items-search')
+    def search_items(self, request):
+        """
+        Endpoint: GET /api/receipts/items/search/?q=milk&year=2025&limit=50
+        Line items whose name starts with q (case and punctuation ignored), newest receipt first.
+        """
+        parsed = self.item_query(request)
+        if isinstance(parsed, Response):
+            return parsed
+        query, bounds, limit = parsed
+        if not query:
+            return Response({"error": "Give a search term: ?q=milk"}, status=400)
+
+        items = item_matches(request.user, query, bounds).select_related('receipt')
+        items = items.order_by('-receipt__date', '-receipt_id', 'position')[:limit]
+        return Response({"query": query, "results": ReceiptItemSerializer(items, many=True).data})
+
+    @action(detail=False, methods=['get'], url_path='items/stats')
+    @cached_response('items-stats')
+    def get_item_stats(self, request):
+        """
+        Endpoint: GET /api/receipts/items/stats/?q=milk&month=2026-01
+        How much was spent on the items matching q (count, total, quantity, prices, first/last bought),
+        and the names that matched, biggest spend first.
+        """
+        parsed = self.item_query(request)
+        if isinstance(parsed, Response):
+            return parsed
+        query, bounds, limit = parsed
+        if not query:
+            return Response({"error": "Give a search term: ?q=milk"}, status=400)
+
+        items = item_matches(request.user, query, bounds)
+        return Response({"query": query, **item_totals(items), "names": top_items(items, limit)})
+
+    @action(detail=False, methods=['get'], url_path='items/top')
+    @cached_response('items-top')
+    def get_top_items(self, request):
+        """
+        Endpoint: GET /api/receipts/items/top/?year=2025&limit=20
+        The items the user spent the most on (grouped by normalized name), with ?q= to narrow them.
+        """
+        parsed = self.item_query(request)
+        if isinstance(parsed, Response):
+            return parsed
+        query, bounds, limit = parsed
+        return Response({"query": query, "items": top_items(item_matches(request.user, query, bounds), limit)})
+
+    # --- DATA EXPORT ---
+    def export_format(self, request):
+        """?as=csv|items|xlsx|jsonl|columnar (not ?format=, which DRF keeps for picking a renderer); None if unknown."""
+        name = request.query_params.get('as') or 'csv'
+        return name if name in EXPORT_FORMATS else None
+
+    def bad_export_format(self):
+        return Response({"error": f"Export as one of: {', '.join(EXPORT_FORMATS)}."}, status=400)
+
     @action(detail=False, methods=['get'], url_path='export')
     def export_csv(self, request):
         """
-        Endpoint: GET /api/receipts/export/?month=2026-01
+        Endpoint: GET /api/receipts/export/?month=2026-01&as=xlsx
+        csv: the report (one row per receipt). items: one CSV row per line item.
+        xlsx: both, as two sheets. jsonl / columnar: every field, for data pipelines.
         """
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="iSave_Report.csv"'
+        name = self.export_format(request)
+        if name is None:
+            return self.bad_export_format()
+        export_format = EXPORT_FORMATS[name]
 
-        response.write(u'\ufeff'.encode('utf8'))
-        writer = csv.writer(response)
-        writer.writerow(['Date', 'Store Name', 'Category', 'Amount', 'Status'])
+        # Same filters as the list (plus ?ids= for a selection), newest first
+        receipts = export_queryset(request.user.id, request.query_params)
 
-        # 1. Use the shared brain again
-        queryset = self.get_queryset()
-        
-        # Filter by IDs if specifically selected
-        ids_param = request.query_params.get('ids')
-        if ids_param:
-            try:
-                id_list = [int(x) for x in ids_param.split(',')]
-                queryset = queryset.filter(id__in=id_list)
-            except ValueError:
-                pass
-
-        receipts = queryset.order_by('-date')
-        
-        for r in receipts:
-            formatted_date = r.date.strftime("%d %b %Y") if r.date else "N/A"
-            formatted_amount = f"${r.total_amount:.2f}" if r.total_amount else "$0.00"
-            
-            writer.writerow([
-                formatted_date,
-                r.store_name,
-                r.get_category_display(),
-                formatted_amount,
-                r.get_status_display()
-            ])
-
-        return response
\ No newline at end of file
+        # Streamed a chunk of rows at a time: memory stays flat however many receipts there are
+        response = StreamingHttpResponse(export_format.render(receipts), content_type=export_format.content_type)
+        response['Content-Disposition'] = f'attachment; filename="{export_format.file_name}"'
+        return response
+
+    @action(detail=False, methods=['post'], url_path='export/jobs')
+    def export_job_create(self, request):
+        """
+        Endpoint: POST /api/receipts/export/jobs/?month=2026-01&as=xlsx
+        Same parameters as GET export/, but the file is written in the background: poll the job,
+        then fetch its "download" link.
+        """
+        name = self.export_format(request)
+        if name is None:
+            return self.bad_export_format()
+        try:
+            job = enqueue_export(request.user, name, request.query_params)
+        except QueueFull:
+            return Response({"error": "Exporter is busy, please retry shortly."}, status=503)
+        job.refresh_from_db()
+        return Response(ExportJobSerializer(job, context={'request': request}).data, status=202)
+
+    @action(detail=False, methods=['get'], url_path=r'export/jobs/(?P<job_id>[0-9a-f-]{36})')
+    def export_job(self, request, job_id=None):
+        """Endpoint: GET /api/receipts/export/jobs/<job_id>/"""
+        try:
+            job = ExportJob.objects.get(pk=job_id, user=request.user)
+        except (ExportJob.DoesNotExist, ValidationError):
+            return Response({"error": "Export job not found."}, status=404)
+        return Response(ExportJobSerializer(job, context={'request': request}).data)
+
+    @action(detail=False, methods=['get'], url_path=r'export/jobs/(?P<job_id>[0-9a-f-]{36})/download')
+    def export_job_download(self, request, job_id=None):
+        """Endpoint: GET /api/receipts/export/jobs/<job_id>/download/ (streamed from the file)"""
+        try:
+            job = ExportJob.objects.get(pk=job_id, user=request.user)
+        except (ExportJob.DoesNotExist, ValidationError):
+            return Response({"error": "Export job not found."}, status=404)
+        if job.status != 'done':
+            return Response({"error": "Export is not ready.", "status": job.status}, status=409)
+        if not os.path.exists(job.file_path):
+            return Response({"error": "Export has expired."}, status=410)
+        export_format = EXPORT_FORMATS[job.format]
+        return FileResponse(open(job.file_path, 'rb'), as_attachment=True, filename=export_format.file_name,
+                            content_type=export_format.content_type)
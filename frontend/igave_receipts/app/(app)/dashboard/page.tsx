@@ -36,8 +36,9 @@ export default function DashboardPage() {
 
   const fetchHistory = async () => {
     try {
-      const data = await apiGet<ReceiptItem[]>("/api/receipts/");
-      if (data) setHistory(data);
+      // Latest page only; the full history lives on the day/month/year pages
+      const data = await apiGet<{ results?: ReceiptItem[] } | ReceiptItem[]>("/api/receipts/");
+      if (data) setHistory(Array.isArray(data) ? data : (data.results ?? []));
     } catch (e) {
       console.error("Failed to load history", e);
     }
@@ -2,7 +2,7 @@
 
 import { useEffect, useState } from "react";
 import RecordsList from "../../components/RecordsList";
-import { apiGet } from "../../services/api";
+import { apiGetAll } from "../../services/api";
 import StatsComponent from "../../components/StatsComponent";
 
 
@@ -24,7 +24,7 @@ export default function DayPage() {
   const load = async (d: string) => {
     try {
       setError("");
-      const data = await apiGet<ApiResponse>(`/api/receipts/?date=${d}`);
+      const data: ApiResponse = await apiGetAll<any>(`/api/receipts/?date=${d}`);
       const arr = Array.isArray(data) ? data : (data.results ?? []);
       setItems(arr);
     } catch (e: any) {
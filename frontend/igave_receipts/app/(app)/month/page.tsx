@@ -2,7 +2,7 @@
 
 import { useEffect, useState } from "react";
 import RecordsList from "../../components/RecordsList";
-import { apiGet } from "../../services/api";
+import { apiGetAll } from "../../services/api";
 import StatsComponent from "../../components/StatsComponent";
 
 
@@ -23,7 +23,7 @@ export default function MonthPage() {
   const load = async (m: string) => {
     try {
       setError("");
-      const data = await apiGet<ApiResponse>(`/api/receipts/?month=${m}`);
+      const data: ApiResponse = await apiGetAll<any>(`/api/receipts/?month=${m}`);
       const arr = Array.isArray(data) ? data : (data.results ?? []);
       setItems(arr);
     } catch (e: any) {
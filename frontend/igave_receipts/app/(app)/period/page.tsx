@@ -2,7 +2,7 @@
 
 import { useEffect, useState } from "react";
 import RecordsList from "../../components/RecordsList";
-import { apiGet } from "../../services/api";
+import { apiGetAll } from "../../services/api";
 import StatsComponent from "../../components/StatsComponent";
 
 
@@ -26,7 +26,7 @@ export default function PeriodPage() {
   const load = async (s: string, e: string) => {
     try {
       setError("");
-      const data = await apiGet<ApiResponse>(`/api/receipts/?start=${s}&end=${e}`);
+      const data: ApiResponse = await apiGetAll<any>(`/api/receipts/?start=${s}&end=${e}`);
       const arr = Array.isArray(data) ? data : (data.results ?? []);
       setItems(arr);
     } catch (err: any) {
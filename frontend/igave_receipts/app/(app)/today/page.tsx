@@ -2,7 +2,7 @@
 
 import { useEffect, useState } from "react";
 import RecordsList from "../../components/RecordsList";
-import { apiGet } from "../../services/api";
+import { apiGetAll } from "../../services/api";
 import StatsComponent from "../../components/StatsComponent";
 
 
@@ -16,7 +16,7 @@ export default function TodayPage() {
     const load = async () => {
       try {
         setError("");
-        const data = await apiGet<ApiResponse>("/api/receipts/?today=true");
+        const data: ApiResponse = await apiGetAll<any>("/api/receipts/?today=true");
         const arr = Array.isArray(data) ? data : (data.results ?? []);
         setItems(arr);
       } catch (e: any) {
@@ -2,7 +2,7 @@
 
 import { useEffect, useState } from "react";
 import RecordsList from "../../components/RecordsList";
-import { apiGet } from "../../services/api";
+import { apiGetAll } from "../../services/api";
 import StatsComponent from "../../components/StatsComponent";
 
 
@@ -16,7 +16,7 @@ export default function YearPage() {
   const load = async (y: string) => {
     try {
       setError("");
-      const data = await apiGet<ApiResponse>(`/api/receipts/?year=${y}`);
+      const data: ApiResponse = await apiGetAll<any>(`/api/receipts/?year=${y}`);
       const arr = Array.isArray(data) ? data : (data.results ?? []);
       setItems(arr);
     } catch (e: any) {
@@ -10,7 +10,9 @@ function getAccessToken() {
 export async function apiGet<T>(path: string): Promise<T> {
   const token = getAccessToken();
 
-  const res = await fetch(`${API_BASE_URL}${path}`, {
+  // Paginated responses link to the next page with a full URL
+  const url = path.startsWith("http") ? path : `${API_BASE_URL}${path}`;
+  const res = await fetch(url, {
     headers: {
       "Content-Type": "application/json",
       ...(token ? { Authorization: `Bearer ${token}` } : {}),
@@ -28,6 +30,19 @@ export async function apiGet<T>(path: string): Promise<T> {
   return data as T;
 }
 
+// Lists like /api/receipts/ come in pages ({ results, next }); this follows "next" to the end
+export async function apiGetAll<T>(path: string): Promise<T[]> {
+  const items: T[] = [];
+  let next: string | null = path;
+  while (next) {
+    const data: { results?: T[]; next?: string | null } | T[] = await apiGet(next);
+    if (Array.isArray(data)) return data;
+    items.push(...(data.results ?? []));
+    next = data.next ?? null;
+  }
+  return items;
+}
+
 export async function login(body: {
   username: string;
   password: string;